@@ -1,14 +1,23 @@
-import streamlit as st
+import logging
 import os
+import time
+
+import streamlit as st
+from components.common import render_notifications
+from db import settings
 from utils.css import load_css
-from utils.navigate import initialize_navigation, get_current_page, navigate_to
+from utils.navigate import (
+    DEFAULT_PAGE,
+    get_current_page,
+    initialize_navigation,
+    load_page,
+    navigate_to,
+    page_import_times,
+)
+
+# Sayfa modülleri utils.navigate.PAGE_REGISTRY üzerinden ilk ziyarette yüklenir
 
-# Import page files
-from components.login import login_page
-from components.dashboard import dashboard_page
-from components.orders import orders_page
-from components.profile import profile_page
-from components.admin import admin_page
+logger = logging.getLogger(__name__)
 
 # Dosya yolları ayarları
 current_directory = os.path.dirname(os.path.abspath(__file__))
@@ -30,9 +39,36 @@ def initialize_session_state():
     # Navigasyon için session state'i başlat
     initialize_navigation()
 
+# Sayfa ayarları ve ortam değişkenleri (import yan etkisi yerine açık başlatma)
+def initialize_app():
+    """Her çalıştırmada ilk Streamlit komutu olarak çağrılır."""
+    st.set_page_config(
+        page_title="Ana Sayfa",
+        page_icon="🏠",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    settings.initialize()
+
 # Ana uygulama akışı
 def main():
     """Ana uygulama giriş noktası"""
+    started = time.perf_counter()
+    initialize_app()
+    try:
+        render()
+    finally:
+        # STARTUP_PROFILE=1 ile her çalıştırmanın süresi loglanır
+        if os.getenv("STARTUP_PROFILE"):
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            import_ms = {name: round(seconds * 1000, 1) for name, seconds in page_import_times.items()}
+            logger.info(
+                f"Render süresi: {elapsed_ms:.1f} ms, sayfa: {st.session_state.get('current_page')}, "
+                f"sayfa import süreleri (ms): {import_ms}"
+            )
+
+def render():
+    """Oturum durumuna göre geçerli sayfayı gösterir."""
     if "initialized" not in st.session_state:
         initialize_session_state()
         st.session_state.initialized = True
@@ -42,9 +78,12 @@ def main():
         load_css(css_file)
         st.session_state.css_loaded = True
     
+    # Önceki çalıştırmalardan kalan bildirimleri göster (st.rerun() öncesi eklenenler dahil)
+    render_notifications()
+    
     # Oturum kontrolü
     if not st.session_state.authenticated:
-        login_page(css_file)
+        load_page("login")(css_file)
     else:
         # Sayfaya göre içerik gösterme
         current_page = get_current_page()
@@ -57,17 +96,10 @@ def main():
             navigate_to("dashboard")
             st.rerun()
         
-        # Show appropriate page based on current_page
-        if current_page == "admin":
-            admin_page(css_file)
-        elif current_page == "dashboard":
-            dashboard_page(css_file)
-        elif current_page == "orders":
-            orders_page(css_file)
-        elif current_page == "profile":
-            profile_page(css_file)
-        else:
-            dashboard_page(css_file)
+        # Show appropriate page based on current_page; login and unknown pages fall back to dashboard
+        if current_page == "login":
+            current_page = DEFAULT_PAGE
+        load_page(current_page)(css_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
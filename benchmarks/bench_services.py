@@ -0,0 +1,426 @@
+"""
+Service-layer benchmark: latency percentiles and allocations per function.
+
+`auth_service`, `order_service`, `order_status_service` and `profile_service`
+functions, reads and writes, run against a seeded stand-in database: an in-memory mongomock client by default, or a
+throwaway database on a local mongod with `--mongo-uri` (dropped afterwards).
+Every case is timed over `--iterations` calls after a warm-up, then re-run
+under tracemalloc to measure peak and retained bytes per call. Results are
+written as JSON together with the commit, Python version and data volumes, and
+`--compare` flags cases whose p50 latency or peak allocation grew by more than
+`--threshold` against a previous run.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_services --output baseline.json
+    python -m benchmarks.bench_services --users 500 --orders-per-user 40 --compare baseline.json
+
+Absolute mongomock latencies are not server latencies; compare runs made
+with the same backend and volumes. Write cases insert new orders on every call,
+so collections grow slightly during a run. mongomock does not evaluate the
+pipeline updates behind the daily stats rollups, so rollup contents (not
+their cost) are only faithful with `--mongo-uri`.
+"""
+
+import argparse
+import datetime
+import functools
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks.bench_serialization import make_order
+from services import auth_service, index_service, order_service, order_status_service, profile_service
+from services.common import ORDER_STATUSES
+
+
+PASSWORD = "bench-password"
+DEFAULT_OUTPUT = "bench_services.json"
+BULK_ORDERS = 50
+TRANSITION_ORDERS = 20
+
+
+def make_database(mongo_uri=None):
+    """Return `(db, cleanup)` for mongomock or a throwaway database on `mongo_uri`."""
+    if mongo_uri:
+        from pymongo import MongoClient
+
+        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+        name = f"opevasu_bench_{os.getpid()}"
+
+        def cleanup():
+            client.drop_database(name)
+            client.close()
+
+        return client[name], cleanup
+
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("mongomock yüklü değil: `pip install mongomock` veya --mongo-uri kullanın.")
+    _patch_mongomock_bulk_updates()
+    return mongomock.MongoClient()["opevasu_bench"], lambda: None
+
+
+def _patch_mongomock_bulk_updates():
+    # pymongo >= 4.11 passes `sort=` to bulk updates; older mongomock rejects it.
+    from mongomock.collection import BulkOperationBuilder
+
+    add_update = BulkOperationBuilder.add_update
+    if getattr(add_update, "_ignores_sort", False):
+        return
+
+    @functools.wraps(add_update)
+    def patched(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    patched._ignores_sort = True
+    BulkOperationBuilder.add_update = patched
+
+
+def seed(db, users=100, orders_per_user=10, history_per_order=2, password_method="scrypt", rng=None):
+    """Insert users, their orders and order history; returns the fixture the cases draw from."""
+    rng = rng or random.Random(0)
+    # One hash shared by every user keeps seeding fast; verification cost is unchanged.
+    password_hash = generate_password_hash(PASSWORD, method=password_method)
+    start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+    user_ids = [f"ct_{index:05d}" for index in range(users)]
+    db.Users.insert_many([
+        {
+            "user_id": user_id,
+            "full_name": f"Müşteri {index}",
+            "email": f"{user_id}@example.com",
+            "phone_number": f"+90555{index:07d}",
+            "password": password_hash,
+            "role": "customer",
+            "address": "Eskişehir Osmangazi Üniversitesi Meşelik Kampüsü",
+            "latitude": 39.7598 + rng.uniform(-0.05, 0.05),
+            "longitude": 30.5042 + rng.uniform(-0.05, 0.05),
+            "created_at": start,
+        }
+        for index, user_id in enumerate(user_ids)
+    ])
+
+    orders = []
+    history = []
+    for index in range(users * orders_per_user):
+        created_at = start + datetime.timedelta(minutes=index * 7 + rng.randrange(7))
+        order = make_order(index, created_at)
+        order.pop("_id")
+        order.update({
+            "order_id": f"order_{index:08d}",
+            "customer_id": user_ids[rng.randrange(users)],
+            "status": rng.choice(ORDER_STATUSES),
+        })
+        orders.append(order)
+        for step in range(history_per_order):
+            history.append({
+                "order_id": order["order_id"],
+                "customer_id": order["customer_id"],
+                "action": "status_change",
+                "previous_status": "waiting",
+                "status": order["status"],
+                "action_by": "admin",
+                "action_time": created_at + datetime.timedelta(minutes=step + 1),
+            })
+    if orders:
+        db.Orders.insert_many(orders)
+    if history:
+        db.OrderHistory.insert_many(history)
+
+    try:
+        index_service.ensure_indexes(db)
+    except Exception as exc:
+        print(f"indexes skipped: {exc}", file=sys.stderr)
+    profile_service.backfill_search_terms(db)
+
+    first_page = order_service.get_orders_page(db, page_size=50)
+    return {
+        "user_ids": user_ids,
+        "order_ids": [order["order_id"] for order in orders],
+        "page_cursor": first_page["next_cursor"],
+    }
+
+
+def build_cases(fixture, password_method="scrypt"):
+    """
+    `{name: call(db, rng)}` for every benchmarked service function.
+
+    Write cases are `(setup, call)` pairs: `setup(db, rng)` builds fresh input
+    outside the timed region and `call(db, prepared)` receives its result.
+    """
+    user_ids = fixture["user_ids"]
+    order_ids = fixture["order_ids"] or ["missing"]
+    credential_cache = auth_service.VerifiedCredentialCache()
+    serial = itertools.count()
+
+    def any_user(rng):
+        return rng.choice(user_ids)
+
+    def new_order(rng):
+        index = next(serial)
+        order = make_order(index, datetime.datetime.now(datetime.timezone.utc))
+        order.pop("_id")
+        order.update({"order_id": f"bench_{os.getpid()}_{index:08d}", "customer_id": any_user(rng)})
+        return order
+
+    def new_orders(rng, count):
+        return [new_order(rng) for _ in range(count)]
+
+    def waiting_order_ids(db, rng):
+        # Saved like real orders so their daily rollups exist before the transition.
+        orders = new_orders(rng, TRANSITION_ORDERS)
+        order_service.bulk_save_orders(db, orders)
+        return [order["order_id"] for order in orders]
+
+    return {
+        "auth_service.authenticate_user": lambda db, rng: auth_service.authenticate_user(
+            db, any_user(rng), PASSWORD
+        ),
+        "auth_service.authenticate_user[cached]": lambda db, rng: auth_service.authenticate_user(
+            db, user_ids[0], PASSWORD, credential_cache=credential_cache, rehash_method=password_method
+        ),
+        "auth_service.authenticate_user[unknown]": lambda db, rng: auth_service.authenticate_user(
+            db, "nobody@example.com", PASSWORD
+        ),
+        "order_service.get_user_orders": lambda db, rng: order_service.get_user_orders(db, any_user(rng)),
+        "order_service.get_user_orders[status]": lambda db, rng: order_service.get_user_orders(
+            db, any_user(rng), status="waiting"
+        ),
+        "order_service.get_order": lambda db, rng: order_service.get_order(db, rng.choice(order_ids)),
+        "order_service.get_order_count_by_status": lambda db, rng: order_service.get_order_count_by_status(
+            db, any_user(rng)
+        ),
+        "order_service.get_order_counts_by_status_bulk": lambda db, rng: (
+            order_service.get_order_counts_by_status_bulk(db, user_ids[:20])
+        ),
+        "order_service.get_order_history": lambda db, rng: order_service.get_order_history(
+            db, customer_id=any_user(rng)
+        ),
+        "order_service.get_orders_page": lambda db, rng: order_service.get_orders_page(db, page_size=50),
+        "order_service.get_orders_page[next]": lambda db, rng: order_service.get_orders_page(
+            db, page_size=50, cursor=fixture["page_cursor"]
+        ),
+        "order_service.get_active_orders": lambda db, rng: order_service.get_active_orders(db),
+        "profile_service.get_user_profile": lambda db, rng: profile_service.get_user_profile(db, any_user(rng)),
+        "profile_service.get_users_page": lambda db, rng: profile_service.get_users_page(db, page_size=20),
+        "profile_service.get_users_page[search]": lambda db, rng: profile_service.get_users_page(
+            db, page_size=20, search="müşteri 1"
+        ),
+        "profile_service.count_users[search]": lambda db, rng: profile_service.count_users(db, "example"),
+        "profile_service.update_user_profile": lambda db, rng: profile_service.update_user_profile(
+            db, any_user(rng), {"address": f"Adres {rng.randrange(1000)}"}
+        ),
+        "order_service.save_order": (
+            lambda db, rng: new_order(rng),
+            lambda db, order: order_service.save_order(db, order),
+        ),
+        f"order_service.bulk_save_orders[{BULK_ORDERS}]": (
+            lambda db, rng: new_orders(rng, BULK_ORDERS),
+            lambda db, orders: order_service.bulk_save_orders(db, orders),
+        ),
+        f"order_status_service.transition_orders_status[{TRANSITION_ORDERS}]": (
+            waiting_order_ids,
+            lambda db, ids: order_status_service.transition_orders_status(
+                db, "processing", "admin", order_ids=ids, expected_status="waiting"
+            ),
+        ),
+    }
+
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def measure(call, db, iterations=30, warmup=5, memory_iterations=10, seed_value=0, setup=None):
+    """
+    Time `call` and then sample its allocations; returns latency (ms) and memory (KiB) stats.
+
+    With `setup`, each call receives `setup(db, rng)` built before the timer starts.
+    """
+    rng = random.Random(seed_value)
+
+    def prepare():
+        return setup(db, rng) if setup else rng
+
+    for _ in range(warmup):
+        call(db, prepare())
+
+    samples = []
+    for _ in range(iterations):
+        prepared = prepare()
+        started = time.perf_counter_ns()
+        call(db, prepared)
+        samples.append((time.perf_counter_ns() - started) / 1e6)
+    samples.sort()
+
+    # tracemalloc slows every allocation, so memory is sampled in a separate pass.
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for _ in range(memory_iterations):
+            prepared = prepare()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call(db, prepared)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - before) / 1024)
+            retained.append((current - before) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(samples),
+        "min_ms": samples[0],
+        "p50_ms": percentile(samples, 0.50),
+        "p90_ms": percentile(samples, 0.90),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": samples[-1],
+        "peak_kib": statistics.median(peaks) if peaks else None,
+        "retained_kib": statistics.median(retained) if retained else None,
+    }
+
+
+def _git_commit():
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def run(args):
+    db, cleanup = make_database(args.mongo_uri)
+    try:
+        fixture = seed(
+            db,
+            users=args.users,
+            orders_per_user=args.orders_per_user,
+            history_per_order=args.history_per_order,
+            password_method=args.password_method,
+            rng=random.Random(args.seed),
+        )
+        cases = build_cases(fixture, args.password_method)
+        selected = [name for name in cases if not args.only or any(part in name for part in args.only)]
+
+        results = {}
+        for name in selected:
+            print(f"running {name}", file=sys.stderr)
+            iterations = args.iterations
+            if name == "auth_service.authenticate_user":
+                # Full password verification is deliberately slow (scrypt/pbkdf2).
+                iterations = min(iterations, args.auth_iterations)
+            setup, call = cases[name] if isinstance(cases[name], tuple) else (None, cases[name])
+            try:
+                results[name] = measure(
+                    call, db, iterations=iterations, warmup=args.warmup,
+                    memory_iterations=args.memory_iterations, seed_value=args.seed, setup=setup,
+                )
+            except Exception as exc:
+                results[name] = {"error": f"{type(exc).__name__}: {exc}"}
+    finally:
+        cleanup()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": "mongod" if args.mongo_uri else "mongomock",
+            "users": args.users,
+            "orders": args.users * args.orders_per_user,
+            "history": args.users * args.orders_per_user * args.history_per_order,
+            "password_method": args.password_method,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=0.2):
+    """Return `(name, metric, baseline, current)` rows that grew by more than `threshold`."""
+    regressions = []
+    for name, current in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or "error" in current or "error" in previous:
+            continue
+        for metric in ("p50_ms", "peak_kib"):
+            before, after = previous.get(metric), current.get(metric)
+            if before and after is not None and after > before * (1 + threshold):
+                regressions.append((name, metric, before, after))
+    return regressions
+
+
+def print_report(report):
+    meta = report["meta"]
+    print(
+        f"{meta['backend']} @ {meta['commit']}: {meta['users']} users, {meta['orders']} orders, "
+        f"{meta['history']} history records"
+    )
+    print(f"{'case':<48} {'p50':>9} {'p90':>9} {'p99':>9} {'peak KiB':>10} {'kept KiB':>9}")
+    for name, result in report["results"].items():
+        if "error" in result:
+            print(f"{name:<48} error: {result['error']}")
+            continue
+        print(
+            f"{name:<48} {result['p50_ms']:9.3f} {result['p90_ms']:9.3f} {result['p99_ms']:9.3f} "
+            f"{result['peak_kib']:10.1f} {result['retained_kib']:9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--orders-per-user", type=int, default=10)
+    parser.add_argument("--history-per-order", type=int, default=2)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--auth-iterations", type=int, default=10, help="cap for the full password check")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--memory-iterations", type=int, default=10)
+    parser.add_argument("--password-method", default="scrypt", help="werkzeug hash method for seeded users")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="run cases whose name contains any of these strings")
+    parser.add_argument("--mongo-uri", help="benchmark a throwaway database on this mongod instead of mongomock")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON results file")
+    parser.add_argument("--compare", help="previous JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative growth before a regression")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.threshold)
+        for name, metric, before, after in regressions:
+            print(f"REGRESSION {name} {metric}: {before:.3f} -> {after:.3f} ({after / before - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.compare} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
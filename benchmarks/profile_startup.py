@@ -0,0 +1,132 @@
+"""
+Startup profiler: cold import cost per page and first-render latency.
+
+Each page module from `utils.navigate.PAGE_REGISTRY` is imported in a fresh
+interpreter with `-X importtime`, so the numbers are true cold starts; the
+report lists the total and the most expensive top-level imports. The app is
+then rendered headless with Streamlit's `AppTest` to time the first run (which
+includes the login page import) and the following reruns.
+
+Run from the repository root:
+
+    python -m benchmarks.profile_startup
+    python -m benchmarks.profile_startup --pages login admin --top 5 --json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from utils.navigate import PAGE_REGISTRY
+
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(output):
+    """Parse `-X importtime` output into `(module, self_us, cumulative_us, depth)` rows."""
+    rows = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def import_breakdown(module, top=10):
+    """
+    Cold-import `module` in a subprocess.
+
+    Returns its total import time, its heaviest direct imports (cumulative)
+    and the modules with the most self time anywhere below it.
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.getcwd(),
+    )
+    wall_s = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    rows = parse_importtime(completed.stderr)
+    # importtime prints children before their parent, so the module's subtree
+    # is every row between the previous top-level row and the module itself.
+    end = max(index for index, row in enumerate(rows) if row[0] == module and row[3] == 0)
+    start = max((index for index, row in enumerate(rows[:end]) if row[3] == 0), default=-1) + 1
+    subtree = rows[start:end]
+    direct = sorted((row for row in subtree if row[3] == 1), key=lambda row: row[2], reverse=True)
+    heaviest = sorted(subtree, key=lambda row: row[1], reverse=True)
+    return {
+        "module": module,
+        "import_ms": rows[end][2] / 1000,
+        "process_wall_ms": wall_s * 1000,
+        "modules_loaded": len(subtree) + 1,
+        "top_imports": [{"module": name, "cumulative_ms": cumulative / 1000} for name, _, cumulative, _ in direct[:top]],
+        "heaviest_self": [{"module": name, "self_ms": self_us / 1000} for name, self_us, _, _ in heaviest[:top]],
+    }
+
+
+def render_latency(script="app.py", reruns=3, timeout=60):
+    """Render `script` headless; returns first-run and rerun latencies in milliseconds."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.abspath(script), default_timeout=timeout)
+    started = time.perf_counter()
+    app.run()
+    first_ms = (time.perf_counter() - started) * 1000
+    rerun_ms = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app.run()
+        rerun_ms.append((time.perf_counter() - started) * 1000)
+    return {
+        "script": script,
+        "first_render_ms": first_ms,
+        "rerun_ms": rerun_ms,
+        "exceptions": [str(exception.value) for exception in app.exception],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", nargs="*", default=list(PAGE_REGISTRY), help="pages to import-profile")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports listed per page")
+    parser.add_argument("--reruns", type=int, default=3)
+    parser.add_argument("--no-render", action="store_true", help="skip the headless AppTest render")
+    parser.add_argument("--json", action="store_true", help="print a machine-readable report")
+    args = parser.parse_args()
+
+    report = {"imports": [import_breakdown(PAGE_REGISTRY[page][0], args.top) for page in args.pages]}
+    if not args.no_render:
+        report["render"] = render_latency(reruns=args.reruns)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for entry in report["imports"]:
+        print(
+            f"{entry['module']:<24} {entry['import_ms']:8.1f} ms import, {entry['modules_loaded']} modules "
+            f"({entry['process_wall_ms']:.0f} ms process)"
+        )
+        for item in entry["top_imports"]:
+            print(f"    {item['module']:<40} {item['cumulative_ms']:8.1f} ms cumulative")
+        for item in entry["heaviest_self"]:
+            print(f"    {item['module']:<40} {item['self_ms']:8.1f} ms self")
+    if "render" in report:
+        render = report["render"]
+        reruns = ", ".join(f"{value:.1f}" for value in render["rerun_ms"])
+        print(f"\nfirst render {render['first_render_ms']:.1f} ms, reruns [{reruns}] ms")
+        for exception in render["exceptions"]:
+            print(f"  exception: {exception}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,36 @@
 import streamlit as st
-from db.db_helper import get_all_users, get_all_orders, get_active_orders, get_product_list, save_order
+from db.db_helper import (
+    count_users,
+    get_all_users,
+    get_daily_stats,
+    get_dispatch_clusters,
+    get_active_orders_table,
+    get_orders_table_page,
+    get_order_counts_by_status_bulk,
+    get_pool_stats,
+    get_product_list,
+    get_profile_thumbnails,
+    get_stats_breakdown,
+    get_users_page,
+    import_orders,
+    plan_active_order_routes,
+    rebuild_daily_stats,
+    save_order,
+)
+from components.common import notify, progress_tracker
 from components.dashboard import sidebar
+from utils.format import format_seconds_of_day, get_status_turkish
 import datetime
+import json
 import uuid
 
+ORDERS_PAGE_SIZES = (50, 500, 5000)
+USERS_PAGE_SIZE = 20
+ORDER_TABLE_COLUMN_CONFIG = {
+    "Toplam": st.column_config.NumberColumn(format="₺%.2f"),
+    "Tarih": st.column_config.DatetimeColumn(format="DD.MM.YYYY HH:mm"),
+}
+
 def admin_page(css_file):
     """Admin paneli sayfasını gösterir."""
     from utils.css import load_css
@@ -23,14 +50,39 @@ def admin_page(css_file):
     st.markdown("<h1 class='page-title'>Admin Paneli</h1>", unsafe_allow_html=True)
 
     # Create tabs for different sections
-    tab1, tab2, tab3, tab4 = st.tabs(["👥 Kullanıcılar", "📦 Tüm Siparişler", "🚚 Aktif Siparişler", "⚡ Hızlı Sipariş ekle"])
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["👥 Kullanıcılar", "📦 Tüm Siparişler", "🚚 Aktif Siparişler", "⚡ Hızlı Sipariş ekle", "📥 Toplu Sipariş Yükle", "🗺️ Sevkiyat Kümeleri", "📊 İstatistikler"])
 
     with tab1:
         st.subheader("Sistem Kullanıcıları")
-        users = get_all_users()
+
+        # Arama ve sayfalama durumu
+        if "admin_users_cursor" not in st.session_state:
+            st.session_state.admin_users_cursor = None
+            st.session_state.admin_users_direction = "next"
+            st.session_state.admin_users_search = ""
+
+        search = st.text_input("🔍 Kullanıcı Ara", placeholder="ID, ad, e-posta veya telefon")
+        if search != st.session_state.admin_users_search:
+            st.session_state.admin_users_search = search
+            st.session_state.admin_users_cursor = None
+            st.session_state.admin_users_direction = "next"
+
+        page = get_users_page(
+            page_size=USERS_PAGE_SIZE,
+            cursor=st.session_state.admin_users_cursor,
+            direction=st.session_state.admin_users_direction,
+            search=search
+        )
+        users = page["users"]
         if users:
             # Kullanıcı sayısını göster
-            st.info(f"Toplam {len(users)} kullanıcı bulundu")
+            st.info(f"Toplam {count_users(search)} kullanıcı bulundu")
+
+            # Sayfadaki kullanıcıların sipariş sayılarını tek sorguda al
+            user_order_counts = get_order_counts_by_status_bulk([user.get('user_id') for user in users])
+
+            # Sayfadaki profil resimlerini paralel indir, kısa bir süre bekle
+            thumbnails = get_profile_thumbnails([user.get('profile_picture') for user in users])
             
             # Her bir kullanıcı için kart oluştur
             for user in users:
@@ -45,9 +97,11 @@ def admin_page(css_file):
                             </div>
                         """, unsafe_allow_html=True)
                         
-                        if user.get('profile_picture'):
+                        # Orijinal resim yerine önbellekteki küçük resmi göster
+                        thumbnail = thumbnails.get(user.get('profile_picture'))
+                        if thumbnail:
                             st.image(
-                                user['profile_picture'],
+                                thumbnail,
                                 width=100
                             )
                         else:
@@ -69,6 +123,7 @@ def admin_page(css_file):
                     
                     with col2:
                         role_color = "green" if user.get('role') == "admin" else "blue"
+                        counts = user_order_counts.get(user.get('user_id'), {})
                         st.markdown(f"""
                             <div style='padding: 10px;'>
                                 <h3 style='margin:0;'>{user.get('full_name')}</h3>
@@ -82,51 +137,86 @@ def admin_page(css_file):
                                 <p style='margin-top: 5px;'>
                                     📧 {user.get('email')}<br>
                                     📱 {user.get('phone_number')}<br>
-                                    📍 {user.get('address')}
+                                    📍 {user.get('address')}<br>
+                                    📦 {counts.get('total', 0)} sipariş ({counts.get('waiting', 0)} aktif, {counts.get('completed', 0)} tamamlandı)
                                 </p>
                             </div>
                         """, unsafe_allow_html=True)
                     
                     st.markdown("<hr style='margin: 10px 0;'>", unsafe_allow_html=True)
+
+            # Sayfa navigasyonu
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button("⏮️ İlk Sayfa", key="users_first_page", use_container_width=True,
+                             disabled=st.session_state.admin_users_cursor is None):
+                    st.session_state.admin_users_cursor = None
+                    st.session_state.admin_users_direction = "next"
+                    st.rerun()
+            with col2:
+                if st.button("◀️ Önceki", key="users_prev_page", use_container_width=True,
+                             disabled=page["prev_cursor"] is None):
+                    st.session_state.admin_users_cursor = page["prev_cursor"]
+                    st.session_state.admin_users_direction = "prev"
+                    st.rerun()
+            with col3:
+                if st.button("Sonraki ▶️", key="users_next_page", use_container_width=True,
+                             disabled=page["next_cursor"] is None):
+                    st.session_state.admin_users_cursor = page["next_cursor"]
+                    st.session_state.admin_users_direction = "next"
+                    st.rerun()
+        elif search:
+            st.info("Aramaya uygun kullanıcı bulunamadı.")
         else:
             st.info("Henüz kayıtlı kullanıcı bulunmuyor.")
 
     with tab2:
         st.subheader("Tüm Siparişler")
-        orders = get_all_orders()
-        if orders:
-            # Create a dataframe for all orders
-            order_data = []
-            for order in orders:
-                order_data.append({
-                    "Sipariş ID": order.get("order_id"),
-                    "Müşteri": order.get("customer_id"),
-                    "Durum": order.get("status"),
-                    "Ürün": order.get("request", {}).get("product_name"),
-                    "Miktar": order.get("request", {}).get("quantity"),
-                    "Toplam": f"₺{order.get('total_price', 0):.2f}",
-                    "Tarih": order.get("created_at").strftime("%d.%m.%Y %H:%M") if order.get("created_at") else "-"
-                })
-            st.dataframe(order_data, use_container_width=True)
+
+        # Sayfalama durumu
+        if "admin_orders_cursor" not in st.session_state:
+            st.session_state.admin_orders_cursor = None
+            st.session_state.admin_orders_direction = "next"
+
+        page_size = st.selectbox("Sayfa Boyutu", ORDERS_PAGE_SIZES, key="admin_orders_page_size")
+        page = get_orders_table_page(
+            page_size=page_size,
+            cursor=st.session_state.admin_orders_cursor,
+            direction=st.session_state.admin_orders_direction
+        )
+        orders_table = page["table"]
+        if not orders_table.empty:
+            # Sıralama ve filtreleme st.dataframe tarafından yapılır
+            st.dataframe(orders_table, use_container_width=True, hide_index=True, column_config=ORDER_TABLE_COLUMN_CONFIG)
+
+            # Sayfa navigasyonu
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button("⏮️ İlk Sayfa", key="orders_first_page", use_container_width=True,
+                             disabled=st.session_state.admin_orders_cursor is None):
+                    st.session_state.admin_orders_cursor = None
+                    st.session_state.admin_orders_direction = "next"
+                    st.rerun()
+            with col2:
+                if st.button("◀️ Önceki", key="orders_prev_page", use_container_width=True,
+                             disabled=page["prev_cursor"] is None):
+                    st.session_state.admin_orders_cursor = page["prev_cursor"]
+                    st.session_state.admin_orders_direction = "prev"
+                    st.rerun()
+            with col3:
+                if st.button("Sonraki ▶️", key="orders_next_page", use_container_width=True,
+                             disabled=page["next_cursor"] is None):
+                    st.session_state.admin_orders_cursor = page["next_cursor"]
+                    st.session_state.admin_orders_direction = "next"
+                    st.rerun()
         else:
             st.info("Henüz sipariş bulunmuyor.")
 
     with tab3:
         st.subheader("Aktif Siparişler")
-        active_orders = get_active_orders()
-        if active_orders:
-            # Create a dataframe for active orders
-            active_data = []
-            for order in active_orders:
-                active_data.append({
-                    "Sipariş ID": order.get("order_id"),
-                    "Müşteri": order.get("customer_id"),
-                    "Durum": order.get("status"),
-                    "Teslim Saati": order.get("due_date"),
-                    "Adres": order.get("location", {}).get("address"),
-                    "Araç": order.get("assigned_vehicle", "Atanmadı")
-                })
-            st.dataframe(active_data, use_container_width=True)
+        active_table = get_active_orders_table()
+        if not active_table.empty:
+            st.dataframe(active_table, use_container_width=True, hide_index=True)
         else:
             st.info("Aktif sipariş bulunmuyor.")
 
@@ -228,7 +318,7 @@ def admin_page(css_file):
 
                 # Siparişi kaydet
                 if save_order(order_data):
-                    st.success(f"✅ Sipariş başarıyla oluşturuldu! (Sipariş ID: {order_id})")
+                    notify(f"✅ Sipariş başarıyla oluşturuldu! (Sipariş ID: {order_id})", "success")
                     # Aktif siparişler tabını güncelle
                     st.rerun()
                 else:
@@ -236,3 +326,208 @@ def admin_page(css_file):
 
             except Exception as e:
                 st.error(f"❌ Bir hata oluştu: {str(e)}")
+
+    with tab5:
+        st.subheader("Toplu Sipariş Yükle")
+        st.caption(
+            "CSV sütunları: customer_id, product_id, quantity, ready_time, due_date "
+            "(isteğe bağlı: order_id, service_time, notes, address, latitude, longitude). "
+            "JSON için aynı alanlara sahip nesnelerden oluşan bir liste yükleyin."
+        )
+
+        uploaded_file = st.file_uploader("Sipariş Dosyası", type=["csv", "json"], key="bulk_order_file")
+        if uploaded_file is not None and st.button("Siparişleri Yükle", use_container_width=True):
+            file_format = uploaded_file.name.rsplit(".", 1)[-1].lower()
+            with progress_tracker("Siparişler yükleniyor...") as update_progress:
+                result = import_orders(uploaded_file.getvalue(), file_format, progress=update_progress)
+
+            if result["inserted"]:
+                st.success(f"✅ {result['inserted']} sipariş başarıyla oluşturuldu.")
+            if result["failed"]:
+                st.warning(f"⚠️ {len(result['failed'])} satır yüklenemedi.")
+                st.dataframe(
+                    [
+                        {"Satır": failure["row"], "Sipariş ID": failure["order_id"], "Hata": failure["error"]}
+                        for failure in result["failed"]
+                    ],
+                    use_container_width=True
+                )
+
+    with tab6:
+        st.subheader("Sevkiyat Kümeleri")
+        st.caption("Aktif siparişler konum ve teslim saatine göre gruplanır; her küme ayrı bir rota problemi olarak çözülür.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            cluster_count = st.number_input("Küme Sayısı", min_value=1, value=4, step=1)
+        with col2:
+            max_cluster_size = st.number_input("Küme Başına En Fazla Sipariş (0 = sınırsız)", min_value=0, value=0, step=5)
+
+        if st.button("Siparişleri Kümele", use_container_width=True):
+            st.session_state.admin_dispatch = get_dispatch_clusters(
+                n_clusters=int(cluster_count),
+                max_cluster_size=int(max_cluster_size) or None
+            )
+
+        dispatch = st.session_state.get("admin_dispatch")
+        clusters = dispatch["clusters"] if dispatch else None
+        if dispatch and dispatch["unlocated_order_ids"]:
+            st.warning(
+                f"⚠️ Konumu olmayan {len(dispatch['unlocated_order_ids'])} sipariş kümelere dahil edilmedi: "
+                f"{', '.join(map(str, dispatch['unlocated_order_ids']))}"
+            )
+        if clusters:
+            st.dataframe(
+                [
+                    {
+                        "Küme": cluster["cluster_id"] + 1,
+                        "Sipariş Sayısı": cluster["size"],
+                        "Toplam Talep": cluster["demand"],
+                        "En Erken Hazır": format_seconds_of_day(cluster["ready_s"]),
+                        "En Geç Teslim": format_seconds_of_day(cluster["due_s"]),
+                        "Merkez": f"{cluster['centroid']['latitude']:.5f}, {cluster['centroid']['longitude']:.5f}",
+                    }
+                    for cluster in clusters
+                ],
+                use_container_width=True
+            )
+            st.map(
+                [
+                    {"latitude": cluster["centroid"]["latitude"], "longitude": cluster["centroid"]["longitude"]}
+                    for cluster in clusters
+                ]
+            )
+
+            st.markdown("#### Kümelere Göre Rota Oluştur")
+            col1, col2 = st.columns(2)
+            with col1:
+                vehicle_count = st.number_input("Araç Sayısı", min_value=len(clusters), value=len(clusters), step=1)
+            with col2:
+                vehicle_capacity = st.number_input("Araç Kapasitesi", min_value=1.0, value=1000.0, step=50.0)
+
+            if st.button("Rotaları Oluştur ve Araç Ata", use_container_width=True):
+                vehicles = [
+                    {"vehicle_id": f"arac_{index + 1}", "capacity": vehicle_capacity}
+                    for index in range(int(vehicle_count))
+                ]
+                # Ekrandaki kümeler, oluşturuldukları sipariş listesiyle birlikte rotalanır
+                with progress_tracker("Kümeler rotalanıyor...") as update_progress:
+                    result = plan_active_order_routes(
+                        vehicles,
+                        orders=dispatch["orders"],
+                        clusters=clusters,
+                        progress=update_progress
+                    )
+                if result.get("error"):
+                    st.error(f"❌ Rota oluşturulamadı: {result['error']}")
+                else:
+                    summary = result["summary"]
+                    st.success(
+                        f"✅ {len(result['routes'])} rota oluşturuldu, {summary.get('assigned', 0)} sipariş araçlara atandı. "
+                        f"Toplam mesafe: {summary['total_distance_m'] / 1000:.1f} km"
+                    )
+                    if summary["late_orders"]:
+                        st.warning(f"⚠️ Zaman penceresini aşan siparişler: {', '.join(map(str, summary['late_orders']))}")
+                    if summary["overloaded_vehicles"]:
+                        st.warning(f"⚠️ Kapasitesi aşılan araçlar: {', '.join(summary['overloaded_vehicles'])}")
+                    if summary.get("unassigned_orders"):
+                        st.warning(f"⚠️ Konumu olmadığı için atanmayan siparişler: {', '.join(map(str, summary['unassigned_orders']))}")
+                    st.download_button(
+                        "Rotaları İndir (JSON)",
+                        data=json.dumps(result["routes"], ensure_ascii=False, indent=2),
+                        file_name="rotalar.json",
+                        mime="application/json"
+                    )
+        elif clusters is not None:
+            st.info("Kümelenecek aktif sipariş bulunmuyor.")
+
+    with tab7:
+        st.subheader("Sipariş İstatistikleri")
+
+        today = datetime.date.today()
+        date_range = st.date_input(
+            "Tarih Aralığı",
+            value=(today - datetime.timedelta(days=29), today),
+            key="admin_stats_range"
+        )
+        if isinstance(date_range, (tuple, list)) and len(date_range) == 2:
+            start_day, end_day = date_range
+        else:
+            start_day = end_day = date_range[0] if isinstance(date_range, (tuple, list)) else date_range
+
+        daily_stats = get_daily_stats(start_day, end_day)
+        if daily_stats:
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Sipariş", sum(day["count"] for day in daily_stats))
+            col2.metric("Toplam Miktar", sum(day["quantity"] for day in daily_stats))
+            col3.metric("Toplam Talep", f"{sum(day['demand'] for day in daily_stats):,.0f}")
+            col4.metric("Gelir", f"₺{sum(day['revenue'] for day in daily_stats):,.2f}")
+
+            st.markdown("#### Günlük Sipariş ve Gelir")
+            st.line_chart(
+                {
+                    "Gün": [day["day"] for day in daily_stats],
+                    "Sipariş": [day["count"] for day in daily_stats],
+                    "Gelir": [day["revenue"] for day in daily_stats],
+                },
+                x="Gün"
+            )
+
+            st.markdown("#### Durum Dağılımı")
+            st.bar_chart(
+                {
+                    get_status_turkish(status): [sum(day["status"][status] for day in daily_stats)]
+                    for status in daily_stats[0]["status"]
+                }
+            )
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("#### En Çok Gelir Getiren Ürünler")
+                st.dataframe(
+                    [
+                        {
+                            "Ürün": row.get("product_name") or row["product_id"],
+                            "Sipariş": row["count"],
+                            "Miktar": row["quantity"],
+                            "Gelir": f"₺{row['revenue']:.2f}",
+                        }
+                        for row in get_stats_breakdown(start_day, end_day, group_by="product_id")
+                    ],
+                    use_container_width=True
+                )
+            with col2:
+                st.markdown("#### En Çok Sipariş Veren Müşteriler")
+                st.dataframe(
+                    [
+                        {
+                            "Müşteri": row["customer_id"],
+                            "Sipariş": row["count"],
+                            "Miktar": row["quantity"],
+                            "Gelir": f"₺{row['revenue']:.2f}",
+                        }
+                        for row in get_stats_breakdown(start_day, end_day, group_by="customer_id")
+                    ],
+                    use_container_width=True
+                )
+        else:
+            st.info("Seçilen tarih aralığında sipariş istatistiği bulunmuyor.")
+
+        if st.button("İstatistikleri Yeniden Hesapla", use_container_width=True):
+            with st.spinner("İstatistikler siparişlerden yeniden hesaplanıyor..."):
+                count = rebuild_daily_stats()
+            st.success(f"✅ {count} günlük özet kaydı oluşturuldu.")
+
+        # PoolStatsListener'ın topladığı bağlantı havuzu ölçümleri
+        with st.expander("🔌 Veritabanı Bağlantı Havuzu"):
+            pool = get_pool_stats()
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Kullanımdaki Bağlantı", pool["checked_out"])
+            col2.metric("Açık Bağlantı", pool["open_connections"])
+            col3.metric("Toplam Bağlantı Alma", pool["total_checkouts"])
+            col4.metric("Başarısız Bağlantı Alma", pool["checkout_failures"])
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Bekleme Ort.", f"{pool['wait_ms']['avg']:.1f} ms")
+            col2.metric("Bekleme p50", f"{pool['wait_ms']['p50']:.1f} ms")
+            col3.metric("Bekleme p95", f"{pool['wait_ms']['p95']:.1f} ms")
+            col4.metric("Havuz Temizleme", pool["pool_clears"])
@@ -1,32 +1,84 @@
 import streamlit as st
 import time
+from contextlib import contextmanager
 
-def show_loading_screen(message="Yükleniyor..."):
-    """Yükleme ekranını gösterir."""
-    with st.spinner(message):
-        progress_bar = st.progress(0)
-        for i in range(100):
-            time.sleep(0.01)
-            progress_bar.progress(i + 1)
-        st.success("Tamamlandı!")
-        time.sleep(0.5)
-        st.empty()
-
-def show_temporary_message(message, message_type="info", duration=3):
-    """Geçici mesaj gösterir ve sonra otomatik olarak kaldırır."""
-    message_placeholder = st.empty()
-    
+# Bildirim kuyruğu session state'te tutulur; hiçbir yardımcı script thread'ini uyutmaz
+NOTIFICATIONS_KEY = "notifications"
+
+MESSAGE_ICONS = {
+    "success": "✅",
+    "error": "❌",
+    "warning": "⚠️",
+    "info": "ℹ️",
+}
+
+def _show_message(message, message_type):
     if message_type == "success":
-        message_placeholder.success(message)
+        st.success(message)
     elif message_type == "error":
-        message_placeholder.error(message)
+        st.error(message)
     elif message_type == "warning":
-        message_placeholder.warning(message)
+        st.warning(message)
     else:
-        message_placeholder.info(message)
-    
-    time.sleep(duration)
-    message_placeholder.empty()
+        st.info(message)
+
+def notify(message, message_type="info", duration=3, toast=False):
+    """
+    Mesajı kuyruğa ekler; bir sonraki çalıştırmada (örn. st.rerun() sonrası) gösterilir.
+
+    Satır içi mesajlar en az bir kez gösterilir ve `duration` saniye geçtikten
+    sonraki ilk rerun'da kaldırılır. `toast=True` ile mesaj bir kez toast olarak
+    gösterilir ve tarayıcı tarafından kapatılır.
+    """
+    st.session_state.setdefault(NOTIFICATIONS_KEY, []).append({
+        "message": message,
+        "type": message_type,
+        "toast": toast,
+        "expires_at": time.time() + duration,
+        "shown": False,
+    })
+
+def render_notifications():
+    """Kuyruktaki bildirimleri gösterir ve süresi dolanları temizler; her çalıştırmada bir kez çağrılır."""
+    queue = st.session_state.get(NOTIFICATIONS_KEY)
+    if not queue:
+        return
+    now = time.time()
+    pending = []
+    for notification in queue:
+        if notification["toast"]:
+            st.toast(notification["message"], icon=MESSAGE_ICONS.get(notification["type"]))
+            continue
+        if notification["shown"] and notification["expires_at"] <= now:
+            continue
+        _show_message(notification["message"], notification["type"])
+        notification["shown"] = True
+        pending.append(notification)
+    st.session_state[NOTIFICATIONS_KEY] = pending
+
+def show_temporary_message(message, message_type="info"):
+    """Geçici mesajı bekletmeden toast olarak gösterir; tarayıcı kendisi kapatır."""
+    st.toast(message, icon=MESSAGE_ICONS.get(message_type))
+
+@contextmanager
+def progress_tracker(label="İşleniyor..."):
+    """
+    Gerçek işin bildirdiği ilerlemeyi gösteren bir ilerleme çubuğu.
+
+    `update(done, total)` fonksiyonunu döndürür; servislerin `progress`
+    parametresine verilir. Blok bitince çubuk kaldırılır.
+    """
+    placeholder = st.empty()
+    bar = placeholder.progress(0.0, text=label)
+
+    def update(done, total):
+        fraction = min(max(done / total, 0.0), 1.0) if total else 1.0
+        bar.progress(fraction, text=f"{label} ({done}/{total})")
+
+    try:
+        yield update
+    finally:
+        placeholder.empty()
 
 def create_redirect_script(page):
     """JavaScript yönlendirme kodu oluşturur."""
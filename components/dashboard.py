@@ -6,13 +6,6 @@ from utils.navigate import NAV_OPTIONS, navigate_to, get_current_page, logout
 from utils.css import load_css
 
 
-st.set_page_config(
-    page_title="Ana Sayfa",
-    page_icon="🏠",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
 def generate_order_id():
     """Benzersiz sipariş ID'si oluşturur"""
     timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
@@ -186,13 +179,6 @@ def simple_order_form(user, product):
         else:
             st.error("❌ Sipariş kaydedilirken bir hata oluştu.")
 
-@st.cache_data(ttl=60)
-def get_dashboard_data(user_id):
-    """Dashboard verilerini döndürür."""
-    order_counts = get_order_count_by_status(user_id)
-    product = get_product_by_id("SU_0")
-    return order_counts, product
-
 def dashboard_page(css_file=None):
     """Ana sayfa içeriğini gösterir."""
 
@@ -207,8 +193,9 @@ def dashboard_page(css_file=None):
     # Ana içerik
     st.markdown("<h1 class='page-title'>Ana Sayfa</h1>", unsafe_allow_html=True)
     
-    # Verileri cache'den al
-    order_counts, product = get_dashboard_data(st.session_state.user["user_id"])
+    # Veriler db_helper içinde sürüm anahtarıyla önbelleklenir; hatalar önbelleğe alınmaz
+    order_counts = get_order_count_by_status(st.session_state.user["user_id"])
+    product = get_product_by_id("SU_0")
     
     col1, col2, col3 = st.columns(3)
     
@@ -1,6 +1,6 @@
 import streamlit as st
 from db.db_helper import authenticate_user
-import time
+from components.common import notify
 from utils.navigate import navigate_to
 
 
@@ -53,20 +53,16 @@ def login_page(css_file):
             # MongoDB'den kullanıcı doğrulama
             user_info = authenticate_user(username_or_email, password)
             if user_info is not None:
-                with st.spinner("Giriş yapılıyor..."):
-                    # Giriş başarılı mesajı
-                    st.success("✅ Giriş başarılı! Yönlendiriliyorsunuz...")
-                    # Session state'i güncelle
-                    st.session_state.user = user_info
-                    st.session_state.authenticated = True
-                    st.session_state.login_success = True
-                    
-                    # Dashboard sayfasına yönlendir
-                    navigate_to("dashboard")
-                    
-                    # Kısa bekletme - sayfanın yeniden yüklenmesini sağlar
-                    time.sleep(1)
-                    st.rerun()
+                # Giriş başarılı mesajı bir sonraki çalıştırmada toast olarak gösterilir
+                notify("Giriş başarılı!", "success", toast=True)
+                # Session state'i güncelle
+                st.session_state.user = user_info
+                st.session_state.authenticated = True
+                st.session_state.login_success = True
+                
+                # Dashboard sayfasına yönlendir (bekletmeden)
+                navigate_to("dashboard")
+                st.rerun()
             else:
                 # Hata mesajı göster
                 login_error.error("❌ Kullanıcı adı/e-posta veya şifre hatalı!")
@@ -1,8 +1,26 @@
 import streamlit as st
 import datetime
-from db.db_helper import get_user_orders, get_order_history, update_order_status
+from db import cache_versions
+from db.db_helper import get_user_orders, get_order_history, update_order_status_and_get
+from components.common import notify
 from utils.navigate import navigate_to
 
+
+def _memoized_order_history(order):
+    """Order history, fetched once per session until the customer's orders change."""
+    memo = st.session_state.setdefault("order_history_memo", {})
+    version = cache_versions.customer_orders_version(order.get("customer_id"))
+    cached = memo.get(order.get("order_id"))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    history = get_order_history(order_id=order.get("order_id"))
+    # Entries from older versions are stale for every order; drop them.
+    memo = {order_id: entry for order_id, entry in memo.items() if entry[0] == version}
+    memo[order.get("order_id")] = (version, history)
+    st.session_state.order_history_memo = memo
+    return history
+
+
 def orders_page(css_file):
     """Siparişler sayfasını gösterir."""
     from utils.css import load_css
@@ -175,14 +193,18 @@ def orders_page(css_file):
                         cancel_button = st.button("🚫 Siparişi İptal Et", use_container_width=True)
                     
                     if cancel_button:
-                        if update_order_status(order.get("order_id"), "cancelled", st.session_state.user["user_id"]):
-                            st.success("Sipariş başarıyla iptal edildi!")
-                            # Siparişi yeniden yükle
-                            updated_orders = get_user_orders(st.session_state.user["user_id"])
-                            for updated_order in updated_orders:
-                                if updated_order.get("order_id") == order.get("order_id"):
-                                    st.session_state.selected_order = updated_order
-                                    st.rerun()
+                        # Tek istekte iptal edip güncel siparişi geri al
+                        updated_order = update_order_status_and_get(
+                            order.get("order_id"),
+                            "cancelled",
+                            st.session_state.user["user_id"],
+                            customer_id=order.get("customer_id"),
+                            expected_status="waiting"
+                        )
+                        if updated_order is not None:
+                            notify("Sipariş başarıyla iptal edildi!", "success")
+                            st.session_state.selected_order = updated_order
+                            st.rerun()
                         else:
                             st.error("Sipariş iptal edilirken bir hata oluştu!")
                 elif order.get("status") == "cancelled":
@@ -193,7 +215,7 @@ def orders_page(css_file):
                     st.info(f"Sipariş durumu: {status_mapping.get(order.get('status'), 'Bilinmiyor')}")
                 
                 # Sipariş geçmişini göster
-                order_history = get_order_history(order_id=order.get("order_id"))
+                order_history = _memoized_order_history(order)
                 
                 if order_history:
                     history_table = []
@@ -209,7 +231,12 @@ def orders_page(css_file):
                         history_table.append({
                             "Tarih": action_time.strftime("%d.%m.%Y %H:%M"),
                             "Durum": status_mapping.get(entry.get("status"), entry.get("status", "")),
-                            "İşlem": entry.get("action", ""),
+                            "İşlem": (
+                                f"{status_mapping.get(entry.get('previous_status'), entry.get('previous_status'))} → "
+                                f"{status_mapping.get(entry.get('status'), entry.get('status'))}"
+                                if entry.get("action") == "status_change"
+                                else entry.get("action", "")
+                            ),
                             "İşlemi Yapan": entry.get("action_by", "")
                         })
                     
@@ -1,5 +1,6 @@
 import streamlit as st
 from db.db_helper import update_user_profile
+from components.common import notify
 
 def profile_page(css_file):
     """Profil sayfasını gösterir."""
@@ -95,7 +96,7 @@ def profile_page(css_file):
                 
                 if success:
                     st.session_state.user = result
-                    st.success("✅ Profil bilgileri başarıyla güncellendi!")
+                    notify("✅ Profil bilgileri başarıyla güncellendi!", "success")
                     st.rerun()
                 else:
                     st.error(f"❌ Profil güncellenemedi: {result}")
@@ -0,0 +1,55 @@
+"""
+Write-aware version counters for the `st.cache_data` layer.
+
+Cached readers take the current version as an argument, so a write that bumps
+the version makes the next read miss the cache immediately while unchanged
+data can be cached with long TTLs. Counters live in process memory, which
+matches Streamlit's single-process server.
+"""
+
+import threading
+
+
+ORDERS = "Orders"
+PRODUCTS = "Products"
+USERS = "Users"
+
+# Bumped when orders change for a customer we cannot name (e.g. bulk import).
+_ORDERS_ANY_CUSTOMER = "Orders:*"
+
+_lock = threading.Lock()
+_versions = {}
+
+
+def get_version(namespace):
+    """Return the current version of a namespace (0 if never written)."""
+    with _lock:
+        return _versions.get(namespace, 0)
+
+
+def bump(*namespaces):
+    """Invalidate every cache entry keyed on the given namespaces."""
+    with _lock:
+        for namespace in namespaces:
+            _versions[namespace] = _versions.get(namespace, 0) + 1
+
+
+def _customer_orders_namespace(customer_id):
+    return f"Orders:{customer_id}"
+
+
+def customer_orders_version(customer_id):
+    """Version tuple for reads scoped to one customer's orders."""
+    with _lock:
+        return (
+            _versions.get(_ORDERS_ANY_CUSTOMER, 0),
+            _versions.get(_customer_orders_namespace(customer_id), 0),
+        )
+
+
+def bump_orders(customer_id=None):
+    """Record an order write; without `customer_id` every customer is invalidated."""
+    if customer_id is None:
+        bump(ORDERS, _ORDERS_ANY_CUSTOMER)
+    else:
+        bump(ORDERS, _customer_orders_namespace(customer_id))
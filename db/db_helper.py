@@ -1,27 +1,108 @@
+import functools
 import logging
 import os
 
 import streamlit as st
-from dotenv import load_dotenv
 from pymongo import MongoClient
 
-from services import auth_service, order_service, profile_service
+from db import cache_versions, settings
+from db.pool_monitor import PoolStatsListener
+from services import (
+    auth_service,
+    index_service,
+    order_import_service,
+    order_service,
+    order_status_service,
+    profile_service,
+    stats_service,
+)
+
+# NumPy / pandas / Pillow backed modules (routing, the active order board,
+# admin tables, thumbnails) are imported inside the helpers that use them, so
+# pages that never call those helpers do not pay for them on a cold start.
 
+logger = logging.getLogger(__name__)
 
-load_dotenv()
-MONGO_URI = os.getenv("MONGO_URI")
-if MONGO_URI is None:
-    raise ValueError("MONGO_URI ortam değişkeni tanımlı değil.")
+# env variable -> (MongoClient option, parser, default)
+MONGO_CLIENT_SETTINGS = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", int, 50),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", int, 0),
+    "MONGO_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", int, 300000),
+    "MONGO_CONNECT_TIMEOUT_MS": ("connectTimeoutMS", int, 5000),
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": ("serverSelectionTimeoutMS", int, 5000),
+    "MONGO_SOCKET_TIMEOUT_MS": ("socketTimeoutMS", int, 30000),
+    "MONGO_COMPRESSORS": ("compressors", str, None),
+    "MONGO_READ_PREFERENCE": ("readPreference", str, None),
+}
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+pool_stats = PoolStatsListener()
+
+
+def _cache_data(func):
+    """
+    `st.cache_data` with the TTL from `settings`, applied on the first call.
+
+    Cached reads are keyed on cache_versions, so TTLs only bound memory use;
+    deferring the decorator keeps the environment unread at import time.
+    """
+    cached = None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal cached
+        if cached is None:
+            cached = st.cache_data(ttl=settings.app_settings()["cache_ttl_seconds"])(func)
+        return cached(*args, **kwargs)
+
+    return wrapper
+
+
+@st.cache_resource
+def get_credential_cache():
+    """Return the process-wide cache of recently verified logins."""
+    app_settings = settings.app_settings()
+    return auth_service.VerifiedCredentialCache(
+        max_entries=app_settings["auth_cache_max_entries"],
+        ttl_seconds=app_settings["auth_cache_ttl_seconds"],
+    )
+
+
+def get_mongo_client_options(env=None):
+    """Build MongoClient keyword arguments from environment variables."""
+    env = os.environ if env is None else env
+    options = {}
+    for env_name, (option, parser, default) in MONGO_CLIENT_SETTINGS.items():
+        raw_value = env.get(env_name)
+        if raw_value is None or raw_value.strip() == "":
+            value = default
+        else:
+            try:
+                value = parser(raw_value.strip())
+            except ValueError:
+                logger.warning(f"{env_name} geçersiz, varsayılan kullanılıyor: {raw_value}")
+                value = default
+        if value is not None:
+            options[option] = value
+    return options
 
 
 @st.cache_resource
 def get_db_connection():
     """Return MongoDB database connection."""
-    client = MongoClient(MONGO_URI)
-    return client["RouteManagementDB"]
+    mongo_uri, db_name = settings.mongo_settings()
+    client = MongoClient(mongo_uri, event_listeners=[pool_stats], **get_mongo_client_options())
+    db = client[db_name]
+    try:
+        created = index_service.ensure_indexes(db)
+        if created:
+            logger.info(f"Oluşturulan indeksler: {', '.join(created)}")
+        # Users created outside the app have no search keys until backfilled.
+        backfilled = profile_service.backfill_search_terms(db)
+        if backfilled:
+            logger.info(f"{backfilled} kullanıcıya arama anahtarı eklendi")
+    except Exception as exc:
+        logger.warning(f"İndeks oluşturma hatası: {exc}")
+    return db
 
 
 def connect_to_mongodb():
@@ -33,39 +114,60 @@ def connect_to_mongodb():
         return None
 
 
+def _require_db():
+    """Return the database or raise, so failures are never stored by st.cache_data."""
+    db = connect_to_mongodb()
+    if db is None:
+        raise ConnectionError("Veritabanına bağlanılamadı")
+    return db
+
+
+def get_pool_stats():
+    """Return connection pool statistics (checked-out connections, wait times)."""
+    return pool_stats.snapshot()
+
+
 def authenticate_user(userID_or_email, password):
     """Authenticate and return user document."""
     try:
         db = connect_to_mongodb()
         if db is None:
             return None
-        return auth_service.authenticate_user(db, userID_or_email, password)
+        return auth_service.authenticate_user(
+            db,
+            userID_or_email,
+            password,
+            credential_cache=get_credential_cache(),
+            rehash_method=settings.app_settings()["password_hash_method"],
+        )
     except Exception as exc:
         logger.error(f"Kimlik doğrulama hatası: {exc}")
         return None
 
 
-@st.cache_data(ttl=300)
+@_cache_data
+def _cached_product_list(version):
+    return order_service.get_product_list(_require_db())
+
+
 def get_product_list():
     """Return product list."""
     try:
-        db = connect_to_mongodb()
-        if db is None:
-            return []
-        return order_service.get_product_list(db)
+        return _cached_product_list(cache_versions.get_version(cache_versions.PRODUCTS))
     except Exception as exc:
         logger.error(f"Ürün listesi alma hatası: {exc}")
         return []
 
 
-@st.cache_data(ttl=300)
+@_cache_data
+def _cached_product_by_id(product_id, version):
+    return order_service.get_product_by_id(_require_db(), product_id)
+
+
 def get_product_by_id(product_id):
     """Return product by ID."""
     try:
-        db = connect_to_mongodb()
-        if db is None:
-            return None
-        return order_service.get_product_by_id(db, product_id)
+        return _cached_product_by_id(product_id, cache_versions.get_version(cache_versions.PRODUCTS))
     except Exception as exc:
         logger.error(f"Ürün bilgisi alma hatası: {exc}")
         return None
@@ -77,13 +179,36 @@ def save_order(order_data):
         db = connect_to_mongodb()
         if db is None:
             return False
-        return order_service.save_order(db, order_data)
+        saved = order_service.save_order(db, order_data)
+        if saved:
+            cache_versions.bump_orders(order_data.get("customer_id"))
+        return saved
     except Exception as exc:
         logger.error(f"Sipariş kaydetme hatası: {exc}")
         logger.error(f"Order data: {order_data}")
         return False
 
 
+def import_orders(content, file_format, progress=None):
+    """Bulk import orders from an uploaded CSV/JSON file."""
+    try:
+        rows = order_import_service.parse_order_rows(content, file_format)
+    except ValueError as exc:
+        return {"inserted": 0, "failed": [{"row": None, "order_id": None, "error": str(exc)}]}
+
+    try:
+        db = connect_to_mongodb()
+        if db is None:
+            return {"inserted": 0, "failed": [{"row": None, "order_id": None, "error": "Veritabanına bağlanılamadı"}]}
+        result = order_import_service.import_orders(db, rows, progress=progress)
+        if result["inserted"]:
+            cache_versions.bump_orders()
+        return result
+    except Exception as exc:
+        logger.error(f"Toplu sipariş yükleme hatası: {exc}")
+        return {"inserted": 0, "failed": [{"row": None, "order_id": None, "error": str(exc)}]}
+
+
 def get_user_orders(user_id, status=None, start_date=None, end_date=None):
     """Return user orders."""
     try:
@@ -96,16 +221,89 @@ def get_user_orders(user_id, status=None, start_date=None, end_date=None):
         return []
 
 
+def get_order(order_id, customer_id=None):
+    """Return one order, optionally only if it belongs to `customer_id`."""
+    try:
+        db = connect_to_mongodb()
+        if db is None:
+            return None
+        return order_service.get_order(db, order_id, customer_id=customer_id)
+    except Exception as exc:
+        logger.error(f"Sipariş alma hatası: {exc}")
+        return None
+
+
+@_cache_data
+def _cached_order_count_by_status(user_id, version):
+    return order_service.get_order_count_by_status(_require_db(), user_id)
+
+
 def get_order_count_by_status(user_id):
     """Return order counts grouped by status."""
+    try:
+        return _cached_order_count_by_status(user_id, cache_versions.customer_orders_version(user_id))
+    except ConnectionError as exc:
+        logger.error(f"Sipariş sayısı alma hatası: {exc}")
+        return {"total": -1, "waiting": -1, "completed": -1, "by_status": {}}
+    except Exception as exc:
+        logger.error(f"Sipariş sayısı alma hatası: {exc}")
+        return {"total": 0, "waiting": 0, "completed": 0, "by_status": {}}
+
+
+@_cache_data
+def _cached_daily_stats(start_day, end_day, version):
+    return stats_service.get_daily_stats(_require_db(), start_day, end_day)
+
+
+def get_daily_stats(start_day, end_day):
+    """Return per-day order totals from the daily rollups."""
+    try:
+        return _cached_daily_stats(str(start_day), str(end_day), cache_versions.get_version(cache_versions.ORDERS))
+    except Exception as exc:
+        logger.error(f"Günlük istatistik alma hatası: {exc}")
+        return []
+
+
+@_cache_data
+def _cached_stats_breakdown(start_day, end_day, group_by, limit, version):
+    return stats_service.get_stats_breakdown(_require_db(), start_day, end_day, group_by=group_by, limit=limit)
+
+
+def get_stats_breakdown(start_day, end_day, group_by="product_id", limit=10):
+    """Return per-product or per-customer totals from the daily rollups."""
+    try:
+        return _cached_stats_breakdown(
+            str(start_day), str(end_day), group_by, limit, cache_versions.get_version(cache_versions.ORDERS)
+        )
+    except Exception as exc:
+        logger.error(f"İstatistik dağılımı alma hatası: {exc}")
+        return []
+
+
+def rebuild_daily_stats():
+    """Recompute the daily rollups from all orders."""
     try:
         db = connect_to_mongodb()
         if db is None:
-            return {"total": -1, "waiting": -1, "completed": -1}
-        return order_service.get_order_count_by_status(db, user_id)
+            return 0
+        count = stats_service.rebuild_daily_stats(db)
+        cache_versions.bump(cache_versions.ORDERS)
+        return count
     except Exception as exc:
-        logger.error(f"Sipariş sayısı alma hatası: {exc}")
-        return {"total": 0, "waiting": 0, "completed": 0}
+        logger.error(f"Günlük istatistik yeniden oluşturma hatası: {exc}")
+        return 0
+
+
+def get_order_counts_by_status_bulk(user_ids):
+    """Return order counts grouped by status for many users."""
+    try:
+        db = connect_to_mongodb()
+        if db is None:
+            return {}
+        return order_service.get_order_counts_by_status_bulk(db, user_ids)
+    except Exception as exc:
+        logger.error(f"Toplu sipariş sayısı alma hatası: {exc}")
+        return {}
 
 
 def get_order_history(order_id=None, customer_id=None):
@@ -120,43 +318,169 @@ def get_order_history(order_id=None, customer_id=None):
         return []
 
 
-def update_order_status(order_id, new_status, updated_by):
-    """Update order status."""
+def update_order_status(order_id, new_status, updated_by, customer_id=None):
+    """Update order status; pass `customer_id` to invalidate only that customer's caches."""
     try:
         db = connect_to_mongodb()
         if db is None:
             return False
-        return order_service.update_order_status(db, order_id, new_status, updated_by)
+        updated = order_service.update_order_status(db, order_id, new_status, updated_by)
+        if updated:
+            cache_versions.bump_orders(customer_id)
+        return updated
     except Exception as exc:
         logger.error(f"Sipariş durumu güncelleme hatası: {exc}")
         return False
 
 
+def update_order_status_and_get(order_id, new_status, updated_by, customer_id=None, expected_status=None):
+    """Update order status and return the updated order in the same round trip (None if not moved)."""
+    try:
+        db = connect_to_mongodb()
+        if db is None:
+            return None
+        order = order_service.update_order_status_and_get(
+            db, order_id, new_status, updated_by, expected_status=expected_status
+        )
+        if order is not None:
+            cache_versions.bump_orders(customer_id)
+        return order
+    except Exception as exc:
+        logger.error(f"Sipariş durumu güncelleme hatası: {exc}")
+        return None
+
+
+def update_orders_status(new_status, updated_by, order_ids=None, route_id=None, expected_status=None):
+    """Move many orders (or a whole route) to `new_status`; returns the order ids that moved."""
+    try:
+        db = connect_to_mongodb()
+        if db is None:
+            return []
+        moved = order_status_service.transition_orders_status(
+            db, new_status, updated_by, order_ids=order_ids, route_id=route_id, expected_status=expected_status
+        )
+        if moved:
+            cache_versions.bump_orders()
+        return moved
+    except Exception as exc:
+        logger.error(f"Toplu sipariş durumu güncelleme hatası: {exc}")
+        return []
+
+
 def update_user_profile(user_id, update_data):
     """Update profile data."""
     try:
         db = connect_to_mongodb()
         if db is None:
             return False, "Veritabanına bağlanılamadı"
-        return profile_service.update_user_profile(db, user_id, update_data)
+        success, result = profile_service.update_user_profile(
+            db, user_id, update_data, password_hash_method=settings.app_settings()["password_hash_method"]
+        )
+        if success:
+            cache_versions.bump(cache_versions.USERS)
+        return success, result
     except Exception as exc:
         logger.error(f"Kullanıcı güncelleme hatası: {exc}")
         return False, f"Güncelleme sırasında hata: {exc}"
 
 
-@st.cache_data(ttl=60)
+@_cache_data
+def _cached_all_users(version):
+    return profile_service.get_all_users(_require_db())
+
+
 def get_all_users():
     """Return all users."""
     try:
-        db = connect_to_mongodb()
-        if db is None:
-            return []
-        return profile_service.get_all_users(db)
+        return _cached_all_users(cache_versions.get_version(cache_versions.USERS))
     except Exception as exc:
         logger.error(f"Kullanıcı listesi alma hatası: {exc}")
         return []
 
 
+@_cache_data
+def _cached_users_page(page_size, cursor, direction, search, version):
+    return profile_service.get_users_page(
+        _require_db(), page_size=page_size, cursor=cursor, direction=direction, search=search
+    )
+
+
+def get_users_page(page_size=20, cursor=None, direction="next", search=None):
+    """Return one page of users (optionally filtered by `search`) with next/previous cursors."""
+    try:
+        return _cached_users_page(
+            page_size, cursor, direction, search or None, cache_versions.get_version(cache_versions.USERS)
+        )
+    except Exception as exc:
+        logger.error(f"Kullanıcı sayfası alma hatası: {exc}")
+        return {"users": [], "next_cursor": None, "prev_cursor": None}
+
+
+@_cache_data
+def _cached_user_count(search, version):
+    return profile_service.count_users(_require_db(), search=search)
+
+
+def count_users(search=None):
+    """Return the number of users matching `search`."""
+    try:
+        return _cached_user_count(search or None, cache_versions.get_version(cache_versions.USERS))
+    except Exception as exc:
+        logger.error(f"Kullanıcı sayısı alma hatası: {exc}")
+        return 0
+
+
+@st.cache_resource
+def get_thumbnail_cache():
+    """Return the process-wide profile thumbnail cache configured from the environment."""
+    from services import thumbnail_service
+
+    allowed_hosts = [host.strip().lower() for host in os.getenv("THUMBNAIL_ALLOWED_HOSTS", "").split(",") if host.strip()]
+    timeout = float(os.getenv("THUMBNAIL_FETCH_TIMEOUT", str(thumbnail_service.DEFAULT_FETCH_TIMEOUT)))
+
+    def fetch(url):
+        return thumbnail_service.fetch_image(url, timeout=timeout, allowed_hosts=allowed_hosts or None)
+
+    return thumbnail_service.ThumbnailCache(
+        os.getenv("THUMBNAIL_CACHE_PATH", "thumbnail_cache.sqlite"),
+        fetch=fetch,
+        max_memory_entries=int(
+            os.getenv("THUMBNAIL_MEMORY_MAX_ENTRIES", str(thumbnail_service.DEFAULT_MAX_MEMORY_ENTRIES))
+        ),
+        max_disk_entries=int(os.getenv("THUMBNAIL_DISK_MAX_ENTRIES", str(thumbnail_service.DEFAULT_MAX_DISK_ENTRIES))),
+        max_age_seconds=int(os.getenv("THUMBNAIL_MAX_AGE_SECONDS", str(thumbnail_service.DEFAULT_MAX_AGE_SECONDS))),
+    )
+
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_profile_thumbnails(pictures, size=None):
+    """
+    Return `{picture: PNG bytes or None}` for the profile pictures on a page.
+
+    URLs are downloaded in parallel through the thumbnail cache, waiting at
+    most THUMBNAIL_PAGE_WAIT_SECONDS; slower ones show a placeholder until
+    the next rerun. `data:` URIs and image paths inside the app directory
+    are thumbnailed locally.
+    """
+    from services import thumbnail_service
+
+    size = size or thumbnail_service.DEFAULT_SIZE
+    pictures = [picture for picture in dict.fromkeys(pictures) if picture]
+    remote = [picture for picture in pictures if thumbnail_service.is_remote_image(picture)]
+    results = {}
+    try:
+        timeout = float(os.getenv("THUMBNAIL_PAGE_WAIT_SECONDS", str(thumbnail_service.DEFAULT_PAGE_WAIT_SECONDS)))
+        results.update(get_thumbnail_cache().get_many(remote, size, timeout=timeout))
+    except Exception as exc:
+        logger.error(f"Profil resmi alma hatası: {exc}")
+    for picture in pictures:
+        if picture not in results and picture not in remote:
+            results[picture] = thumbnail_service.local_thumbnail(picture, APP_DIR, size)
+    return results
+
+
 def get_all_orders():
     """Return all orders."""
     try:
@@ -169,6 +493,34 @@ def get_all_orders():
         return []
 
 
+def get_orders_table_page(page_size=50, cursor=None, direction="next"):
+    """Return one page of orders as a display-ready DataFrame with next/previous cursors."""
+    from services import order_table_service
+
+    try:
+        return order_table_service.get_orders_table_page(
+            _require_db(), page_size=page_size, cursor=cursor, direction=direction
+        )
+    except Exception as exc:
+        logger.error(f"Sipariş tablosu alma hatası: {exc}")
+        return {
+            "table": order_table_service.empty_table(order_table_service.ORDER_TABLE_FIELDS),
+            "next_cursor": None,
+            "prev_cursor": None,
+        }
+
+
+def get_active_orders_table():
+    """Return the live active orders as a display-ready DataFrame."""
+    from services import order_table_service
+
+    try:
+        return order_table_service.active_orders_table(get_live_active_orders())
+    except Exception as exc:
+        logger.error(f"Aktif sipariş tablosu oluşturma hatası: {exc}")
+        return order_table_service.empty_table(order_table_service.ACTIVE_ORDER_TABLE_FIELDS)
+
+
 def get_active_orders():
     """Return active orders."""
     try:
@@ -180,3 +532,234 @@ def get_active_orders():
         logger.error(f"Aktif sipariş listesi alma hatası: {exc}")
         return []
 
+
+def assign_orders_to_routes(assignments):
+    """Bulk write optimiser assignments back to the orders."""
+    try:
+        db = connect_to_mongodb()
+        if db is None:
+            return 0
+        modified = order_service.assign_orders_to_routes(db, assignments)
+        if modified:
+            cache_versions.bump_orders()
+        return modified
+    except Exception as exc:
+        logger.error(f"Sipariş araç ataması yazma hatası: {exc}")
+        return 0
+
+
+@st.cache_resource
+def get_distance_matrix_service():
+    """Return the process-wide cached distance matrix service configured from the environment."""
+    from routing import distance_matrix
+
+    if os.getenv("DISTANCE_BACKEND", "haversine").lower() == "osrm":
+        backend = distance_matrix.OsrmBackend(
+            os.getenv("OSRM_URL", distance_matrix.DEFAULT_OSRM_URL),
+            profile=os.getenv("OSRM_PROFILE", "driving"),
+            max_table_size=int(os.getenv("OSRM_MAX_TABLE_SIZE", str(distance_matrix.DEFAULT_MAX_TABLE_SIZE))),
+        )
+    else:
+        backend = distance_matrix.HaversineBackend()
+    return distance_matrix.DistanceMatrixService(
+        backend,
+        cache=distance_matrix.PairCache(os.getenv("DISTANCE_CACHE_PATH", "distance_cache.sqlite")),
+        precision=int(os.getenv("DISTANCE_CACHE_PRECISION", str(distance_matrix.DEFAULT_PRECISION))),
+    )
+
+
+def _empty_route_plan(error=None):
+    from routing import optimizer
+
+    result = optimizer.empty_plan()
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+def get_dispatch_clusters(n_clusters=None, max_cluster_size=None):
+    """
+    Group the active orders into dispatch clusters.
+
+    Returns `{"orders", "clusters", "unlocated_order_ids"}`: the order
+    snapshot the clusters' `indexes` point into, so routes can later be
+    planned for exactly these clusters, and the orders left out for lack of
+    coordinates.
+    """
+    from routing import clustering
+
+    try:
+        orders = get_live_active_orders()
+        return {
+            "orders": orders,
+            "clusters": clustering.cluster_orders(orders, n_clusters=n_clusters, max_cluster_size=max_cluster_size),
+            "unlocated_order_ids": clustering.unlocated_order_ids(orders),
+        }
+    except Exception as exc:
+        logger.error(f"Sevkiyat kümeleme hatası: {exc}")
+        return {"orders": [], "clusters": [], "unlocated_order_ids": []}
+
+
+def plan_active_order_routes(vehicles, orders=None, clusters=None, distance_matrix_m=None, duration_matrix_s=None,
+                             write_back=True, n_clusters=None, max_cluster_size=None, progress=None, **options):
+    """
+    Optimise routes for the active orders and optionally store the assignments.
+
+    Pass `orders` / `clusters` from `get_dispatch_clusters()` to route exactly
+    the clusters on screen. Without them the active orders are loaded and,
+    with `n_clusters` / `max_cluster_size`, clustered first. Clusters are
+    routed as separate sub-problems and `progress(done, total)` reports
+    finished clusters. On failure the result has no routes and an `error`
+    message.
+    """
+    from routing import clustering, optimizer
+
+    try:
+        if distance_matrix_m is None:
+            options.setdefault("distance_service", get_distance_matrix_service())
+        if orders is None:
+            if clusters is not None:
+                raise ValueError("Kümeler, oluşturuldukları sipariş listesiyle birlikte verilmelidir")
+            orders = get_active_orders()
+        if clusters is None and (n_clusters or max_cluster_size):
+            clusters = clustering.cluster_orders(orders, n_clusters=n_clusters, max_cluster_size=max_cluster_size)
+
+        if clusters is not None:
+            if not clusters:
+                return optimizer.empty_plan(clustering.unlocated_order_ids(orders))
+            result = optimizer.optimise_clusters(
+                orders, vehicles, clusters, distance_matrix_m=distance_matrix_m, duration_matrix_s=duration_matrix_s,
+                progress=progress, **options
+            )
+        else:
+            result = optimizer.optimise_orders(
+                orders, vehicles, distance_matrix_m=distance_matrix_m, duration_matrix_s=duration_matrix_s, **options
+            )
+            if progress is not None:
+                progress(1, 1)
+        if write_back:
+            result["summary"]["assigned"] = assign_orders_to_routes(result["assignments"])
+        return result
+    except Exception as exc:
+        logger.error(f"Rota planlama hatası: {exc}")
+        return _empty_route_plan(str(exc))
+
+
+@st.cache_resource
+def get_active_order_board():
+    """Return the process-wide live active order board, starting it on first use."""
+    from services import active_order_board
+
+    db = _require_db()
+    board = active_order_board.ActiveOrderBoard(
+        db,
+        poll_interval=float(os.getenv("ACTIVE_ORDERS_POLL_INTERVAL", "5")),
+        resync_interval=float(os.getenv("ACTIVE_ORDERS_RESYNC_INTERVAL", "300")),
+    )
+    return board.start()
+
+
+def get_live_active_orders():
+    """Return active orders from the live board, querying directly if it is unavailable."""
+    try:
+        return get_active_order_board().snapshot()
+    except Exception as exc:
+        logger.error(f"Canlı aktif sipariş panosu hatası: {exc}")
+        return get_active_orders()
+
+
+def get_orders_near(latitude, longitude, radius_m):
+    """Active orders within `radius_m` metres of a point, nearest first."""
+    try:
+        return get_active_order_board().orders_near(latitude, longitude, radius_m)
+    except Exception as exc:
+        logger.error(f"Canlı panodan yakın sipariş sorgusu hatası: {exc}")
+    try:
+        db = connect_to_mongodb()
+        if db is None:
+            return []
+        return order_service.get_orders_near(db, latitude, longitude, radius_m)
+    except Exception as exc:
+        logger.error(f"Yakın sipariş sorgusu hatası: {exc}")
+        return []
+
+
+def get_nearest_active_orders(latitude, longitude, k=10):
+    """The `k` active orders nearest to a point such as a vehicle position."""
+    try:
+        return get_active_order_board().nearest_orders(latitude, longitude, k)
+    except Exception as exc:
+        logger.error(f"Canlı panodan en yakın sipariş sorgusu hatası: {exc}")
+    try:
+        db = connect_to_mongodb()
+        if db is None:
+            return []
+        return order_service.get_nearest_orders(db, latitude, longitude, k)
+    except Exception as exc:
+        logger.error(f"En yakın sipariş sorgusu hatası: {exc}")
+        return []
+
+
+def get_orders_in_zone(polygon):
+    """Active orders inside a `[(latitude, longitude), ...]` polygon zone."""
+    try:
+        return get_active_order_board().orders_in_zone(polygon)
+    except Exception as exc:
+        logger.error(f"Canlı panodan bölge sipariş sorgusu hatası: {exc}")
+    try:
+        db = connect_to_mongodb()
+        if db is None:
+            return []
+        return order_service.get_orders_in_zone(db, polygon)
+    except Exception as exc:
+        logger.error(f"Bölge sipariş sorgusu hatası: {exc}")
+        return []
+
+
+def _stream(error_label, iterator_factory, *args, **kwargs):
+    """
+    Yield from a service iterator.
+
+    Errors (including a failed connection) are logged and re-raised, so a
+    consumer such as a CSV export can never mistake a truncated stream for
+    a complete one.
+    """
+    try:
+        yield from iterator_factory(_require_db(), *args, **kwargs)
+    except Exception as exc:
+        logger.error(f"{error_label}: {exc}")
+        raise
+
+
+def iter_user_orders(user_id, status=None, start_date=None, end_date=None, batch_size=500):
+    """Stream user orders in constant memory."""
+    return _stream(
+        "Sipariş listesi akış hatası",
+        order_service.iter_user_orders,
+        user_id,
+        status,
+        start_date,
+        end_date,
+        batch_size=batch_size,
+    )
+
+
+def iter_all_orders(batch_size=500):
+    """Stream all orders in constant memory."""
+    return _stream("Sipariş listesi akış hatası", order_service.iter_all_orders, batch_size=batch_size)
+
+
+def iter_active_orders(batch_size=500):
+    """Stream active orders in constant memory."""
+    return _stream("Aktif sipariş akış hatası", order_service.iter_active_orders, batch_size=batch_size)
+
+
+def iter_order_history(order_id=None, customer_id=None, batch_size=500):
+    """Stream order history records in constant memory."""
+    return _stream(
+        "Sipariş geçmişi akış hatası",
+        order_service.iter_order_history,
+        order_id=order_id,
+        customer_id=customer_id,
+        batch_size=batch_size,
+    )
@@ -0,0 +1,108 @@
+"""Connection pool statistics collected through PyMongo's monitoring API."""
+
+import threading
+import time
+
+from pymongo import monitoring
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Track connection pool usage for every server the client talks to.
+
+    Checkout wait time is measured on the requesting thread between the
+    "checkout started" and "checked out"/"checkout failed" events.
+    """
+
+    def __init__(self, max_wait_samples=1000):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._max_wait_samples = max_wait_samples
+        self._wait_samples_ms = []
+        self.checked_out = 0
+        self.total_checkouts = 0
+        self.checkout_failures = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pool_clears = 0
+
+    def _finish_wait(self):
+        started = getattr(self._local, "checkout_started", None)
+        self._local.checkout_started = None
+        if started is None:
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    def _record_wait(self, wait_ms):
+        if wait_ms is None:
+            return
+        self._wait_samples_ms.append(wait_ms)
+        if len(self._wait_samples_ms) > self._max_wait_samples:
+            del self._wait_samples_ms[: len(self._wait_samples_ms) - self._max_wait_samples]
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        wait_ms = self._finish_wait()
+        with self._lock:
+            self.checkout_failures += 1
+            self._record_wait(wait_ms)
+
+    def connection_checked_out(self, event):
+        wait_ms = self._finish_wait()
+        with self._lock:
+            self.checked_out += 1
+            self.total_checkouts += 1
+            self._record_wait(wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def snapshot(self):
+        """Return a point-in-time copy of the pool statistics."""
+        with self._lock:
+            waits = sorted(self._wait_samples_ms)
+            stats = {
+                "checked_out": self.checked_out,
+                "open_connections": self.connections_created - self.connections_closed,
+                "total_checkouts": self.total_checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+            }
+
+        if waits:
+            stats["wait_ms"] = {
+                "avg": sum(waits) / len(waits),
+                "p50": waits[len(waits) // 2],
+                "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+                "max": waits[-1],
+            }
+        else:
+            stats["wait_ms"] = {"avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return stats
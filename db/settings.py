@@ -0,0 +1,73 @@
+"""
+Process environment for the app and the database layer.
+
+Nothing here runs at import time: `initialize()` is called once from the app
+entry point before any page module is imported, and `mongo_settings()` /
+`app_settings()` load the environment on demand for scripts that use
+`db_helper` directly.
+"""
+
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONGO_DB_NAME = "RouteManagementDB"
+
+# setting -> (env variable, parser, default)
+APP_SETTINGS = {
+    "cache_ttl_seconds": ("CACHE_TTL_SECONDS", int, 3600),
+    "password_hash_method": ("PASSWORD_HASH_METHOD", str, "scrypt"),
+    "auth_cache_max_entries": ("AUTH_CACHE_MAX_ENTRIES", int, 1024),
+    "auth_cache_ttl_seconds": ("AUTH_CACHE_TTL_SECONDS", int, 300),
+}
+
+_lock = threading.Lock()
+_initialized = False
+_app_settings = None
+
+
+def load_environment():
+    """Load `.env` into the process environment once."""
+    global _initialized
+    with _lock:
+        if not _initialized:
+            load_dotenv()
+            _initialized = True
+
+
+def initialize():
+    """Load the environment, configure logging and read the app settings; safe to call on every rerun."""
+    load_environment()
+    logging.basicConfig(level=logging.INFO)
+    app_settings()
+
+
+def app_settings():
+    """Return the `APP_SETTINGS` values, read once from the (loaded) environment."""
+    global _app_settings
+    if _app_settings is None:
+        load_environment()
+        values = {}
+        for name, (env_name, parser, default) in APP_SETTINGS.items():
+            raw_value = os.getenv(env_name)
+            try:
+                values[name] = default if raw_value is None or raw_value.strip() == "" else parser(raw_value.strip())
+            except ValueError:
+                logger.warning(f"{env_name} geçersiz, varsayılan kullanılıyor: {raw_value}")
+                values[name] = default
+        _app_settings = values
+    return _app_settings
+
+
+def mongo_settings():
+    """Return `(uri, database name)`, raising if `MONGO_URI` is not set."""
+    load_environment()
+    uri = os.getenv("MONGO_URI")
+    if uri is None:
+        raise ValueError("MONGO_URI ortam değişkeni tanımlı değil.")
+    return uri, os.getenv("MONGO_DB_NAME", DEFAULT_MONGO_DB_NAME)
@@ -0,0 +1 @@
+# Routing package initialization file
@@ -0,0 +1,156 @@
+"""
+Dispatch clustering of active orders.
+
+Orders are embedded as `(x_m, y_m, t)` points: a local equirectangular
+projection of the delivery location plus the due time scaled by
+`time_weight_m_per_s`, so two orders an hour apart in due time are as far
+apart as two orders `3600 * time_weight_m_per_s` metres apart. Vectorised
+k-means groups them, and clusters above `max_cluster_size` are split again
+until every batch is small enough to route on its own.
+"""
+
+import math
+
+import numpy as np
+
+from routing.route_file import EARTH_RADIUS_M
+from routing.time_windows import orders_to_arrays
+
+
+DEFAULT_TIME_WEIGHT_M_PER_S = 0.1
+DEFAULT_MAX_ITERATIONS = 100
+
+
+def order_features(coords, due_s, time_weight_m_per_s=DEFAULT_TIME_WEIGHT_M_PER_S):
+    """`(n, 3)` clustering features from lat/lon coordinates and due times."""
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    radians = np.radians(coords)
+    latitude0 = radians[:, 0].mean() if len(coords) else 0.0
+    x = radians[:, 1] * np.cos(latitude0) * EARTH_RADIUS_M
+    y = radians[:, 0] * EARTH_RADIUS_M
+    # Open-ended windows (no due time) cluster by geography only.
+    due = np.asarray(due_s, dtype=np.float64)
+    finite = np.isfinite(due)
+    due = np.where(finite, due, np.median(due[finite]) if finite.any() else 0.0)
+    return np.column_stack((x, y, due * time_weight_m_per_s))
+
+
+def _squared_distances(points, centres):
+    return np.maximum(
+        (points ** 2).sum(axis=1)[:, None] + (centres ** 2).sum(axis=1)[None, :] - 2.0 * points @ centres.T, 0.0
+    )
+
+
+def kmeans(points, k, max_iterations=DEFAULT_MAX_ITERATIONS, seed=0):
+    """
+    Lloyd's k-means with k-means++ seeding.
+
+    Returns `(labels, centres)`; `k` is capped at the number of points.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    k = max(1, min(int(k), len(points)))
+    rng = np.random.default_rng(seed)
+
+    centres = np.empty((k, points.shape[1]))
+    centres[0] = points[rng.integers(len(points))]
+    closest = _squared_distances(points, centres[:1])[:, 0]
+    for index in range(1, k):
+        total = closest.sum()
+        choice = rng.choice(len(points), p=closest / total) if total > 0 else rng.integers(len(points))
+        centres[index] = points[choice]
+        closest = np.minimum(closest, _squared_distances(points, centres[index:index + 1])[:, 0])
+
+    labels = np.full(len(points), -1)
+    for _ in range(max_iterations):
+        distances = _squared_distances(points, centres)
+        new_labels = distances.argmin(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centres)
+        np.add.at(sums, labels, points)
+        empty = counts == 0
+        centres[~empty] = sums[~empty] / counts[~empty, None]
+        # Re-seed empty clusters at the points farthest from their centres.
+        if empty.any():
+            farthest = np.argsort(distances[np.arange(len(points)), labels])[::-1][: int(empty.sum())]
+            centres[empty] = points[farthest]
+    return labels, centres
+
+
+def _split_oversized(points, labels, max_cluster_size, seed):
+    labels = labels.copy()
+    next_label = int(labels.max()) + 1
+    pending = [label for label in np.unique(labels) if (labels == label).sum() > max_cluster_size]
+    while pending:
+        label = pending.pop()
+        members = np.flatnonzero(labels == label)
+        parts = math.ceil(len(members) / max_cluster_size)
+        sub_labels, _ = kmeans(points[members], parts, seed=seed)
+        if len(np.unique(sub_labels)) < 2:
+            # Identical points: split by position instead.
+            sub_labels = np.arange(len(members)) // max_cluster_size
+        for sub_label in np.unique(sub_labels)[1:]:
+            labels[members[sub_labels == sub_label]] = next_label
+            if (sub_labels == sub_label).sum() > max_cluster_size:
+                pending.append(next_label)
+            next_label += 1
+        if (sub_labels == np.unique(sub_labels)[0]).sum() > max_cluster_size:
+            pending.append(label)
+    return labels
+
+
+def unlocated_order_ids(orders):
+    """Ids of the orders `cluster_orders` leaves out because they have no coordinates."""
+    arrays = orders_to_arrays(orders)
+    missing = np.isnan(arrays["coords"]).any(axis=1)
+    return [arrays["order_ids"][index] for index in np.flatnonzero(missing)]
+
+
+def cluster_orders(orders, n_clusters=None, max_cluster_size=None, time_weight_m_per_s=DEFAULT_TIME_WEIGHT_M_PER_S,
+                   seed=0):
+    """
+    Group `get_active_orders()`-shaped orders into dispatch batches.
+
+    Either `n_clusters`, `max_cluster_size` or both can be given; with only
+    `max_cluster_size` the initial count is `ceil(n / max_cluster_size)`.
+    Orders without coordinates are left out (see `unlocated_order_ids`).
+    Returns a list of `{"cluster_id", "order_ids", "indexes", "centroid",
+    "size", "demand", "ready_s", "earliest_due_s", "due_s"}` dicts sorted by
+    `earliest_due_s`, where `indexes` point into `orders`, `ready_s` is the
+    batch's earliest ready time and `earliest_due_s` / `due_s` are its
+    earliest and latest due times.
+    """
+    arrays = orders_to_arrays(orders)
+    located = np.flatnonzero(~np.isnan(arrays["coords"]).any(axis=1))
+    if not len(located):
+        return []
+    if n_clusters is None:
+        n_clusters = math.ceil(len(located) / max_cluster_size) if max_cluster_size else 1
+
+    points = order_features(arrays["coords"][located], arrays["due_s"][located], time_weight_m_per_s)
+    labels, _ = kmeans(points, n_clusters, seed=seed)
+    if max_cluster_size:
+        labels = _split_oversized(points, labels, max_cluster_size, seed)
+
+    clusters = []
+    for label in np.unique(labels):
+        indexes = located[labels == label]
+        coords = arrays["coords"][indexes]
+        clusters.append(
+            {
+                "order_ids": [arrays["order_ids"][index] for index in indexes],
+                "indexes": indexes.tolist(),
+                "centroid": {"latitude": float(coords[:, 0].mean()), "longitude": float(coords[:, 1].mean())},
+                "size": len(indexes),
+                "demand": float(arrays["demand"][indexes].sum()),
+                "ready_s": float(arrays["ready_s"][indexes].min()),
+                "earliest_due_s": float(arrays["due_s"][indexes].min()),
+                "due_s": float(arrays["due_s"][indexes].max()),
+            }
+        )
+    clusters.sort(key=lambda cluster: (cluster["earliest_due_s"], cluster["ready_s"]))
+    for cluster_id, cluster in enumerate(clusters):
+        cluster["cluster_id"] = cluster_id
+    return clusters
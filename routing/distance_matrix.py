@@ -0,0 +1,234 @@
+"""
+Cached distance / duration matrices with pluggable backends.
+
+`DistanceMatrixService.matrix(coords)` returns `(distance_m, duration_s)`
+`(n, n)` arrays for lat/lon points. Pairs are keyed by coordinates rounded to
+`precision` decimals (5 ≈ 1 m) and stored in a SQLite file, so identical legs
+are only requested once across runs. Missing pairs are fetched in
+`/table`-sized blocks, and pairs already being fetched by another thread are
+waited on instead of requested again.
+"""
+
+import json
+import sqlite3
+import threading
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+from routing.route_file import haversine_m
+from routing.time_windows import DEFAULT_SPEED_MPS
+
+
+DEFAULT_PRECISION = 5
+DEFAULT_OSRM_URL = "https://router.project-osrm.org"
+# OSRM's default --max-table-size is 100 coordinates per request.
+DEFAULT_MAX_TABLE_SIZE = 100
+
+
+class HaversineBackend:
+    """Straight-line distances with durations at a constant speed."""
+
+    def __init__(self, speed_mps=DEFAULT_SPEED_MPS):
+        self.speed_mps = speed_mps
+        self.name = f"haversine:{speed_mps:g}"
+        self.max_table_size = None
+
+    def table(self, sources, destinations):
+        sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        distance = haversine_m(sources[:, None, 0], sources[:, None, 1], destinations[None, :, 0], destinations[None, :, 1])
+        return distance, distance / self.speed_mps
+
+
+class OsrmBackend:
+    """OSRM-compatible `/table` HTTP backend (public server or a local instance)."""
+
+    def __init__(self, base_url=DEFAULT_OSRM_URL, profile="driving", timeout=10.0, max_table_size=DEFAULT_MAX_TABLE_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.profile = profile
+        self.timeout = timeout
+        self.max_table_size = max_table_size
+        self.name = f"osrm:{self.base_url}/{profile}"
+
+    def table(self, sources, destinations):
+        sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        points = np.vstack((sources, destinations))
+        # OSRM takes lon,lat pairs.
+        coordinates = ";".join(f"{longitude:.6f},{latitude:.6f}" for latitude, longitude in points.tolist())
+        query = urllib.parse.urlencode(
+            {
+                "sources": ";".join(str(index) for index in range(len(sources))),
+                "destinations": ";".join(str(len(sources) + index) for index in range(len(destinations))),
+                "annotations": "distance,duration",
+            }
+        )
+        url = f"{self.base_url}/table/v1/{self.profile}/{coordinates}?{query}"
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            payload = json.load(response)
+        if payload.get("code") != "Ok":
+            raise RuntimeError(f"OSRM table error: {payload.get('code')} {payload.get('message', '')}".strip())
+        # Unroutable pairs come back as null.
+        distance = np.array(payload["distances"], dtype=np.float64)
+        duration = np.array(payload["durations"], dtype=np.float64)
+        return distance, duration
+
+
+class PairCache:
+    """Persistent `(source, destination) -> (distance_m, duration_s)` store in SQLite."""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS pairs ("
+                "backend TEXT NOT NULL, source TEXT NOT NULL, destination TEXT NOT NULL, "
+                "distance_m REAL, duration_s REAL, PRIMARY KEY (backend, source, destination))"
+            )
+
+    def get_many(self, backend, pairs):
+        """Return `{(source, destination): (distance_m, duration_s)}` for the cached pairs."""
+        found = {}
+        pairs = list(pairs)
+        with self._lock:
+            # Chunked to stay under SQLite's bound-parameter limit.
+            for start in range(0, len(pairs), 300):
+                chunk = pairs[start:start + 300]
+                placeholders = ",".join("(?, ?)" for _ in chunk)
+                rows = self._connection.execute(
+                    f"SELECT source, destination, distance_m, duration_s FROM pairs "
+                    f"WHERE backend = ? AND (source, destination) IN (VALUES {placeholders})",
+                    [backend, *(key for pair in chunk for key in pair)],
+                )
+                for source, destination, distance, duration in rows:
+                    found[(source, destination)] = (distance, duration)
+        return found
+
+    def put_many(self, backend, values):
+        """Store `{(source, destination): (distance_m, duration_s)}`."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?, ?)",
+                [(backend, source, destination, distance, duration)
+                 for (source, destination), (distance, duration) in values.items()],
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM pairs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def _nan_if_none(value):
+    return np.nan if value is None else value
+
+
+class DistanceMatrixService:
+    """Distance / duration matrices backed by a pair cache and a routing backend."""
+
+    def __init__(self, backend=None, cache=None, precision=DEFAULT_PRECISION):
+        self.backend = backend or HaversineBackend()
+        self.cache = cache if cache is not None else PairCache()
+        self.precision = precision
+        self.backend_calls = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def _key(self, latitude, longitude):
+        return f"{latitude:.{self.precision}f},{longitude:.{self.precision}f}"
+
+    def matrix(self, coords):
+        """Return `(distance_m, duration_s)` matrices for an `(n, 2)` lat/lon array."""
+        coords = np.round(np.asarray(coords, dtype=np.float64).reshape(-1, 2), self.precision)
+        keys = [self._key(latitude, longitude) for latitude, longitude in coords.tolist()]
+        unique_keys = list(dict.fromkeys(keys))
+        points = dict(zip(keys, coords.tolist()))
+
+        pairs = [(source, destination) for source in unique_keys for destination in unique_keys if source != destination]
+        values = self.cache.get_many(self.backend.name, pairs)
+        missing = [pair for pair in pairs if pair not in values]
+        if missing:
+            values.update(self._fetch(missing, points))
+
+        index = {key: position for position, key in enumerate(unique_keys)}
+        distance = np.zeros((len(unique_keys), len(unique_keys)))
+        duration = np.zeros((len(unique_keys), len(unique_keys)))
+        for (source, destination), (pair_distance, pair_duration) in values.items():
+            distance[index[source], index[destination]] = _nan_if_none(pair_distance)
+            duration[index[source], index[destination]] = _nan_if_none(pair_duration)
+
+        order = np.array([index[key] for key in keys], dtype=np.int64)
+        return distance[np.ix_(order, order)], duration[np.ix_(order, order)]
+
+    def _fetch(self, missing, points):
+        claimed = []
+        waiting = []
+        with self._lock:
+            for pair in missing:
+                event = self._inflight.get(pair)
+                if event is None:
+                    self._inflight[pair] = threading.Event()
+                    claimed.append(pair)
+                else:
+                    waiting.append((pair, event))
+
+        values = {}
+        try:
+            if claimed:
+                values.update(self._request_blocks(claimed, points))
+                self.cache.put_many(self.backend.name, values)
+        finally:
+            with self._lock:
+                for pair in claimed:
+                    self._inflight.pop(pair).set()
+
+        if waiting:
+            for _, event in waiting:
+                event.wait()
+            pairs = [pair for pair, _ in waiting]
+            found = self.cache.get_many(self.backend.name, pairs)
+            # The owning request failed; fetch the leftovers ourselves.
+            leftovers = [pair for pair in pairs if pair not in found]
+            if leftovers:
+                found.update(self._request_blocks(leftovers, points))
+                self.cache.put_many(self.backend.name, found)
+            values.update(found)
+        return values
+
+    def _request_blocks(self, pairs, points):
+        sources = list(dict.fromkeys(source for source, _ in pairs))
+        destinations = list(dict.fromkeys(destination for _, destination in pairs))
+        limit = self.backend.max_table_size
+        if limit is None:
+            source_chunk, destination_chunk = len(sources), len(destinations)
+        else:
+            source_chunk = max(1, min(len(sources), limit // 2))
+            destination_chunk = max(1, limit - source_chunk)
+
+        wanted = set(pairs)
+        values = {}
+        for source_start in range(0, len(sources), source_chunk):
+            block_sources = sources[source_start:source_start + source_chunk]
+            for destination_start in range(0, len(destinations), destination_chunk):
+                block_destinations = destinations[destination_start:destination_start + destination_chunk]
+                if not any((source, destination) in wanted for source in block_sources for destination in block_destinations):
+                    continue
+                distance, duration = self.backend.table(
+                    [points[key] for key in block_sources], [points[key] for key in block_destinations]
+                )
+                self.backend_calls += 1
+                for row, source in enumerate(block_sources):
+                    for column, destination in enumerate(block_destinations):
+                        if source != destination:
+                            values[(source, destination)] = (
+                                None if np.isnan(distance[row, column]) else float(distance[row, column]),
+                                None if np.isnan(duration[row, column]) else float(duration[row, column]),
+                            )
+        return values
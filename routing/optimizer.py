@@ -0,0 +1,610 @@
+"""
+Offline VRPTW optimiser for active orders.
+
+Orders from `get_active_orders()` are assigned to vehicles with a parallel
+cheapest-insertion construction, then improved with intra-route 2-opt and
+or-opt (run per route in worker processes) and inter-route relocate moves.
+Time windows and capacity are soft constraints weighted into the cost, so
+every located order is placed and violations are reported instead of
+dropped. Orders without coordinates are left out and reported as unassigned.
+
+Node 0 of every matrix is the depot; order `i` is node `i + 1`.
+"""
+
+import datetime
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from routing.route_file import haversine_m
+from routing.time_windows import DEFAULT_SPEED_MPS, evaluate_routes, orders_to_arrays, total_lateness
+
+
+DEFAULT_DEPOT = {"id": "cs5", "latitude": 39.751377, "longitude": 30.481888}
+DEFAULT_START_TIME = 8 * 3600
+
+# Cost = metres driven + weights * (seconds late, units over capacity).
+LATENESS_WEIGHT = 100.0
+OVERLOAD_WEIGHT = 10000.0
+IMPROVEMENT_EPSILON = 1e-6
+MAX_OR_OPT_SEGMENT = 3
+# Route positions evaluated per chunk of exact candidate costs (bounds memory per round).
+CANDIDATE_CELLS = 1 << 16
+# Workers are spawned, not forked: the Streamlit server holds thread locks
+# (live order board, pymongo monitors) that a forked child would inherit.
+POOL_CONTEXT = multiprocessing.get_context("spawn")
+
+# The problem a worker process improves routes for, set once by `_set_worker_problem`.
+_worker_problem = None
+
+
+def haversine_matrix_m(coords):
+    """Pairwise haversine distances for an `(n, 2)` lat/lon array."""
+    coords = np.asarray(coords, dtype=np.float64)
+    return haversine_m(coords[:, None, 0], coords[:, None, 1], coords[None, :, 0], coords[None, :, 1])
+
+
+def build_problem(orders, depot=None, distance_matrix_m=None, duration_matrix_s=None, speed_mps=DEFAULT_SPEED_MPS,
+                  start_time=DEFAULT_START_TIME, distance_service=None):
+    """
+    Build the array form of a routing problem.
+
+    `distance_matrix_m` / `duration_matrix_s` are `(n + 1, n + 1)` matrices
+    with the depot at index 0. Without them the matrices come from
+    `distance_service` (see `routing.distance_matrix`) when given, else
+    haversine distances with durations at `speed_mps`; unroutable pairs fall
+    back to the haversine estimate.
+    """
+    depot = depot or DEFAULT_DEPOT
+    arrays = orders_to_arrays(orders)
+    coords = np.vstack(([[depot["latitude"], depot["longitude"]]], arrays["coords"]))
+
+    if distance_matrix_m is None and distance_service is not None:
+        distance_matrix_m, service_duration_s = distance_service.matrix(coords)
+        if duration_matrix_s is None:
+            duration_matrix_s = service_duration_s
+    straight_m = haversine_matrix_m(coords)
+    if distance_matrix_m is None:
+        distance_matrix_m = straight_m
+    distance_matrix_m = np.where(np.isnan(distance_matrix_m), straight_m, distance_matrix_m)
+    if duration_matrix_s is None:
+        duration_matrix_s = distance_matrix_m / speed_mps
+    duration_matrix_s = np.where(np.isnan(duration_matrix_s), straight_m / speed_mps, duration_matrix_s)
+
+    def with_depot(values, depot_value):
+        return np.concatenate(([depot_value], values))
+
+    return {
+        "order_ids": arrays["order_ids"],
+        "coords": coords,
+        "distance_m": distance_matrix_m,
+        "duration_s": np.asarray(duration_matrix_s, dtype=np.float64),
+        "ready_s": with_depot(arrays["ready_s"], 0.0),
+        "due_s": with_depot(arrays["due_s"], np.inf),
+        "service_s": with_depot(arrays["service_s"], 0.0),
+        "demand": with_depot(arrays["demand"], 0.0),
+        "start_time": float(start_time),
+    }
+
+
+def empty_plan(unassigned_orders=()):
+    """An `optimise_orders` result with no routes."""
+    return {
+        "routes": [],
+        "assignments": [],
+        "summary": {
+            "total_distance_m": 0.0,
+            "late_orders": [],
+            "overloaded_vehicles": [],
+            "unassigned_orders": list(unassigned_orders),
+        },
+    }
+
+
+def _located_orders(orders, distance_matrix_m, duration_matrix_s):
+    """
+    Drop orders without coordinates, slicing full-problem matrices to match.
+
+    Returns `(orders, distance_matrix_m, duration_matrix_s, unlocated_order_ids)`.
+    """
+    missing = np.isnan(orders_to_arrays(orders)["coords"]).any(axis=1)
+    if not missing.any():
+        return orders, distance_matrix_m, duration_matrix_s, []
+    kept = np.flatnonzero(~missing)
+    nodes = np.concatenate(([0], kept + 1))
+    if distance_matrix_m is not None:
+        distance_matrix_m = np.asarray(distance_matrix_m)[np.ix_(nodes, nodes)]
+    if duration_matrix_s is not None:
+        duration_matrix_s = np.asarray(duration_matrix_s)[np.ix_(nodes, nodes)]
+    unlocated = [orders[index].get("order_id") for index in np.flatnonzero(missing)]
+    return [orders[index] for index in kept], distance_matrix_m, duration_matrix_s, unlocated
+
+
+def _pad(routes):
+    if isinstance(routes, np.ndarray):
+        return routes
+    width = max((len(route) for route in routes), default=0) or 1
+    padded = np.full((len(routes), width), -1, dtype=np.int64)
+    for row, route in enumerate(routes):
+        padded[row, : len(route)] = route
+    return padded
+
+
+def route_costs(problem, routes, capacity):
+    """
+    Cost of each candidate route.
+
+    `routes` is a list of node lists or an `(n, width)` array padded with -1;
+    `capacity` is a scalar or one value per candidate.
+    """
+    padded = _pad(routes)
+    lateness = total_lateness(
+        padded,
+        problem["duration_s"],
+        problem["ready_s"],
+        problem["due_s"],
+        problem["service_s"],
+        start_time=problem["start_time"],
+    )
+
+    mask = padded >= 0
+    nodes = np.where(mask, padded, 0)
+    overload = np.maximum(problem["demand"][nodes].sum(axis=1) - capacity, 0.0)
+    previous = np.concatenate((np.zeros((len(nodes), 1), dtype=np.int64), nodes[:, :-1]), axis=1)
+    legs = np.where(mask, problem["distance_m"][previous, nodes], 0.0)
+    last = nodes[np.arange(len(nodes)), np.maximum(mask.sum(axis=1) - 1, 0)]
+    distance = legs.sum(axis=1) + problem["distance_m"][last, 0]
+
+    return distance + LATENESS_WEIGHT * lateness + OVERLOAD_WEIGHT * overload
+
+
+def _insertion_candidates(routes, node, width):
+    """Every insertion of `node` into every route, as one padded array with route labels."""
+    blocks = []
+    labels = []
+    for index, route in enumerate(routes):
+        route = np.asarray(route, dtype=np.int64)
+        # Row r places `node` at position r; positions after it shift right by one.
+        rows = np.arange(len(route) + 1)[:, None]
+        positions = np.arange(len(route) + 1)[None, :]
+        block = np.full((len(route) + 1, width), -1, dtype=np.int64)
+        if len(route):
+            shifted = route[np.minimum(np.where(positions < rows, positions, positions - 1), len(route) - 1)]
+            block[:, : len(route) + 1] = np.where(positions == rows, node, shifted)
+        else:
+            block[:, 0] = node
+        blocks.append(block)
+        labels.append(np.full(len(route) + 1, index))
+    return np.vstack(blocks), np.concatenate(labels)
+
+
+def _two_opt_moves(distance, path):
+    """Distance deltas of every 2-opt reversal of route positions `i..j` (`path` has the depot at both ends)."""
+    length = len(path) - 2
+    i, j = np.triu_indices(length, k=1)
+    forward = np.concatenate(([0.0], np.cumsum(distance[path[1:-2], path[2:-1]])))
+    backward = np.concatenate(([0.0], np.cumsum(distance[path[2:-1], path[1:-2]])))
+    before, first, last, after = path[i], path[i + 1], path[j + 1], path[j + 2]
+    delta = (
+        distance[before, last] + distance[first, after] + (backward[j] - backward[i])
+        - distance[before, first] - distance[last, after] - (forward[j] - forward[i])
+    )
+    return delta, i, j
+
+
+def _or_opt_moves(distance, path, segment_length):
+    """Distance deltas of moving the segment at `i` to position `k` of the remaining route."""
+    length = len(path) - 2
+    rest_length = length - segment_length
+    i, k = np.meshgrid(np.arange(rest_length + 1), np.arange(rest_length + 1), indexing="ij")
+    i, k = i[i != k], k[i != k]
+    first, last = path[i + 1], path[i + segment_length]
+    before, after = path[i], path[i + segment_length + 1]
+    # Rest position q is route position q (q < i) or q + segment_length; -1 / rest_length are the depot.
+    rest_before = np.where(k - 1 < i, k - 1, k - 1 + segment_length)
+    rest_after = np.where(k < i, k, k + segment_length)
+    a = np.where(k > 0, path[np.maximum(rest_before, 0) + 1], path[0])
+    b = np.where(k < rest_length, path[np.minimum(rest_after, length - 1) + 1], path[-1])
+    delta = (
+        distance[before, after] - distance[before, first] - distance[last, after]
+        + distance[a, first] + distance[last, b] - distance[a, b]
+    )
+    return delta, i, k
+
+
+def _neighbourhood(problem, route):
+    """Every 2-opt and or-opt move of `route` as `(distance delta, kind, a, b)` arrays; kind 0 is 2-opt, s > 0 or-opt."""
+    path = np.concatenate(([0], route, [0]))
+    deltas, kinds, firsts, seconds = [], [], [], []
+    delta, i, j = _two_opt_moves(problem["distance_m"], path)
+    deltas.append(delta), kinds.append(np.zeros(len(delta), dtype=np.int64)), firsts.append(i), seconds.append(j)
+    for segment_length in range(1, min(MAX_OR_OPT_SEGMENT, len(route) - 1) + 1):
+        delta, i, k = _or_opt_moves(problem["distance_m"], path, segment_length)
+        deltas.append(delta), kinds.append(np.full(len(delta), segment_length)), firsts.append(i), seconds.append(k)
+    return tuple(np.concatenate(values) for values in (deltas, kinds, firsts, seconds))
+
+
+def _apply_moves(route, kinds, firsts, seconds):
+    """Candidate routes (one row per move) for a chunk of moves from `_neighbourhood`."""
+    positions = np.arange(len(route))[None, :]
+    kinds, firsts, seconds = kinds[:, None], firsts[:, None], seconds[:, None]
+    reversed_positions = np.where((positions >= firsts) & (positions <= seconds), firsts + seconds - positions, positions)
+    # Or-opt: new position p holds rest[p] before the segment, the segment, then rest[p - s].
+    segment = kinds
+    rest_index = np.where(positions < seconds, positions, positions - segment)
+    rest_positions = np.where(rest_index < firsts, rest_index, rest_index + segment)
+    in_segment = (positions >= seconds) & (positions < seconds + segment)
+    moved_positions = np.where(in_segment, firsts + positions - seconds, rest_positions)
+    return route[np.where(kinds == 0, reversed_positions, moved_positions)]
+
+
+def improve_route(problem, route, capacity, max_rounds=200, deadline=None):
+    """
+    First-improvement 2-opt / or-opt on a single route; returns (route, cost).
+
+    Moves are ranked by their O(1) distance delta. A move can only pay off if
+    that delta is below the route's current lateness penalty (capacity use is
+    unchanged by reordering), so only those are evaluated exactly, in chunks of
+    at most `CANDIDATE_CELLS` route positions. Stops at `deadline`
+    (`time.monotonic()` value).
+    """
+    route = np.asarray(route, dtype=np.int64)
+    cost = float(route_costs(problem, route[None, :], capacity)[0])
+    if len(route) < 2:
+        return route.tolist(), cost
+    chunk = max(1, CANDIDATE_CELLS // len(route))
+    for _ in range(max_rounds):
+        lateness = float(total_lateness(
+            route[None, :], problem["duration_s"], problem["ready_s"], problem["due_s"], problem["service_s"],
+            start_time=problem["start_time"],
+        )[0])
+        deltas, kinds, firsts, seconds = _neighbourhood(problem, route)
+        promising = np.flatnonzero(deltas < LATENESS_WEIGHT * lateness - IMPROVEMENT_EPSILON)
+        promising = promising[np.argsort(deltas[promising], kind="stable")]
+
+        improved = False
+        for offset in range(0, len(promising), chunk):
+            if deadline is not None and time.monotonic() >= deadline:
+                return route.tolist(), cost
+            moves = promising[offset:offset + chunk]
+            candidates = _apply_moves(route, kinds[moves], firsts[moves], seconds[moves])
+            costs = route_costs(problem, candidates, capacity)
+            best = int(np.argmin(costs))
+            if costs[best] < cost - IMPROVEMENT_EPSILON:
+                route, cost = candidates[best], float(costs[best])
+                improved = True
+                break
+        if not improved:
+            break
+    return route.tolist(), cost
+
+
+def _set_worker_problem(problem):
+    global _worker_problem
+    _worker_problem = problem
+
+
+def _improve_route_task(args):
+    route, capacity, time_left_s = args
+    # Monotonic clocks are per process, so workers get the remaining time, not the deadline.
+    return improve_route(_worker_problem, route, capacity, deadline=time.monotonic() + time_left_s)
+
+
+def _improve_routes(problem, routes, capacities, indexes, executor, deadline):
+    if executor is None:
+        results = (improve_route(problem, routes[index], capacities[index], deadline=deadline) for index in indexes)
+    else:
+        time_left_s = max(deadline - time.monotonic(), 0.0)
+        tasks = [(routes[index], capacities[index], time_left_s) for index in indexes]
+        results = executor.map(_improve_route_task, tasks)
+    for index, (route, _) in zip(indexes, results):
+        routes[index] = route
+
+
+def construct_routes(problem, capacities):
+    """Parallel cheapest insertion, orders taken by earliest due time."""
+    routes = [[] for _ in capacities]
+    costs = np.zeros(len(capacities))
+    capacities = np.asarray(capacities, dtype=np.float64)
+    node_count = len(problem["demand"]) - 1
+    order = sorted(range(1, node_count + 1), key=lambda node: (problem["due_s"][node], problem["ready_s"][node]))
+
+    for node in order:
+        width = max(len(route) for route in routes) + 1
+        candidates, labels = _insertion_candidates(routes, node, width)
+        deltas = route_costs(problem, candidates, capacities[labels]) - costs[labels]
+        best = int(np.argmin(deltas))
+        vehicle = int(labels[best])
+        routes[vehicle] = [int(value) for value in candidates[best] if value >= 0]
+        costs[vehicle] += deltas[best]
+    return routes
+
+
+def relocate_pass(problem, routes, capacities, deadline=None):
+    """Move single orders between routes while it lowers the total cost, stopping at `deadline`."""
+    capacities = np.asarray(capacities, dtype=np.float64)
+    costs = np.array([route_costs(problem, [route], capacities[index])[0] for index, route in enumerate(routes)])
+    changed = set()
+    for source in range(len(routes)):
+        position = 0
+        while position < len(routes[source]):
+            if deadline is not None and time.monotonic() >= deadline:
+                return changed
+            node = routes[source][position]
+            reduced = routes[source][:position] + routes[source][position + 1:]
+            saving = costs[source] - float(route_costs(problem, [reduced], capacities[source])[0])
+
+            targets = [target for target in range(len(routes)) if target != source]
+            width = max(len(routes[target]) for target in targets) + 1
+            candidates, labels = _insertion_candidates([routes[target] for target in targets], node, width)
+            labels = np.asarray(targets)[labels]
+            deltas = route_costs(problem, candidates, capacities[labels]) - costs[labels] - saving
+            best = int(np.argmin(deltas))
+            if deltas[best] >= -IMPROVEMENT_EPSILON:
+                position += 1
+                continue
+
+            target = int(labels[best])
+            routes[source] = reduced
+            costs[source] -= saving
+            routes[target] = [int(value) for value in candidates[best] if value >= 0]
+            costs[target] += deltas[best] + saving
+            changed.update((source, target))
+    return changed
+
+
+def solve(problem, capacities, workers=None, time_limit_s=30.0):
+    """
+    Build and improve routes; returns a list of node lists, one per vehicle.
+
+    `workers` is the process count for per-route improvement (default: CPU
+    count; 1 runs in-process). The problem matrices are sent to each worker
+    once, when the pool starts. Construction always completes; improvement
+    stops once `time_limit_s` has elapsed.
+    """
+    deadline = time.monotonic() + time_limit_s
+    routes = construct_routes(problem, capacities)
+    workers = os.cpu_count() if workers is None else workers
+
+    executor = None
+    if workers and workers > 1 and len(routes) > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers, len(routes)), mp_context=POOL_CONTEXT,
+            initializer=_set_worker_problem, initargs=(problem,),
+        )
+    try:
+        pending = [index for index, route in enumerate(routes) if len(route) > 1]
+        while pending and time.monotonic() < deadline:
+            _improve_routes(problem, routes, capacities, pending, executor, deadline)
+            if time.monotonic() >= deadline or len(routes) < 2:
+                break
+            changed = relocate_pass(problem, routes, capacities, deadline)
+            pending = [index for index in changed if len(routes[index]) > 1]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return routes
+
+
+def _route_stop(stop_id, latitude, longitude, node_detail):
+    return {
+        "id": stop_id,
+        "location": {"latitude": float(latitude), "longitude": float(longitude)},
+        "node_detail": node_detail,
+        "waypoints": [],
+        "visited": False,
+        "visit_time": None,
+    }
+
+
+def build_route_documents(problem, orders, vehicles, routes, depot=None, name_prefix="VRPTW"):
+    """
+    Convert solved node lists into `example_route.json`-format documents.
+
+    Returns `(route_documents, assignments)` where each assignment is
+    `{"order_id", "vehicle_id", "route_id"}`.
+    """
+    depot = depot or DEFAULT_DEPOT
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stamp = int(now.timestamp() * 1000)
+    documents = []
+    assignments = []
+
+    for vehicle, route in zip(vehicles, routes):
+        if not route:
+            continue
+        route_id = f"ev_route_{vehicle['vehicle_id']}_{stamp}"
+        delivery_points = []
+        for node in route:
+            order = orders[node - 1]
+            request = order.get("request") or {}
+            quantity = request.get("quantity") or 1
+            delivery_points.append(
+                _route_stop(
+                    order.get("order_id"),
+                    problem["coords"][node][0],
+                    problem["coords"][node][1],
+                    {
+                        "customer": {
+                            "requests": {
+                                "product_id": request.get("product_id"),
+                                "product_name": request.get("product_name"),
+                                "ready_time": float(problem["ready_s"][node]),
+                                "due_date": float(problem["due_s"][node]),
+                                "service_time": float(problem["service_s"][node]),
+                                "status": "Ordered",
+                                "load_information": {
+                                    "weight": float(problem["demand"][node]) / quantity,
+                                    "quantity": quantity,
+                                },
+                            }
+                        }
+                    },
+                )
+            )
+            assignments.append(
+                {"order_id": order.get("order_id"), "vehicle_id": vehicle["vehicle_id"], "route_id": route_id}
+            )
+
+        depot_stop = _route_stop(depot["id"], depot["latitude"], depot["longitude"], {"depot": ""})
+        documents.append(
+            {
+                "id": route_id,
+                "vehicle_id": vehicle["vehicle_id"],
+                "delivery_points": delivery_points,
+                "end_point": dict(depot_stop),
+                "name": f"{name_prefix}_{vehicle['vehicle_id']} - {now.strftime('%d.%m.%Y')}",
+                "source": "EV",
+                "start_point": dict(depot_stop),
+                "timestamp": now.isoformat().replace("+00:00", "Z"),
+            }
+        )
+    return documents, assignments
+
+
+def optimise_orders(orders, vehicles, depot=None, distance_matrix_m=None, duration_matrix_s=None,
+                    speed_mps=DEFAULT_SPEED_MPS, start_time=DEFAULT_START_TIME, workers=None, time_limit_s=30.0,
+                    distance_service=None):
+    """
+    Assign active orders to vehicles and build route documents.
+
+    `vehicles` is a list of `{"vehicle_id", "capacity"}`; capacity is in the
+    same unit as `request.demand`. Returns `{"routes", "assignments",
+    "summary"}` where `summary` reports distance, any late/overloaded routes
+    and the `unassigned_orders` left out for lack of coordinates.
+    """
+    orders, distance_matrix_m, duration_matrix_s, unlocated = _located_orders(
+        orders or [], distance_matrix_m, duration_matrix_s
+    )
+    if not orders or not vehicles:
+        return empty_plan(unlocated)
+
+    problem = build_problem(orders, depot, distance_matrix_m, duration_matrix_s, speed_mps, start_time, distance_service)
+    capacities = [float(vehicle.get("capacity", np.inf)) for vehicle in vehicles]
+    routes = solve(problem, capacities, workers=workers, time_limit_s=time_limit_s)
+    documents, assignments = build_route_documents(problem, orders, vehicles, routes, depot)
+
+    late_orders = []
+    overloaded = []
+    total_distance = 0.0
+    for vehicle, route, capacity in zip(vehicles, routes, capacities):
+        if not route:
+            continue
+        evaluation = evaluate_routes(
+            [route], problem["duration_s"], problem["ready_s"], problem["due_s"], problem["service_s"],
+            problem["demand"], capacity=capacity, start_time=problem["start_time"],
+        )
+        late_orders.extend(problem["order_ids"][node - 1] for node, late in zip(route, evaluation["lateness"][0]) if late > 0)
+        if evaluation["overload"][0] > 0:
+            overloaded.append(vehicle["vehicle_id"])
+        path = [0] + route + [0]
+        total_distance += float(problem["distance_m"][path[:-1], path[1:]].sum())
+
+    return {
+        "routes": documents,
+        "assignments": assignments,
+        "summary": {
+            "total_distance_m": total_distance,
+            "late_orders": late_orders,
+            "overloaded_vehicles": overloaded,
+            "unassigned_orders": unlocated,
+        },
+    }
+
+
+def allocate_vehicles(clusters, vehicles):
+    """
+    Split vehicles between clusters in proportion to demand.
+
+    Every cluster gets at least one vehicle, largest demand first; the rest go
+    to whichever cluster has the most demand left uncovered. Returns one list
+    of vehicle indexes per cluster.
+    """
+    if len(clusters) > len(vehicles):
+        raise ValueError(f"{len(clusters)} clusters need at least as many vehicles, got {len(vehicles)}")
+    by_capacity = sorted(range(len(vehicles)), key=lambda index: -float(vehicles[index].get("capacity", np.inf)))
+    by_demand = sorted(range(len(clusters)), key=lambda index: -clusters[index]["demand"])
+
+    allocation = [[] for _ in clusters]
+    uncovered = [cluster["demand"] for cluster in clusters]
+    for cluster_index, vehicle_index in zip(by_demand, by_capacity):
+        allocation[cluster_index].append(vehicle_index)
+        uncovered[cluster_index] -= float(vehicles[vehicle_index].get("capacity", np.inf))
+    for vehicle_index in by_capacity[len(clusters):]:
+        cluster_index = max(range(len(clusters)), key=lambda index: uncovered[index])
+        allocation[cluster_index].append(vehicle_index)
+        uncovered[cluster_index] -= float(vehicles[vehicle_index].get("capacity", np.inf))
+    return allocation
+
+
+def _optimise_cluster_task(args):
+    orders, vehicles, kwargs = args
+    return optimise_orders(orders, vehicles, workers=1, **kwargs)
+
+
+def optimise_clusters(orders, vehicles, clusters, depot=None, distance_matrix_m=None, duration_matrix_s=None,
+                      speed_mps=DEFAULT_SPEED_MPS, start_time=DEFAULT_START_TIME, workers=None, time_limit_s=30.0,
+                      distance_service=None, progress=None):
+    """
+    Route each cluster (see `routing.clustering.cluster_orders`) as its own sub-problem.
+
+    Vehicles are split between clusters with `allocate_vehicles` and the
+    sub-problems run in parallel worker processes. Full-problem matrices, when
+    given, are sliced per cluster. `progress(done, total)` is called as each
+    cluster finishes. Returns the same shape as `optimise_orders`; orders in
+    no cluster are reported as unassigned.
+    """
+    allocation = allocate_vehicles(clusters, vehicles)
+    depot = depot or DEFAULT_DEPOT
+    tasks = []
+    for cluster, vehicle_indexes in zip(clusters, allocation):
+        nodes = np.concatenate(([0], np.asarray(cluster["indexes"], dtype=np.int64) + 1))
+        cluster_orders = [orders[index] for index in cluster["indexes"]]
+        distance = None if distance_matrix_m is None else np.asarray(distance_matrix_m)[np.ix_(nodes, nodes)]
+        duration = None if duration_matrix_s is None else np.asarray(duration_matrix_s)[np.ix_(nodes, nodes)]
+        if distance is None and distance_service is not None:
+            problem = build_problem(cluster_orders, depot, speed_mps=speed_mps, distance_service=distance_service)
+            distance, duration = problem["distance_m"], problem["duration_s"]
+        tasks.append(
+            (
+                cluster_orders,
+                [vehicles[index] for index in vehicle_indexes],
+                {
+                    "depot": depot,
+                    "distance_matrix_m": distance,
+                    "duration_matrix_s": duration,
+                    "speed_mps": speed_mps,
+                    "start_time": start_time,
+                    "time_limit_s": time_limit_s,
+                },
+            )
+        )
+
+    workers = os.cpu_count() if workers is None else workers
+    results = [None] * len(tasks)
+    if workers and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=POOL_CONTEXT) as executor:
+            futures = {executor.submit(_optimise_cluster_task, task): index for index, task in enumerate(tasks)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if progress is not None:
+                    progress(done, len(tasks))
+    else:
+        for index, task in enumerate(tasks):
+            results[index] = _optimise_cluster_task(task)
+            if progress is not None:
+                progress(index + 1, len(tasks))
+
+    clustered = {index for cluster in clusters for index in cluster["indexes"]}
+    merged = empty_plan(order.get("order_id") for index, order in enumerate(orders) if index not in clustered)
+    for result in results:
+        merged["routes"].extend(result["routes"])
+        merged["assignments"].extend(result["assignments"])
+        merged["summary"]["total_distance_m"] += result["summary"]["total_distance_m"]
+        merged["summary"]["late_orders"].extend(result["summary"]["late_orders"])
+        merged["summary"]["overloaded_vehicles"].extend(result["summary"]["overloaded_vehicles"])
+        merged["summary"]["unassigned_orders"].extend(result["summary"]["unassigned_orders"])
+    return merged
@@ -0,0 +1,100 @@
+"""
+Waypoint simplification and Google encoded-polyline storage.
+
+`simplify` runs Douglas-Peucker on an `(n, 2)` lat/lon array with a tolerance
+in metres; distances use a local equirectangular projection, which is exact
+enough at street scale. `encode` / `decode` convert between lat/lon arrays
+and the encoded polyline format used by OSRM and Google Maps.
+"""
+
+import numpy as np
+
+from routing.route_file import EARTH_RADIUS_M
+
+
+DEFAULT_PRECISION = 5
+DEFAULT_TOLERANCE_M = 5.0
+
+
+def _project_m(points):
+    latitude0 = np.radians(points[:, 0].mean())
+    radians = np.radians(points)
+    return np.column_stack((radians[:, 1] * np.cos(latitude0), radians[:, 0])) * EARTH_RADIUS_M
+
+
+def _segment_distances(points, start, end):
+    """Distance from each point to the segment `start`-`end`, all in metres."""
+    direction = end - start
+    length_sq = float(direction @ direction)
+    if length_sq == 0.0:
+        return np.hypot(*(points - start).T)
+    t = np.clip(((points - start) @ direction) / length_sq, 0.0, 1.0)
+    return np.hypot(*(points - (start + t[:, None] * direction)).T)
+
+
+def simplify_mask(points, tolerance_m=DEFAULT_TOLERANCE_M):
+    """Boolean mask of the points Douglas-Peucker keeps; endpoints are always kept."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    keep = np.zeros(len(points), dtype=bool)
+    if len(points) <= 2:
+        keep[:] = True
+        return keep
+    keep[[0, -1]] = True
+
+    xy = _project_m(points)
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = _segment_distances(xy[start + 1:end], xy[start], xy[end])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def simplify(points, tolerance_m=DEFAULT_TOLERANCE_M):
+    """Return the Douglas-Peucker simplified `(k, 2)` lat/lon array."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return points[simplify_mask(points, tolerance_m)]
+
+
+def encode(points, precision=DEFAULT_PRECISION):
+    """Encode an `(n, 2)` lat/lon array as a Google encoded polyline string."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if not len(points):
+        return ""
+    values = np.round(points * 10 ** precision).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    zigzag = (deltas << 1) ^ (deltas >> 63)
+
+    chunks = []
+    for value in zigzag.tolist():
+        while value >= 0x20:
+            chunks.append((0x20 | (value & 0x1F)) + 63)
+            value >>= 5
+        chunks.append(value + 63)
+    return bytes(chunks).decode("ascii")
+
+
+def decode(text, precision=DEFAULT_PRECISION):
+    """Decode a Google encoded polyline string into an `(n, 2)` lat/lon array."""
+    values = []
+    value = 0
+    shift = 0
+    for byte in text.encode("ascii"):
+        byte -= 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = 0
+            shift = 0
+    if len(values) % 2:
+        raise ValueError("Invalid polyline: odd number of coordinates")
+    deltas = np.array(values, dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / 10 ** precision
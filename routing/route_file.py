@@ -0,0 +1,237 @@
+"""
+Route files in the `helper_route_app` JSON format.
+
+A route file holds a `start_point`, a list of `delivery_points` and an
+`end_point`; each stop carries the OSRM geometry of the leg leaving it as
+`waypoints: [{location: {latitude, longitude}}, ...]`. The helper app writes
+the final leg twice (on the last delivery point and on `end_point`), so
+distance totals skip the end point's waypoints by default.
+
+`Route` keeps all waypoints in one `(N, 2)` float array plus per-stop offsets
+instead of nested dicts; the non-geometry fields are kept untouched so
+`Route.to_dict()` reproduces the original document.
+
+Stops may instead carry their waypoints as a Google encoded `polyline`
+string (see `routing.polyline`); loading accepts either form per stop and
+`to_dict(waypoint_format=...)` writes either.
+"""
+
+import json
+
+import numpy as np
+
+
+EARTH_RADIUS_M = 6371008.8
+
+WAYPOINT_OBJECTS = "objects"
+WAYPOINT_POLYLINE = "polyline"
+
+START = "start"
+DELIVERY = "delivery"
+END = "end"
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Vectorised great-circle distance in metres between degree coordinates."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _location_pair(location):
+    return location["latitude"], location["longitude"]
+
+
+class Route:
+    """
+    Array-backed route.
+
+    Attributes:
+        stop_kinds: list of "start" / "delivery" / "end" per stop.
+        stop_ids: list of stop ids.
+        stop_coords: `(n_stops, 2)` array of stop `(latitude, longitude)`.
+        waypoints: `(n_waypoints, 2)` array of every stop's waypoints, concatenated.
+        waypoint_offsets: `(n_stops + 1,)` array; stop `i` owns
+            `waypoints[waypoint_offsets[i]:waypoint_offsets[i + 1]]`.
+        stop_fields: per-stop dicts of the remaining fields (node_detail, visited, ...).
+        metadata: top-level fields other than the stops (id, name, _id, ...).
+    """
+
+    __slots__ = ("stop_kinds", "stop_ids", "stop_coords", "waypoints", "waypoint_offsets", "stop_fields", "metadata")
+
+    def __init__(self, stop_kinds, stop_ids, stop_coords, waypoints, waypoint_offsets, stop_fields, metadata):
+        self.stop_kinds = stop_kinds
+        self.stop_ids = stop_ids
+        self.stop_coords = stop_coords
+        self.waypoints = waypoints
+        self.waypoint_offsets = waypoint_offsets
+        self.stop_fields = stop_fields
+        self.metadata = metadata
+
+    @classmethod
+    def from_dict(cls, document):
+        """Build a Route from a parsed route document."""
+        stops = []
+        if document.get("start_point") is not None:
+            stops.append((START, document["start_point"]))
+        stops.extend((DELIVERY, stop) for stop in document.get("delivery_points") or [])
+        if document.get("end_point") is not None:
+            stops.append((END, document["end_point"]))
+
+        from routing import polyline
+
+        stop_waypoints = []
+        for _, stop in stops:
+            if stop.get("polyline") is not None:
+                stop_waypoints.append(polyline.decode(stop["polyline"]))
+            else:
+                waypoints = stop.get("waypoints") or ()
+                stop_waypoints.append(
+                    np.fromiter(
+                        (value for waypoint in waypoints for value in _location_pair(waypoint["location"])),
+                        dtype=np.float64,
+                        count=len(waypoints) * 2,
+                    ).reshape(-1, 2)
+                )
+
+        offsets = np.zeros(len(stops) + 1, dtype=np.int64)
+        np.cumsum([len(points) for points in stop_waypoints], out=offsets[1:])
+        flat = np.concatenate(stop_waypoints) if stop_waypoints else np.empty((0, 2))
+
+        stop_coords = np.array(
+            [_location_pair(stop["location"]) for _, stop in stops], dtype=np.float64
+        ).reshape(len(stops), 2)
+
+        # Geometry is replaced by None placeholders so key order survives to_dict().
+        stop_fields = []
+        for _, stop in stops:
+            fields = dict(stop)
+            fields["location"] = None
+            for key in ("waypoints", "polyline"):
+                if key in fields:
+                    fields[key] = None
+            stop_fields.append(fields)
+
+        metadata = dict(document)
+        for key in ("start_point", "delivery_points", "end_point"):
+            if key in metadata:
+                metadata[key] = None
+
+        return cls(
+            stop_kinds=[kind for kind, _ in stops],
+            stop_ids=[stop.get("id") for _, stop in stops],
+            stop_coords=stop_coords,
+            waypoints=flat,
+            waypoint_offsets=offsets,
+            stop_fields=stop_fields,
+            metadata=metadata,
+        )
+
+    def __len__(self):
+        return len(self.stop_kinds)
+
+    def stop_waypoints(self, index):
+        """Return the `(k, 2)` waypoint view owned by stop `index`."""
+        return self.waypoints[self.waypoint_offsets[index]:self.waypoint_offsets[index + 1]]
+
+    def delivery_indexes(self):
+        return [index for index, kind in enumerate(self.stop_kinds) if kind == DELIVERY]
+
+    def leg_distances_m(self):
+        """Length of each stop's waypoint polyline, in metres, as an `(n_stops,)` array."""
+        points = self.waypoints
+        if len(points) < 2:
+            return np.zeros(len(self), dtype=np.float64)
+        segments = haversine_m(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+        cumulative = np.concatenate(([0.0], np.cumsum(segments)))
+
+        # cumulative[j] is the distance from point 0 to point j along the flat array;
+        # differencing within each stop's slice drops segments that cross stops.
+        starts = np.minimum(self.waypoint_offsets[:-1], len(points) - 1)
+        ends = self.waypoint_offsets[1:]
+        has_segment = ends - self.waypoint_offsets[:-1] >= 2
+        last_points = np.where(has_segment, ends - 1, starts)
+        return np.where(has_segment, cumulative[last_points] - cumulative[starts], 0.0)
+
+    def total_distance_m(self, include_end_leg=False):
+        """Total route length; the duplicated end-point leg is skipped unless requested."""
+        distances = self.leg_distances_m()
+        if not include_end_leg:
+            distances = distances[[kind != END for kind in self.stop_kinds]]
+        return float(distances.sum())
+
+    def stop_distances_m(self):
+        """Straight-line distance between consecutive stops, as an `(n_stops - 1,)` array."""
+        coords = self.stop_coords
+        return haversine_m(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+    def simplified(self, tolerance_m=5.0):
+        """Return a copy with each stop's waypoints reduced by Douglas-Peucker."""
+        from routing import polyline
+
+        kept = [self.stop_waypoints(index)[polyline.simplify_mask(self.stop_waypoints(index), tolerance_m)]
+                for index in range(len(self))]
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum([len(points) for points in kept], out=offsets[1:])
+        return Route(
+            stop_kinds=list(self.stop_kinds),
+            stop_ids=list(self.stop_ids),
+            stop_coords=self.stop_coords.copy(),
+            waypoints=np.concatenate(kept) if kept else np.empty((0, 2)),
+            waypoint_offsets=offsets,
+            stop_fields=[dict(fields) for fields in self.stop_fields],
+            metadata=dict(self.metadata),
+        )
+
+    def _stop_dict(self, index, waypoint_format=None):
+        from routing import polyline
+
+        latitude, longitude = self.stop_coords[index].tolist()
+        stop = {}
+        for key, value in self.stop_fields[index].items():
+            if key == "location":
+                value = {"latitude": latitude, "longitude": longitude}
+            elif key in ("waypoints", "polyline"):
+                if waypoint_format is not None:
+                    key = "polyline" if waypoint_format == WAYPOINT_POLYLINE else "waypoints"
+                if key == "polyline":
+                    value = polyline.encode(self.stop_waypoints(index))
+                else:
+                    value = [
+                        {"location": {"latitude": latitude, "longitude": longitude}}
+                        for latitude, longitude in self.stop_waypoints(index).tolist()
+                    ]
+            stop[key] = value
+        return stop
+
+    def to_dict(self, waypoint_format=None):
+        """
+        Rebuild the route document in the helper_route_app format.
+
+        `waypoint_format` is "objects" or "polyline"; by default each stop
+        keeps the form it was loaded with.
+        """
+        document = dict(self.metadata)
+        deliveries = []
+        for index, kind in enumerate(self.stop_kinds):
+            if kind == START:
+                document["start_point"] = self._stop_dict(index, waypoint_format)
+            elif kind == END:
+                document["end_point"] = self._stop_dict(index, waypoint_format)
+            else:
+                deliveries.append(self._stop_dict(index, waypoint_format))
+        if deliveries or "delivery_points" in document:
+            document["delivery_points"] = deliveries
+        return document
+
+
+def load_route(path):
+    """Load a route JSON file into a Route."""
+    with open(path, encoding="utf-8") as route_file:
+        return Route.from_dict(json.load(route_file))
+
+
+def dump_route(route, path, indent=2, waypoint_format=None):
+    """Write a Route back to a JSON file, keeping each stop's waypoint form unless told otherwise."""
+    with open(path, "w", encoding="utf-8") as route_file:
+        json.dump(route.to_dict(waypoint_format), route_file, indent=indent, ensure_ascii=False)
@@ -0,0 +1,143 @@
+"""
+In-memory grid index over lat/lon points.
+
+Points are bucketed into square cells of `cell_size_m` in a local
+equirectangular projection; a query only looks at the cells its bounding box
+touches and then filters those candidates exactly with haversine (radius /
+nearest) or ray casting (polygon).
+"""
+
+import numpy as np
+
+from routing.route_file import EARTH_RADIUS_M, haversine_m
+
+
+DEFAULT_CELL_SIZE_M = 500.0
+
+
+class SpatialIndex:
+    """
+    Grid index over `(n, 2)` lat/lon points.
+
+    Query methods return `(indexes, distances_m)` arrays (distance-sorted for
+    radius and nearest queries); `ids[indexes]` maps them back to the caller's
+    keys, e.g. order ids.
+    """
+
+    def __init__(self, points, ids=None, cell_size_m=DEFAULT_CELL_SIZE_M):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.ids = np.asarray(ids if ids is not None else np.arange(len(self.points)), dtype=object)
+        self.cell_size_m = float(cell_size_m)
+
+        self._latitude0 = np.radians(self.points[:, 0].mean()) if len(self.points) else 0.0
+        xy = self._project(self.points)
+        self._origin = xy.min(axis=0) if len(xy) else np.zeros(2)
+        cells = self._cells(xy)
+        self._n_rows = int(cells[:, 1].max()) + 1 if len(cells) else 1
+        self._n_columns = int(cells[:, 0].max()) + 1 if len(cells) else 1
+
+        keys = cells[:, 0] * self._n_rows + cells[:, 1]
+        self._order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self._order]
+        self._cell_keys, self._cell_starts = np.unique(sorted_keys, return_index=True)
+        self._cell_ends = np.append(self._cell_starts[1:], len(sorted_keys))
+        self._extent_m = float(np.ptp(xy, axis=0).max()) + self.cell_size_m if len(xy) else self.cell_size_m
+
+    @classmethod
+    def from_orders(cls, orders, cell_size_m=DEFAULT_CELL_SIZE_M):
+        """Index order documents by `location.latitude/longitude`, keyed by `order_id`."""
+        located = [
+            order for order in orders
+            if (order.get("location") or {}).get("latitude") is not None
+            and (order.get("location") or {}).get("longitude") is not None
+        ]
+        points = [(order["location"]["latitude"], order["location"]["longitude"]) for order in located]
+        return cls(points, ids=[order.get("order_id") for order in located], cell_size_m=cell_size_m)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _project(self, points):
+        radians = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        return np.column_stack((radians[:, 1] * np.cos(self._latitude0), radians[:, 0])) * EARTH_RADIUS_M
+
+    def _cells(self, xy):
+        return np.floor((xy - self._origin) / self.cell_size_m).astype(np.int64)
+
+    def _candidates(self, min_xy, max_xy):
+        """Indexes of the points in every cell overlapping the projected box."""
+        low = np.maximum(self._cells(min_xy[None, :])[0], 0)
+        high = np.minimum(self._cells(max_xy[None, :])[0], (self._n_columns - 1, self._n_rows - 1))
+        if np.any(high < low):
+            return np.empty(0, dtype=np.int64)
+        columns, rows = np.meshgrid(np.arange(low[0], high[0] + 1), np.arange(low[1], high[1] + 1), indexing="ij")
+        wanted = (columns * self._n_rows + rows).ravel()
+
+        positions = np.minimum(np.searchsorted(self._cell_keys, wanted), len(self._cell_keys) - 1)
+        positions = positions[self._cell_keys[positions] == wanted]
+        if not len(positions):
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self._order[start:end] for start, end in zip(self._cell_starts[positions], self._cell_ends[positions])])
+
+    def _distances(self, indexes, latitude, longitude):
+        return haversine_m(latitude, longitude, self.points[indexes, 0], self.points[indexes, 1])
+
+    def within_radius(self, latitude, longitude, radius_m):
+        """Points within `radius_m` of a point, nearest first."""
+        if not len(self.points):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        centre = self._project([(latitude, longitude)])[0]
+        # The projection is not exact away from latitude0, so pad the box slightly.
+        margin = radius_m * 1.01 + 1.0
+        candidates = self._candidates(centre - margin, centre + margin)
+        distances = self._distances(candidates, latitude, longitude)
+        inside = distances <= radius_m
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def nearest(self, latitude, longitude, k=1):
+        """The `k` points nearest to a point, nearest first."""
+        k = min(int(k), len(self.points))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        extent = self._extent_m
+        centre = self._project([(latitude, longitude)])[0]
+        distance_to_box = float(np.hypot(*np.maximum(np.abs(centre - self._origin - extent / 2) - extent / 2, 0.0)))
+        radius = self.cell_size_m + distance_to_box
+        while True:
+            indexes, distances = self.within_radius(latitude, longitude, radius)
+            if len(indexes) >= k or radius > distance_to_box + 2 * extent:
+                break
+            radius *= 2
+        if len(indexes) < k:
+            indexes = np.arange(len(self.points))
+            distances = self._distances(indexes, latitude, longitude)
+            order = np.argsort(distances, kind="stable")
+            indexes, distances = indexes[order], distances[order]
+        return indexes[:k], distances[:k]
+
+    def within_polygon(self, polygon):
+        """
+        Points inside a polygon given as `[(latitude, longitude), ...]` vertices.
+
+        The ring may be open or closed; edges are straight in lat/lon, which
+        matches dispatch zones drawn on a map.
+        """
+        vertices = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        if len(vertices) < 3 or not len(self.points):
+            return np.empty(0, dtype=np.int64)
+        projected = self._project(vertices)
+        candidates = self._candidates(projected.min(axis=0), projected.max(axis=0))
+        latitudes = self.points[candidates, 0]
+        longitudes = self.points[candidates, 1]
+
+        inside = np.zeros(len(candidates), dtype=bool)
+        previous = vertices[-1]
+        for vertex in vertices:
+            crosses = (vertex[0] > latitudes) != (previous[0] > latitudes)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                edge_longitude = vertex[1] + (latitudes - vertex[0]) * (previous[1] - vertex[1]) / (previous[0] - vertex[0])
+            inside ^= crosses & (longitudes < edge_longitude)
+            previous = vertex
+        return np.sort(candidates[inside])
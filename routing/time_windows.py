@@ -0,0 +1,263 @@
+"""
+Vectorised delivery time-window evaluation.
+
+Times are seconds. Order documents store `ready_time` / `due_date` as "HH:MM"
+strings (seconds since midnight after conversion) and route files store them
+as plain numbers; `service_time` is seconds in both.
+
+The schedule recurrence is sequential along a route but independent across
+routes, so candidates are evaluated as `(n_routes, n_positions)` arrays with
+one NumPy step per stop position.
+"""
+
+import datetime
+
+import numpy as np
+
+from routing.route_file import END
+
+
+DEFAULT_SPEED_MPS = 30 / 3.6
+
+
+def time_to_seconds(value, default=0.0):
+    """Convert "HH:MM", datetime.time/datetime or a number of seconds to seconds."""
+    if value is None or value == "":
+        return float(default)
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        return float(value.hour * 3600 + value.minute * 60 + value.second)
+    hours, _, minutes = str(value).partition(":")
+    return float(int(hours) * 3600 + int(minutes or 0) * 60)
+
+
+def evaluate_schedules(
+    travel_s,
+    ready_s,
+    due_s,
+    service_s,
+    demand,
+    capacity=np.inf,
+    start_time=0.0,
+    return_travel_s=None,
+    mask=None,
+):
+    """
+    Evaluate many schedules at once.
+
+    All per-stop inputs are `(n_routes, n_positions)` arrays (1-D inputs are
+    treated as a single route). `travel_s[:, k]` is the travel time into
+    position `k` from the previous stop (the depot for `k == 0`). `mask`
+    marks real stops in padded rows. The vehicle leaves the depot at
+    `start_time` loaded with the route's total demand.
+
+    Returns a dict of per-stop arrays (`arrival`, `service_start`, `waiting`,
+    `lateness`, `load`) and per-route arrays (`total_travel`, `total_waiting`,
+    `total_lateness`, `max_lateness`, `completion_time`, `overload`,
+    `late_stops`, `feasible`).
+    """
+    travel_s, ready_s, due_s, service_s, demand = (
+        np.atleast_2d(np.asarray(value, dtype=np.float64)) for value in (travel_s, ready_s, due_s, service_s, demand)
+    )
+    n_routes, n_positions = travel_s.shape
+    mask = np.ones((n_routes, n_positions), dtype=bool) if mask is None else np.atleast_2d(np.asarray(mask, dtype=bool))
+
+    # Padding must not move the clock or the load.
+    travel_s = np.where(mask, travel_s, 0.0)
+    service_s = np.where(mask, service_s, 0.0)
+    ready_s = np.where(mask, ready_s, -np.inf)
+    due_s = np.where(mask, due_s, np.inf)
+    demand = np.where(mask, demand, 0.0)
+
+    # Position-major copies keep each step on contiguous memory.
+    travel_t, ready_t, service_t = (np.ascontiguousarray(value.T) for value in (travel_s, ready_s, service_s))
+    arrival_t = np.empty((n_positions, n_routes))
+    service_start_t = np.empty((n_positions, n_routes))
+    clock = np.broadcast_to(np.asarray(start_time, dtype=np.float64), (n_routes,)).copy()
+    for position in range(n_positions):
+        np.add(clock, travel_t[position], out=arrival_t[position])
+        np.maximum(arrival_t[position], ready_t[position], out=service_start_t[position])
+        np.add(service_start_t[position], service_t[position], out=clock)
+    arrival = arrival_t.T
+    service_start = service_start_t.T
+
+    waiting = np.where(mask, service_start - arrival, 0.0)
+    lateness = np.where(mask, np.maximum(service_start - due_s, 0.0), 0.0)
+
+    total_demand = demand.sum(axis=1)
+    load = total_demand[:, None] - np.cumsum(demand, axis=1) + demand
+    load = np.where(mask, load, 0.0)
+    overload = np.maximum(total_demand - capacity, 0.0)
+
+    completion_time = clock
+    if return_travel_s is not None:
+        completion_time = clock + np.asarray(return_travel_s, dtype=np.float64)
+
+    total_lateness = lateness.sum(axis=1)
+    return {
+        "arrival": np.where(mask, arrival, np.nan),
+        "service_start": np.where(mask, service_start, np.nan),
+        "waiting": waiting,
+        "lateness": lateness,
+        "load": load,
+        "total_travel": travel_s.sum(axis=1) + (0.0 if return_travel_s is None else np.asarray(return_travel_s)),
+        "total_waiting": waiting.sum(axis=1),
+        "total_lateness": total_lateness,
+        "max_lateness": lateness.max(axis=1, initial=0.0),
+        "completion_time": completion_time,
+        "overload": overload,
+        "late_stops": (lateness > 0).sum(axis=1),
+        "feasible": (total_lateness == 0) & (overload == 0),
+    }
+
+
+def evaluate_routes(
+    routes,
+    travel_matrix,
+    ready_s,
+    due_s,
+    service_s,
+    demand,
+    capacity=np.inf,
+    depot=0,
+    start_time=0.0,
+    return_to_depot=True,
+):
+    """
+    Evaluate candidate routes over a node set with a travel-time matrix.
+
+    `routes` is an `(n_routes, max_len)` int array of node indexes padded at
+    the end with -1; the per-node arrays are indexed by the same node numbers as
+    `travel_matrix` and the routes start (and optionally end) at `depot`.
+    """
+    routes = np.atleast_2d(np.asarray(routes, dtype=np.int64))
+    travel_matrix = np.asarray(travel_matrix, dtype=np.float64)
+    mask = routes >= 0
+    nodes = np.where(mask, routes, depot)
+
+    # Padding sits at the end of each row and its travel is masked out.
+    previous = np.concatenate((np.full((len(nodes), 1), depot), nodes[:, :-1]), axis=1)
+    travel_s = travel_matrix[previous, nodes]
+
+    return_travel_s = None
+    if return_to_depot:
+        last_index = np.maximum(mask.sum(axis=1) - 1, 0)
+        last_node = np.where(mask.any(axis=1), nodes[np.arange(len(nodes)), last_index], depot)
+        return_travel_s = travel_matrix[last_node, depot]
+
+    ready_s, due_s, service_s, demand = (np.asarray(value, dtype=np.float64) for value in (ready_s, due_s, service_s, demand))
+    return evaluate_schedules(
+        travel_s,
+        ready_s[nodes],
+        due_s[nodes],
+        service_s[nodes],
+        demand[nodes],
+        capacity=capacity,
+        start_time=start_time,
+        return_travel_s=return_travel_s,
+        mask=mask,
+    )
+
+
+def total_lateness(routes, travel_matrix, ready_s, due_s, service_s, depot=0, start_time=0.0):
+    """
+    Lean variant of `evaluate_routes` returning only summed lateness per route.
+
+    Used in optimiser inner loops where per-stop outputs are not needed.
+    """
+    routes = np.atleast_2d(np.asarray(routes, dtype=np.int64))
+    mask_t = np.ascontiguousarray((routes >= 0).T)
+    nodes_t = np.ascontiguousarray(np.where(routes >= 0, routes, depot).T)
+    n_positions, n_routes = nodes_t.shape
+
+    clock = np.full(n_routes, float(start_time))
+    lateness = np.zeros(n_routes)
+    previous = np.full(n_routes, depot, dtype=np.int64)
+    for position in range(n_positions):
+        node = nodes_t[position]
+        valid = mask_t[position]
+        arrival = clock + travel_matrix[previous, node]
+        service_start = np.maximum(arrival, ready_s[node])
+        lateness += np.where(valid, np.maximum(service_start - due_s[node], 0.0), 0.0)
+        clock = np.where(valid, service_start + service_s[node], clock)
+        previous = np.where(valid, node, previous)
+    return lateness
+
+
+def orders_to_arrays(orders):
+    """
+    Extract per-order arrays from `get_active_orders()`-shaped documents.
+
+    Returns a dict with `order_ids`, `coords` (`(n, 2)` lat/lon), `ready_s`,
+    `due_s`, `service_s` and `demand`.
+    """
+    count = len(orders)
+    coords = np.empty((count, 2))
+    ready_s = np.empty(count)
+    due_s = np.empty(count)
+    service_s = np.empty(count)
+    demand = np.empty(count)
+    for index, order in enumerate(orders):
+        location = order.get("location") or {}
+        coords[index] = (location.get("latitude", np.nan), location.get("longitude", np.nan))
+        ready_s[index] = time_to_seconds(order.get("ready_time"), default=0)
+        due_s[index] = time_to_seconds(order.get("due_date"), default=24 * 3600)
+        service_s[index] = float(order.get("service_time") or 0)
+        demand[index] = float((order.get("request") or {}).get("demand") or 0)
+    return {
+        "order_ids": [order.get("order_id") for order in orders],
+        "coords": coords,
+        "ready_s": ready_s,
+        "due_s": due_s,
+        "service_s": service_s,
+        "demand": demand,
+    }
+
+
+def route_file_requests(route):
+    """Per-delivery `ready_s`, `due_s`, `service_s` and `demand` arrays of a route file."""
+    requests = [
+        ((route.stop_fields[index].get("node_detail") or {}).get("customer") or {}).get("requests") or {}
+        for index in route.delivery_indexes()
+    ]
+    demand = []
+    for request in requests:
+        load = request.get("load_information") or {}
+        demand.append(float(load.get("weight") or 0) * float(load.get("quantity") or 1))
+    return {
+        "ready_s": np.array([time_to_seconds(request.get("ready_time"), default=0) for request in requests]),
+        "due_s": np.array([time_to_seconds(request.get("due_date"), default=np.inf) for request in requests]),
+        "service_s": np.array([float(request.get("service_time") or 0) for request in requests]),
+        "demand": np.array(demand),
+    }
+
+
+def evaluate_route_file(route, speed_mps=DEFAULT_SPEED_MPS, capacity=np.inf, start_time=0.0):
+    """
+    Evaluate a loaded route file (see `routing.route_file.Route`).
+
+    Travel into each stop uses the waypoint geometry of the leg leaving the
+    previous stop, falling back to the straight-line distance when a leg has
+    no waypoints.
+    """
+    leg_m = route.leg_distances_m()
+    straight_m = route.stop_distances_m()
+    # into_s[j] is the travel time into stop j (0 for the first stop).
+    into_m = np.concatenate(([0.0], np.where(leg_m[:-1] > 0, leg_m[:-1], straight_m)))
+    into_s = into_m / speed_mps
+
+    travel_into_deliveries = into_s[np.array(route.delivery_indexes(), dtype=np.int64)]
+    return_travel_s = into_s[-1:] if route.stop_kinds and route.stop_kinds[-1] == END else None
+
+    requests = route_file_requests(route)
+    return evaluate_schedules(
+        travel_into_deliveries,
+        requests["ready_s"],
+        requests["due_s"],
+        requests["service_s"],
+        requests["demand"],
+        capacity=capacity,
+        start_time=start_time,
+        return_travel_s=return_travel_s,
+    )
@@ -0,0 +1,265 @@
+"""In-process live index of active orders fed by change streams or polling."""
+
+import datetime
+import logging
+import threading
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from routing.spatial_index import SpatialIndex
+from services.common import ACTIVE_ORDER_STATUSES
+
+
+logger = logging.getLogger(__name__)
+
+# Change streams need a replica set or sharded cluster.
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573, 40324}
+
+ACTIVE_ORDERS_FILTER = {"status": {"$in": list(ACTIVE_ORDER_STATUSES)}}
+
+
+def changed_since_filter(watermark):
+    """Orders written at or after `watermark`; the polling fallback's query."""
+    return {"updated_at": {"$gte": watermark}}
+
+
+def _as_utc(value):
+    """Aware UTC datetime for watermark comparisons; naive values are stored UTC by pymongo."""
+    if not isinstance(value, datetime.datetime):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+class ActiveOrderBoard:
+    """
+    Incrementally maintained view of active orders keyed by order_id and status.
+
+    `start()` opens `Orders.watch()` before loading the active set, so no
+    change between the load and the first event is lost; a daemon thread then
+    applies the changes. On standalone servers it falls back to polling
+    documents whose `updated_at` moved past the last seen value, with a
+    periodic full resync as a safety net.
+    """
+
+    def __init__(self, db, poll_interval=5.0, resync_interval=300.0):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.resync_interval = resync_interval
+        self.mode = None
+        self.version = 0
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._by_status = {status: set() for status in ACTIVE_ORDER_STATUSES}
+        self._order_ids_by_oid = {}
+        self._watermark = None
+        self._spatial_index = None
+        self._spatial_index_version = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -- index maintenance -------------------------------------------------
+
+    def _remove(self, order_id):
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return False
+        self._by_status.get(order.get("status"), set()).discard(order_id)
+        self._order_ids_by_oid.pop(order.get("_id"), None)
+        return True
+
+    def _apply(self, order):
+        updated_at = _as_utc(order.get("updated_at"))
+        if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+        order_id = order.get("order_id")
+        if order_id is None or self._orders.get(order_id) == order:
+            return False
+        changed = self._remove(order_id)
+        if order.get("status") in ACTIVE_ORDER_STATUSES:
+            self._orders[order_id] = order
+            self._by_status[order["status"]].add(order_id)
+            self._order_ids_by_oid[order.get("_id")] = order_id
+            changed = True
+        return changed
+
+    def _apply_many(self, orders):
+        with self._lock:
+            changed = False
+            for order in orders:
+                changed = self._apply(order) or changed
+            if changed:
+                self.version += 1
+
+    def _delete_by_oid(self, oid):
+        with self._lock:
+            order_id = self._order_ids_by_oid.get(oid)
+            if order_id is not None and self._remove(order_id):
+                self.version += 1
+
+    def resync(self):
+        """Reload the full active set from the database."""
+        orders = list(self.db.Orders.find(ACTIVE_ORDERS_FILTER))
+        with self._lock:
+            self._orders.clear()
+            self._order_ids_by_oid.clear()
+            for order_ids in self._by_status.values():
+                order_ids.clear()
+            for order in orders:
+                self._apply(order)
+            self.version += 1
+
+    # -- readers -------------------------------------------------------------
+
+    def snapshot(self, status=None):
+        """Return active orders (newest first) in the `get_active_orders` shape."""
+        with self._lock:
+            if status is None:
+                orders = list(self._orders.values())
+            else:
+                orders = [self._orders[order_id] for order_id in self._by_status.get(status, ())]
+        orders.sort(key=lambda order: str(order.get("created_at") or ""), reverse=True)
+        return [{key: value for key, value in order.items() if key != "_id"} for order in orders]
+
+    def get(self, order_id):
+        with self._lock:
+            order = self._orders.get(order_id)
+        if order is None:
+            return None
+        return {key: value for key, value in order.items() if key != "_id"}
+
+    def counts_by_status(self):
+        with self._lock:
+            return {status: len(order_ids) for status, order_ids in self._by_status.items()}
+
+    # -- spatial queries -----------------------------------------------------
+
+    def spatial_index(self):
+        """Return a SpatialIndex over the active orders, rebuilt only after changes."""
+        with self._lock:
+            if self._spatial_index_version != self.version:
+                self._spatial_index = SpatialIndex.from_orders(list(self._orders.values()))
+                self._spatial_index_version = self.version
+            return self._spatial_index
+
+    def _orders_by_ids(self, order_ids):
+        orders = []
+        with self._lock:
+            for order_id in order_ids:
+                order = self._orders.get(order_id)
+                if order is not None:
+                    orders.append({key: value for key, value in order.items() if key != "_id"})
+        return orders
+
+    def orders_near(self, latitude, longitude, radius_m):
+        """Active orders within `radius_m` of a point, nearest first."""
+        index = self.spatial_index()
+        indexes, _ = index.within_radius(latitude, longitude, radius_m)
+        return self._orders_by_ids(index.ids[indexes])
+
+    def nearest_orders(self, latitude, longitude, k=10):
+        """The `k` active orders nearest to a point (e.g. a vehicle), nearest first."""
+        index = self.spatial_index()
+        indexes, _ = index.nearest(latitude, longitude, k)
+        return self._orders_by_ids(index.ids[indexes])
+
+    def orders_in_zone(self, polygon):
+        """Active orders inside a `[(latitude, longitude), ...]` polygon zone."""
+        index = self.spatial_index()
+        return self._orders_by_ids(index.ids[index.within_polygon(polygon)])
+
+    # -- background watcher -------------------------------------------------
+
+    def start(self):
+        """Open the change stream, load the active set and start the background watcher thread."""
+        if self._thread is not None:
+            return self
+        stream = None
+        try:
+            stream = self._open_stream()
+        except OperationFailure as exc:
+            # Unsupported deployments switch to polling in the watcher thread.
+            if exc.code not in CHANGE_STREAM_UNSUPPORTED_CODES:
+                logger.warning(f"Change stream hatası: {exc}")
+        except PyMongoError as exc:
+            logger.warning(f"Change stream bağlantı hatası: {exc}")
+        self.resync()
+        self._thread = threading.Thread(target=self._run, args=(stream,), name="active-order-board", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, stream=None):
+        resume_token = None
+        while not self._stop.is_set():
+            try:
+                if stream is None:
+                    stream = self._open_stream(resume_token)
+                    if resume_token is None:
+                        # The new stream is already open, so nothing between this load and its first event is lost.
+                        self.resync()
+                self.mode = "change_stream"
+                resume_token = self._watch(stream, resume_token)
+            except OperationFailure as exc:
+                if exc.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    logger.info("Change stream desteklenmiyor, yoklama moduna geçiliyor")
+                    self.mode = "polling"
+                    self._poll()
+                    return
+                # Includes an expired resume token: start over with a fresh stream and a full reload.
+                logger.warning(f"Change stream hatası: {exc}")
+                resume_token = None
+                self._stop.wait(self.poll_interval)
+            except PyMongoError as exc:
+                logger.warning(f"Change stream bağlantı hatası: {exc}")
+                self._stop.wait(self.poll_interval)
+            finally:
+                if stream is not None:
+                    stream.close()
+                    stream = None
+
+    def _open_stream(self, resume_token=None):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        return self.db.Orders.watch(
+            pipeline, full_document="updateLookup", resume_after=resume_token, max_await_time_ms=1000
+        )
+
+    def _watch(self, stream, resume_token):
+        with stream:
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                # The post-batch token lets a reconnect resume even before the first event.
+                resume_token = stream.resume_token or resume_token
+                if change is None:
+                    continue
+                if change["operationType"] == "delete":
+                    self._delete_by_oid(change["documentKey"]["_id"])
+                elif change.get("fullDocument") is not None:
+                    self._apply_many([change["fullDocument"]])
+                else:
+                    self._delete_by_oid(change["documentKey"]["_id"])
+        return resume_token
+
+    def _poll(self):
+        elapsed = 0.0
+        while not self._stop.wait(self.poll_interval):
+            elapsed += self.poll_interval
+            try:
+                if elapsed >= self.resync_interval:
+                    elapsed = 0.0
+                    self.resync()
+                    continue
+                with self._lock:
+                    watermark = self._watermark
+                if watermark is None:
+                    self.resync()
+                    continue
+                self._apply_many(list(self.db.Orders.find(changed_since_filter(watermark))))
+            except PyMongoError as exc:
+                logger.warning(f"Aktif sipariş yoklama hatası: {exc}")
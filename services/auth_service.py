@@ -1,6 +1,30 @@
-from copy import deepcopy
+"""
+Login and password handling.
 
-from werkzeug.security import check_password_hash
+Passwords are stored as werkzeug hashes; legacy plaintext records still
+verify. After a successful full check, `authenticate_user` can rehash a
+password stored as plaintext or with other hash parameters. A
+`VerifiedCredentialCache` lets repeat logins skip the slow hash check
+within a short TTL.
+"""
+
+import functools
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo.errors import PyMongoError
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+def is_password_hash(stored_password):
+    """Return True when the stored value is a werkzeug password hash."""
+    return isinstance(stored_password, str) and (
+        stored_password.startswith("pbkdf2:") or stored_password.startswith("scrypt:")
+    )
 
 
 def verify_password(plain_password, stored_password):
@@ -11,10 +35,7 @@ def verify_password(plain_password, stored_password):
         return False
 
     try:
-        if isinstance(stored_password, str) and (
-            stored_password.startswith("pbkdf2:")
-            or stored_password.startswith("scrypt:")
-        ):
+        if is_password_hash(stored_password):
             return check_password_hash(stored_password, plain_password)
     except Exception:
         return plain_password == stored_password
@@ -22,25 +43,116 @@ def verify_password(plain_password, stored_password):
     return plain_password == stored_password
 
 
-def authenticate_user(db, user_id_or_email, password):
-    """Authenticate by user_id or email and return sanitized user document."""
-    user = db.Users.find_one(
-        {
-            "$or": [
-                {"user_id": user_id_or_email},
-                {"email": user_id_or_email},
-            ]
-        }
-    )
+@functools.lru_cache(maxsize=8)
+def _hash_method_prefix(method):
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def needs_rehash(stored_password, method):
+    """Return True when the stored password is not hashed with `method`'s parameters."""
+    if not is_password_hash(stored_password):
+        return True
+    return stored_password.split("$", 1)[0] != _hash_method_prefix(method)
+
+
+class VerifiedCredentialCache:
+    """
+    Bounded, TTL-based memory of recently verified logins.
+
+    Entries are keyed on the user id and a SHA-256 of the stored password
+    hash, so any password change (or rehash) misses the cache. Only an HMAC
+    of the plain password under a per-process random key is kept.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._secret = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, user_id, stored_password):
+        return (user_id, hashlib.sha256(stored_password.encode("utf-8")).hexdigest())
+
+    def _digest(self, key, plain_password):
+        message = f"{key[0]}\0{key[1]}\0{plain_password}".encode("utf-8")
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def check(self, user_id, stored_password, plain_password):
+        """Return True if this exact credential was verified within the TTL."""
+        if not plain_password or not is_password_hash(stored_password):
+            return False
+        key = self._key(user_id, stored_password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            digest, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False
+            self._entries.move_to_end(key)
+        return hmac.compare_digest(digest, self._digest(key, plain_password))
+
+    def add(self, user_id, stored_password, plain_password):
+        """Remember a credential that just passed full verification."""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0 or not is_password_hash(stored_password):
+            return
+        key = self._key(user_id, stored_password)
+        digest = self._digest(key, plain_password)
+        with self._lock:
+            self._entries[key] = (digest, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _rehash_password(db, user, plain_password, method):
+    """Store a fresh hash if the stored one is still unchanged; return the current hash."""
+    stored_password = user.get("password")
+    new_password = generate_password_hash(plain_password, method=method)
+    try:
+        result = db.Users.update_one(
+            {"_id": user["_id"], "password": stored_password},
+            {"$set": {"password": new_password}},
+        )
+    except PyMongoError:
+        return stored_password
+    return new_password if result.modified_count else stored_password
+
+
+def _login_filter(user_id_or_email):
+    return {"$or": [{"user_id": user_id_or_email}, {"email": user_id_or_email}]}
+
+
+def authenticate_user(db, user_id_or_email, password, credential_cache=None, rehash_method=None):
+    """
+    Authenticate by user_id or email and return sanitized user document.
+
+    With `credential_cache`, a repeat login skips the slow hash check. With
+    `rehash_method`, passwords stored as plaintext or with other hash
+    parameters are rehashed after a successful full verification.
+    """
+    user = db.Users.find_one(_login_filter(user_id_or_email))
 
     if user is None:
         return None
-    if not verify_password(password, user.get("password")):
-        return None
 
-    sanitized = deepcopy(user)
-    if "_id" in sanitized:
-        sanitized["_id"] = str(sanitized["_id"])
-    sanitized.pop("password", None)
-    return sanitized
+    stored_password = user.get("password")
+    cache_user_id = str(user.get("user_id") or user.get("_id"))
+    if credential_cache is None or not credential_cache.check(cache_user_id, stored_password, password):
+        if not verify_password(password, stored_password):
+            return None
+        if rehash_method and needs_rehash(stored_password, rehash_method):
+            stored_password = _rehash_password(db, user, password, rehash_method)
+        if credential_cache is not None:
+            credential_cache.add(cache_user_id, stored_password, password)
 
+    if "_id" in user:
+        user["_id"] = str(user["_id"])
+    user.pop("password", None)
+    return user
@@ -1,7 +1,9 @@
 import datetime
-from copy import deepcopy
 
 
+ORDER_STATUSES = ("waiting", "processing", "shipping", "completed", "cancelled")
+ACTIVE_ORDER_STATUSES = ("waiting", "processing", "shipping")
+
 STATUS_MAP_TR_TO_EN = {
     "bekliyor": "waiting",
     "hazirlaniyor": "processing",
@@ -11,6 +13,14 @@ STATUS_MAP_TR_TO_EN = {
     "iptal edildi": "cancelled",
 }
 
+STATUS_LABELS_TR = {
+    "waiting": "Bekliyor",
+    "processing": "Hazırlanıyor",
+    "shipping": "Yolda",
+    "completed": "Teslim Edildi",
+    "cancelled": "İptal Edildi",
+}
+
 
 def to_iso8601(value):
     """Safely convert datetime-like values to ISO8601 string."""
@@ -32,20 +42,40 @@ def to_time_string(value):
     return str(value)
 
 
+def geo_point(latitude, longitude):
+    """GeoJSON Point for a 2dsphere index, or None when either coordinate is missing."""
+    if latitude is None or longitude is None or latitude == "" or longitude == "":
+        return None
+    return {"type": "Point", "coordinates": [float(longitude), float(latitude)]}
+
+
+ORDER_DATETIME_FIELDS = ("created_at", "updated_at", "order_date")
+ORDER_TIME_FIELDS = ("ready_time", "due_date")
+
+
+def serialize_order_document_inplace(order):
+    """
+    Serialize the top-level fields Streamlit cannot render, mutating `order`.
+
+    Nested values are left as-is and shared with the caller; use this on
+    documents freshly read from a cursor.
+    """
+    if "_id" in order:
+        order["_id"] = str(order["_id"])
+    for field in ORDER_DATETIME_FIELDS:
+        if field in order:
+            order[field] = to_iso8601(order[field])
+    for field in ORDER_TIME_FIELDS:
+        if field in order:
+            order[field] = to_time_string(order[field])
+    return order
+
+
 def serialize_order_document(order):
     """Return a shallow-serialized copy safe for Streamlit rendering."""
-    serialized = deepcopy(order)
-    if "_id" in serialized:
-        serialized["_id"] = str(serialized["_id"])
-    if "created_at" in serialized:
-        serialized["created_at"] = to_iso8601(serialized["created_at"])
-    if "updated_at" in serialized:
-        serialized["updated_at"] = to_iso8601(serialized["updated_at"])
-    if "order_date" in serialized:
-        serialized["order_date"] = to_iso8601(serialized["order_date"])
-    if "ready_time" in serialized:
-        serialized["ready_time"] = to_time_string(serialized["ready_time"])
-    if "due_date" in serialized:
-        serialized["due_date"] = to_time_string(serialized["due_date"])
-    return serialized
+    return serialize_order_document_inplace(dict(order))
+
 
+def serialize_order_documents(orders):
+    """Serialize every document of an iterable (e.g. a cursor) in place."""
+    return [serialize_order_document_inplace(order) for order in orders]
@@ -0,0 +1,398 @@
+"""Index bootstrap and query-plan checks for the OpevaSu collections."""
+
+import datetime
+import logging
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE
+from pymongo.errors import OperationFailure
+
+from services import (
+    active_order_board,
+    auth_service,
+    order_service,
+    order_status_service,
+    profile_service,
+    stats_service,
+)
+from services.common import ACTIVE_ORDER_STATUSES
+
+
+logger = logging.getLogger(__name__)
+
+# collection -> list of (index name, key spec[, index options])
+INDEX_SPECS = {
+    "Orders": [
+        ("customer_status_created", [("customer_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)]),
+        ("customer_created", [("customer_id", ASCENDING), ("created_at", DESCENDING)]),
+        ("status_created", [("status", ASCENDING), ("created_at", DESCENDING)]),
+        ("created_order_id", [("created_at", DESCENDING), ("order_id", DESCENDING)]),
+        ("order_id", [("order_id", ASCENDING)], {"unique": True}),
+        ("geo", [("geo", GEOSPHERE)]),
+        ("assigned_route_status", [("assigned_route_id", ASCENDING), ("status", ASCENDING)]),
+        ("updated_at", [("updated_at", ASCENDING)]),
+    ],
+    "Users": [
+        ("user_id", [("user_id", ASCENDING)], {"unique": True}),
+        # `$gt: ""` matches only non-empty strings, so blank e-mails don't collide.
+        ("email", [("email", ASCENDING)], {"unique": True, "partialFilterExpression": {"email": {"$gt": ""}}}),
+        ("geo", [("geo", GEOSPHERE)]),
+        ("search_terms", [("search_terms", ASCENDING)]),
+    ],
+    "Products": [
+        ("product_id", [("product_id", ASCENDING)]),
+    ],
+    "OrderHistory": [
+        ("order_action_time", [("order_id", ASCENDING), ("action_time", DESCENDING)]),
+        ("customer_action_time", [("customer_id", ASCENDING), ("action_time", DESCENDING)]),
+    ],
+    "OrderDailyStats": [
+        ("day_customer_product", [("day", ASCENDING), ("customer_id", ASCENDING), ("product_id", ASCENDING)]),
+    ],
+}
+
+
+def _key_signature(keys):
+    return tuple(
+        (field, int(direction) if isinstance(direction, (int, float)) else direction)
+        for field, direction in keys
+    )
+
+
+def _has_duplicates(collection, keys, options):
+    """True when documents would violate a unique index on `keys`."""
+    pipeline = []
+    if options.get("partialFilterExpression"):
+        pipeline.append({"$match": options["partialFilterExpression"]})
+    pipeline += [
+        {"$group": {"_id": {str(position): f"${field}" for position, (field, _) in enumerate(keys)}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 1},
+    ]
+    return bool(list(collection.aggregate(pipeline, allowDiskUse=True)))
+
+
+def ensure_indexes(db):
+    """
+    Create the indexes the services rely on.
+
+    Safe to call on every startup: an index whose key pattern already exists
+    (under any name) is left untouched, except that a non-unique index is
+    rebuilt when the spec asks for `unique` and the collection holds no
+    duplicates. With duplicates present the existing (or a new plain) index is
+    kept and a warning is logged, so no index is dropped unless its unique
+    replacement can be built. Returns the names that were created.
+    """
+    created = []
+    for collection_name, specs in INDEX_SPECS.items():
+        collection = db[collection_name]
+        existing = {
+            _key_signature(info["key"]): (index_name, info)
+            for index_name, info in collection.index_information().items()
+        }
+        for name, keys, *options in specs:
+            options = options[0] if options else {}
+            current = existing.get(_key_signature(keys))
+            if current is not None and (not options.get("unique") or current[1].get("unique")):
+                continue
+            if options.get("unique") and _has_duplicates(collection, keys, options):
+                logger.warning(
+                    f"{collection_name}.{name} benzersiz indeksi oluşturulamadı: yinelenen kayıtlar var, "
+                    "mevcut indeks korunuyor"
+                )
+                if current is None:
+                    collection.create_index(keys, name=name)
+                    created.append(f"{collection_name}.{name}")
+                continue
+            if current is not None:
+                collection.drop_index(current[0])
+            try:
+                collection.create_index(keys, name=name, **options)
+            except OperationFailure:
+                # A duplicate written since the check; put the plain index back before failing.
+                if current is not None:
+                    collection.create_index(keys, name=current[0])
+                raise
+            created.append(f"{collection_name}.{name}")
+    return created
+
+
+# collection -> (latitude field, longitude field) copied into the GeoJSON `geo` field
+GEO_SOURCE_FIELDS = {
+    "Orders": ("location.latitude", "location.longitude"),
+    "Users": ("latitude", "longitude"),
+}
+
+
+def backfill_geo_points(db):
+    """
+    Add the GeoJSON `geo` field to documents written before it existed.
+
+    Only documents with numeric coordinates and no `geo` are touched.
+    Returns `{collection: modified count}`.
+    """
+    modified = {}
+    for collection_name, (latitude_field, longitude_field) in GEO_SOURCE_FIELDS.items():
+        result = db[collection_name].update_many(
+            {
+                "geo": {"$exists": False},
+                latitude_field: {"$type": "number"},
+                longitude_field: {"$type": "number"},
+            },
+            [{"$set": {"geo": {"type": "Point", "coordinates": [f"${longitude_field}", f"${latitude_field}"]}}}],
+        )
+        modified[collection_name] = result.modified_count
+    return modified
+
+
+def _find(collection, query, sort=None, limit=None):
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+    return command
+
+
+def _aggregate(collection, pipeline):
+    return {"aggregate": collection, "pipeline": pipeline, "cursor": {}}
+
+
+def get_query_shapes():
+    """
+    Return the query shapes issued by the service layer.
+
+    Each entry is `(name, collection, command)` where `command` is the body of
+    a `find` or `aggregate` command suitable for `explain`. Filters, sorts and
+    pipelines come from the same helpers the services query with, filled in
+    with placeholder values, so the plan check follows the real queries.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    today = now.date()
+    return [
+        (
+            "order_service.get_user_orders",
+            "Orders",
+            _find(
+                "Orders",
+                order_service._user_orders_query("_", start_date=today, end_date=today),
+                order_service.NEWEST_FIRST,
+            ),
+        ),
+        (
+            "order_service.get_user_orders[status]",
+            "Orders",
+            _find(
+                "Orders",
+                order_service._user_orders_query("_", status="waiting", start_date=today, end_date=today),
+                order_service.NEWEST_FIRST,
+            ),
+        ),
+        (
+            "order_service.get_order_count_by_status",
+            "Orders",
+            _aggregate("Orders", order_service._status_count_pipeline("_")),
+        ),
+        (
+            "order_service.get_order_counts_by_status_bulk",
+            "Orders",
+            _aggregate("Orders", order_service._bulk_status_count_pipeline(["_", "__"])),
+        ),
+        (
+            "order_service.get_order_history[order_id]",
+            "OrderHistory",
+            _find("OrderHistory", order_service._order_history_query(order_id="_"), order_service.HISTORY_NEWEST_FIRST),
+        ),
+        (
+            "order_service.get_order_history[customer_id]",
+            "OrderHistory",
+            _find(
+                "OrderHistory", order_service._order_history_query(customer_id="_"), order_service.HISTORY_NEWEST_FIRST
+            ),
+        ),
+        (
+            "order_status_service.transition_order_status",
+            "Orders",
+            _find(
+                "Orders",
+                order_status_service._transition_filter(
+                    {"order_id": "_"}, order_status_service.source_statuses("processing")
+                ),
+            ),
+        ),
+        (
+            "order_status_service.transition_orders_status[order_ids]",
+            "Orders",
+            _find(
+                "Orders",
+                order_status_service._transition_filter(
+                    order_status_service._orders_selector(order_ids=["_", "__"]),
+                    order_status_service.source_statuses("processing"),
+                ),
+            ),
+        ),
+        (
+            "order_status_service.transition_orders_status[route_id]",
+            "Orders",
+            _find(
+                "Orders",
+                order_status_service._transition_filter(
+                    order_status_service._orders_selector(route_id="_"),
+                    order_status_service.source_statuses("shipping"),
+                ),
+            ),
+        ),
+        (
+            "order_status_service.transition_orders_status[moved]",
+            "Orders",
+            _find(
+                "Orders",
+                order_status_service._moved_filter(order_status_service._orders_selector(route_id="_"), "_"),
+            ),
+        ),
+        (
+            "order_service.get_product_by_id",
+            "Products",
+            _find("Products", {"product_id": "_"}),
+        ),
+        (
+            "order_service.get_all_orders",
+            "Orders",
+            _find("Orders", {}, order_service.NEWEST_FIRST),
+        ),
+        (
+            "order_service.get_orders_page",
+            "Orders",
+            _find(
+                "Orders",
+                order_service.order_page_filter(cursor=(now, "_")),
+                order_service.order_page_sort(),
+                limit=51,
+            ),
+        ),
+        (
+            "order_service.get_active_orders",
+            "Orders",
+            _find("Orders", order_service._status_filter(ACTIVE_ORDER_STATUSES), order_service.NEWEST_FIRST),
+        ),
+        (
+            "active_order_board.resync",
+            "Orders",
+            _find("Orders", active_order_board.ACTIVE_ORDERS_FILTER),
+        ),
+        (
+            "active_order_board.poll",
+            "Orders",
+            _find("Orders", active_order_board.changed_since_filter(now)),
+        ),
+        (
+            "order_service.get_orders_near",
+            "Orders",
+            _find("Orders", order_service._orders_near_query(0.0, 0.0, 1000)),
+        ),
+        (
+            "order_service.get_nearest_orders",
+            "Orders",
+            _find("Orders", order_service._orders_near_query(0.0, 0.0)),
+        ),
+        (
+            "order_service.get_orders_in_zone",
+            "Orders",
+            _find("Orders", order_service._orders_in_zone_query([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)])),
+        ),
+        (
+            "stats_service.get_daily_stats",
+            "OrderDailyStats",
+            _aggregate("OrderDailyStats", stats_service._daily_stats_pipeline("2000-01-01", "2000-01-31")),
+        ),
+        (
+            "stats_service.get_stats_breakdown",
+            "OrderDailyStats",
+            _aggregate("OrderDailyStats", stats_service._breakdown_pipeline("2000-01-01", "2000-01-31")),
+        ),
+        (
+            "auth_service.authenticate_user",
+            "Users",
+            _find("Users", auth_service._login_filter("_")),
+        ),
+        (
+            "profile_service.update_user_profile",
+            "Users",
+            _find("Users", {"user_id": "_"}),
+        ),
+        (
+            "profile_service.get_all_users",
+            "Users",
+            _find("Users", {}, profile_service.USERS_BY_ID),
+        ),
+        (
+            "profile_service.get_users_page",
+            "Users",
+            _find("Users", profile_service.users_page_filter(cursor="_"), profile_service.users_page_sort(), limit=21),
+        ),
+        (
+            "profile_service.get_users_page[search]",
+            "Users",
+            _find(
+                "Users",
+                profile_service.users_page_filter(cursor="_", search="müşteri ali"),
+                profile_service.users_page_sort(),
+                limit=21,
+            ),
+        ),
+        (
+            "profile_service.count_users[search]",
+            "Users",
+            _find("Users", profile_service._user_search_filter("müşteri")),
+        ),
+    ]
+
+
+def _has_collscan(node):
+    if isinstance(node, dict):
+        if node.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(value) for value in node.values())
+    if isinstance(node, list):
+        return any(_has_collscan(item) for item in node)
+    return False
+
+
+def check_query_plans(db):
+    """
+    Run `explain` on every service query shape.
+
+    Returns a list of `{"name", "collection", "collscan"}` reports; callers
+    treat any report with `collscan=True` as a missing-index regression.
+    """
+    reports = []
+    for name, collection_name, command in get_query_shapes():
+        plan = db.command({"explain": command, "verbosity": "queryPlanner"})
+        reports.append({"name": name, "collection": collection_name, "collscan": _has_collscan(plan)})
+    return reports
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    database = MongoClient(os.environ["MONGO_URI"])[os.getenv("MONGO_DB_NAME", "RouteManagementDB")]
+
+    for index_name in ensure_indexes(database):
+        print(f"created index {index_name}")
+    for collection_name, count in backfill_geo_points(database).items():
+        if count:
+            print(f"added geo to {count} {collection_name} documents")
+    search_terms_added = profile_service.backfill_search_terms(database)
+    if search_terms_added:
+        print(f"added search_terms to {search_terms_added} Users documents")
+
+    failures = 0
+    for report in check_query_plans(database):
+        status = "COLLSCAN" if report["collscan"] else "ok"
+        print(f"{status:8} {report['name']}")
+        failures += report["collscan"]
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,180 @@
+"""Bulk order import from CSV/JSON uploads."""
+
+import csv
+import datetime
+import io
+import json
+import uuid
+
+from services import order_service
+
+
+DEFAULT_LATITUDE = 39.7598
+DEFAULT_LONGITUDE = 30.5042
+DEFAULT_SERVICE_TIME = 120
+DEFAULT_UNIT_WEIGHT = 19
+
+IMPORT_COLUMNS = (
+    "order_id",
+    "customer_id",
+    "product_id",
+    "quantity",
+    "ready_time",
+    "due_date",
+    "service_time",
+    "notes",
+    "address",
+    "latitude",
+    "longitude",
+)
+
+
+def parse_order_rows(content, file_format):
+    """
+    Parse an uploaded CSV or JSON file into a list of flat row dicts.
+
+    JSON input is either a list of rows or `{"orders": [...]}`.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+
+    if file_format == "csv":
+        return [dict(row) for row in csv.DictReader(io.StringIO(content))]
+    if file_format == "json":
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get("orders", [])
+        if not isinstance(data, list):
+            raise ValueError("JSON içeriği bir sipariş listesi olmalıdır")
+        return data
+    raise ValueError(f"Desteklenmeyen dosya biçimi: {file_format}")
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _to_int(value, field):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError(f"'{field}' bir tam sayı olmalıdır") from None
+
+
+def _to_float(value, field):
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError(f"'{field}' sayısal olmalıdır") from None
+
+
+def _to_hhmm(value, field):
+    try:
+        return datetime.datetime.strptime(str(value).strip(), "%H:%M").strftime("%H:%M")
+    except ValueError:
+        raise ValueError(f"'{field}' SS:DD biçiminde olmalıdır") from None
+
+
+def build_order_from_row(row, users_by_id, products_by_id, now):
+    """
+    Build an order document shaped like `dashboard.simple_order_form` output.
+
+    Raises ValueError with a user-facing message when the row is unusable.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Her satır bir nesne olmalıdır")
+
+    customer_id = str(row.get("customer_id") or "").strip()
+    product_id = str(row.get("product_id") or "").strip()
+    user = users_by_id.get(customer_id)
+    product = products_by_id.get(product_id)
+    if user is None:
+        raise ValueError(f"Müşteri bulunamadı: {customer_id or '-'}")
+    if product is None:
+        raise ValueError(f"Ürün bulunamadı: {product_id or '-'}")
+
+    quantity = _to_int(row.get("quantity", 1), "quantity")
+    unit_weight = (product.get("weight") or {}).get("value", DEFAULT_UNIT_WEIGHT)
+    service_time = row.get("service_time")
+
+    latitude = row.get("latitude")
+    longitude = row.get("longitude")
+    address = row.get("address")
+
+    order_id = row.get("order_id")
+    if _blank(order_id):
+        order_id = f"order_{now.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+    return {
+        "order_id": str(order_id).strip(),
+        "customer_id": customer_id,
+        "task_id": f"task_{now.strftime('%Y%m%d')}_{uuid.uuid4().hex[:6]}",
+        "location": {
+            "address": user.get("address", "") if _blank(address) else str(address),
+            "latitude": _to_float(
+                user.get("latitude", DEFAULT_LATITUDE) if _blank(latitude) else latitude, "latitude"
+            ),
+            "longitude": _to_float(
+                user.get("longitude", DEFAULT_LONGITUDE) if _blank(longitude) else longitude, "longitude"
+            ),
+        },
+        "ready_time": _to_hhmm(row.get("ready_time") or "09:00", "ready_time"),
+        "due_date": _to_hhmm(row.get("due_date") or "10:00", "due_date"),
+        "service_time": DEFAULT_SERVICE_TIME if _blank(service_time) else _to_int(service_time, "service_time"),
+        "request": {
+            "product_id": product["product_id"],
+            "product_name": product.get("name"),
+            "notes": row.get("notes") or "",
+            "quantity": quantity,
+            "demand": quantity * unit_weight,
+        },
+        "status": "waiting",
+        "change_log": [],
+        "assigned_vehicle": None,
+        "assigned_route_id": None,
+        "priority_level": 0,
+        "total_price": product.get("price", 0) * quantity,
+    }
+
+
+def import_orders(db, rows, batch_size=order_service.DEFAULT_BULK_BATCH_SIZE, progress=None):
+    """
+    Build, validate and bulk-insert orders from parsed rows.
+
+    Returns `{"inserted", "failed"}` where each failure carries the 1-based
+    `row` number of the uploaded file, the `order_id` (if known) and `error`.
+    `progress(done, total)` reports the valid orders written so far.
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+    customer_ids = sorted(
+        {str(row.get("customer_id") or "").strip() for row in rows if isinstance(row, dict)} - {""}
+    )
+    users_by_id = {
+        user.get("user_id"): user
+        for user in db.Users.find(
+            {"user_id": {"$in": customer_ids}},
+            {"_id": 0, "user_id": 1, "address": 1, "latitude": 1, "longitude": 1},
+        )
+    } if customer_ids else {}
+    products_by_id = {product["product_id"]: product for product in order_service.get_product_list(db)}
+
+    now = datetime.datetime.now()
+    orders = []
+    row_numbers = []
+    failed = []
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            orders.append(build_order_from_row(row, users_by_id, products_by_id, now))
+            row_numbers.append(row_number)
+        except ValueError as exc:
+            order_id = row.get("order_id") if isinstance(row, dict) else None
+            failed.append({"row": row_number, "order_id": order_id, "error": str(exc)})
+
+    result = order_service.bulk_save_orders(db, orders, batch_size=batch_size, progress=progress)
+    for failure in result["failed"]:
+        failed.append(
+            {"row": row_numbers[failure["index"]], "order_id": failure["order_id"], "error": failure["error"]}
+        )
+
+    failed.sort(key=lambda failure: failure["row"])
+    return {"inserted": result["inserted"], "failed": failed}
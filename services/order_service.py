@@ -1,7 +1,42 @@
 import datetime
-from copy import deepcopy
+import logging
 
-from services.common import STATUS_MAP_TR_TO_EN, serialize_order_document, to_time_string
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from services.common import (
+    ACTIVE_ORDER_STATUSES,
+    ORDER_STATUSES,
+    STATUS_MAP_TR_TO_EN,
+    geo_point,
+    serialize_order_document_inplace,
+    to_time_string,
+)
+from services import order_status_service, stats_service
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_STREAM_BATCH_SIZE = 500
+DEFAULT_BULK_BATCH_SIZE = 500
+DUPLICATE_KEY_ERROR = 11000
+
+
+# Sort orders used by the order listings (also explained by index_service).
+NEWEST_FIRST = [("created_at", -1)]
+HISTORY_NEWEST_FIRST = [("action_time", -1)]
+
+ORDER_LIST_PROJECTION = {
+    "_id": 0,
+    "order_id": 1,
+    "customer_id": 1,
+    "status": 1,
+    "request.product_name": 1,
+    "request.quantity": 1,
+    "total_price": 1,
+    "created_at": 1,
+}
 
 
 def get_product_list(db):
@@ -12,13 +47,8 @@ def get_product_by_id(db, product_id):
     return db.Products.find_one({"product_id": product_id}, {"_id": 0})
 
 
-def save_order(db, order_data):
-    """
-    Persist order after normalizing datetime/time fields.
-    """
-    payload = deepcopy(order_data)
-    now = datetime.datetime.now(datetime.timezone.utc)
-
+def _normalize_order_payload(order_data, now):
+    payload = dict(order_data)
     payload.update(
         {
             "created_at": now,
@@ -28,12 +58,166 @@ def save_order(db, order_data):
             "due_date": to_time_string(payload.get("due_date")),
         }
     )
+    location = payload.get("location")
+    if isinstance(location, dict):
+        try:
+            geo = geo_point(location.get("latitude"), location.get("longitude"))
+        except (TypeError, ValueError):
+            # Left for validate_order to report against this row.
+            geo = None
+        if geo is not None:
+            payload["geo"] = geo
+    return payload
+
+
+def save_order(db, order_data):
+    """
+    Persist order after normalizing datetime/time fields.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    payload = _normalize_order_payload(order_data, now)
 
     result = db.Orders.insert_one(payload)
+    _record_rollups(db, [payload])
     return result.acknowledged
 
 
-def get_user_orders(db, user_id, status=None, start_date=None, end_date=None):
+def _record_rollups(db, orders):
+    # Rollups are derived data; a failure here must not fail the order write.
+    try:
+        stats_service.record_orders_created(db, orders)
+    except PyMongoError as exc:
+        logger.warning(f"Günlük istatistik güncelleme hatası: {exc}")
+
+
+def _parse_hhmm(value):
+    try:
+        return datetime.datetime.strptime(value, "%H:%M").time()
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_order(payload):
+    """Return a list of validation error messages for a normalized order."""
+    errors = []
+    for field in ("order_id", "customer_id"):
+        if not payload.get(field):
+            errors.append(f"'{field}' alanı zorunludur")
+
+    request = payload.get("request")
+    if not isinstance(request, dict):
+        errors.append("'request' alanı zorunludur")
+    else:
+        if not request.get("product_id"):
+            errors.append("'request.product_id' alanı zorunludur")
+        quantity = request.get("quantity")
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            errors.append("'request.quantity' pozitif bir tam sayı olmalıdır")
+
+    ready_time = _parse_hhmm(payload.get("ready_time")) if payload.get("ready_time") else None
+    due_date = _parse_hhmm(payload.get("due_date")) if payload.get("due_date") else None
+    if payload.get("ready_time") and ready_time is None:
+        errors.append("'ready_time' SS:DD biçiminde olmalıdır")
+    if payload.get("due_date") and due_date is None:
+        errors.append("'due_date' SS:DD biçiminde olmalıdır")
+    if ready_time and due_date and due_date <= ready_time:
+        errors.append("Teslim saati, hazır olma saatinden sonra olmalıdır")
+
+    location = payload.get("location")
+    if location is not None and not isinstance(location, dict):
+        errors.append("'location' bir nesne olmalıdır")
+    elif location:
+        for field in ("latitude", "longitude"):
+            value = location.get(field)
+            if value is None or value == "":
+                continue
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                errors.append(f"'location.{field}' sayı olmalıdır")
+
+    geo = payload.get("geo")
+    if geo is not None:
+        coordinates = geo.get("coordinates") if isinstance(geo, dict) else None
+        if not (
+            isinstance(coordinates, (list, tuple))
+            and len(coordinates) == 2
+            and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in coordinates)
+        ):
+            errors.append("'geo' geçerli bir GeoJSON noktası olmalıdır")
+        else:
+            longitude, latitude = coordinates
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                errors.append("Konum enlem -90..90, boylam -180..180 aralığında olmalıdır")
+
+    status = payload.get("status", "waiting")
+    if status not in ORDER_STATUSES:
+        errors.append(f"Geçersiz durum: {status}")
+    return errors
+
+
+def bulk_save_orders(db, orders, batch_size=DEFAULT_BULK_BATCH_SIZE, progress=None):
+    """
+    Normalize, validate and insert many orders with unordered `insert_many`.
+
+    Invalid or rejected rows are reported in `failed` as
+    `{"index", "order_id", "error"}` without aborting the rest of the batch.
+    `progress(done, total)` is called after each written batch.
+    """
+    orders = orders if isinstance(orders, list) else list(orders)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    inserted = 0
+    failed = []
+    batch = []
+    batch_indexes = []
+
+    def flush():
+        nonlocal inserted
+        if not batch:
+            return
+        rejected = set()
+        try:
+            result = db.Orders.insert_many(batch, ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as exc:
+            details = exc.details
+            inserted += details.get("nInserted", 0)
+            for write_error in details.get("writeErrors", []):
+                position = write_error["index"]
+                rejected.add(position)
+                order_id = batch[position].get("order_id")
+                if write_error.get("code") == DUPLICATE_KEY_ERROR:
+                    error = f"Bu sipariş ID zaten kayıtlı: {order_id}"
+                else:
+                    error = write_error.get("errmsg", "Yazma hatası")
+                failed.append({"index": batch_indexes[position], "order_id": order_id, "error": error})
+        _record_rollups(db, [order for position, order in enumerate(batch) if position not in rejected])
+        if progress is not None:
+            progress(batch_indexes[-1] + 1, len(orders))
+        batch.clear()
+        batch_indexes.clear()
+
+    for index, order_data in enumerate(orders):
+        payload = _normalize_order_payload(order_data, now)
+        payload.setdefault("status", "waiting")
+        errors = validate_order(payload)
+        if errors:
+            failed.append({"index": index, "order_id": payload.get("order_id"), "error": "; ".join(errors)})
+            continue
+
+        batch.append(payload)
+        batch_indexes.append(index)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    if progress is not None:
+        progress(len(orders), len(orders))
+
+    failed.sort(key=lambda failure: failure["index"])
+    return {"inserted": inserted, "failed": failed}
+
+
+def _user_orders_query(user_id, status=None, start_date=None, end_date=None):
     query = {"customer_id": user_id}
 
     if status and status.lower() != "tümü":
@@ -51,64 +235,268 @@ def get_user_orders(db, user_id, status=None, start_date=None, end_date=None):
         )
     if date_filter:
         query["order_date"] = date_filter
+    return query
+
+
+def iter_user_orders(
+    db, user_id, status=None, start_date=None, end_date=None, batch_size=DEFAULT_STREAM_BATCH_SIZE
+):
+    """Yield the customer's serialized orders lazily, newest first."""
+    query = _user_orders_query(user_id, status, start_date, end_date)
+    cursor = db.Orders.find(query).sort(NEWEST_FIRST).batch_size(batch_size)
+    for order in cursor:
+        yield serialize_order_document_inplace(order)
 
-    orders = list(db.Orders.find(query).sort("created_at", -1))
-    return [serialize_order_document(order) for order in orders]
+
+def get_user_orders(db, user_id, status=None, start_date=None, end_date=None):
+    return list(iter_user_orders(db, user_id, status, start_date, end_date))
+
+
+def get_order(db, order_id, customer_id=None):
+    """Return one serialized order, optionally only if it belongs to `customer_id`."""
+    query = {"order_id": order_id}
+    if customer_id is not None:
+        query["customer_id"] = customer_id
+    order = db.Orders.find_one(query)
+    return serialize_order_document_inplace(order) if order is not None else None
+
+
+def _empty_status_counts():
+    return {"total": 0, "waiting": 0, "completed": 0, "by_status": dict.fromkeys(ORDER_STATUSES, 0)}
+
+
+def _add_status_count(counts, status, count):
+    counts["total"] += count
+    counts["by_status"][status] = counts["by_status"].get(status, 0) + count
+    if status in ACTIVE_ORDER_STATUSES:
+        counts["waiting"] += count
+    elif status == "completed":
+        counts["completed"] += count
+
+
+def _status_count_pipeline(user_id):
+    return [
+        {"$match": {"customer_id": user_id}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ]
+
+
+def _bulk_status_count_pipeline(user_ids):
+    return [
+        {"$match": {"customer_id": {"$in": list(user_ids)}}},
+        {
+            "$group": {
+                "_id": {"customer_id": "$customer_id", "status": "$status"},
+                "count": {"$sum": 1},
+            }
+        },
+    ]
 
 
 def get_order_count_by_status(db, user_id):
-    total = db.Orders.count_documents({"customer_id": user_id})
-    waiting = db.Orders.count_documents(
-        {"customer_id": user_id, "status": {"$in": ["waiting", "processing", "shipping"]}}
-    )
-    completed = db.Orders.count_documents({"customer_id": user_id, "status": "completed"})
-    return {"total": total, "waiting": waiting, "completed": completed}
+    """
+    Return order counts for one customer using a single `$group` aggregation.
 
+    `waiting` keeps its dashboard meaning (all active statuses); the per-status
+    buckets are under `by_status`.
+    """
+    counts = _empty_status_counts()
+    for bucket in db.Orders.aggregate(_status_count_pipeline(user_id)):
+        _add_status_count(counts, bucket["_id"], bucket["count"])
+    return counts
 
-def get_order_history(db, order_id=None, customer_id=None):
+
+def get_order_counts_by_status_bulk(db, user_ids):
+    """Return `{user_id: counts}` for many customers in one aggregation."""
+    user_ids = list(user_ids)
+    result = {user_id: _empty_status_counts() for user_id in user_ids}
+    if not user_ids:
+        return result
+
+    for bucket in db.Orders.aggregate(_bulk_status_count_pipeline(user_ids)):
+        key = bucket["_id"]
+        _add_status_count(result[key["customer_id"]], key["status"], bucket["count"])
+    return result
+
+
+def _order_history_query(order_id=None, customer_id=None):
     query = {}
     if order_id:
         query["order_id"] = order_id
     if customer_id:
         query["customer_id"] = customer_id
+    return query
 
-    history = list(db.OrderHistory.find(query).sort("action_time", -1))
-    for entry in history:
+
+def iter_order_history(db, order_id=None, customer_id=None, batch_size=DEFAULT_STREAM_BATCH_SIZE):
+    """Yield order history records lazily, newest first."""
+    query = _order_history_query(order_id, customer_id)
+    cursor = db.OrderHistory.find(query).sort(HISTORY_NEWEST_FIRST).batch_size(batch_size)
+    for entry in cursor:
         if "_id" in entry:
             entry["_id"] = str(entry["_id"])
-    return history
+        yield entry
 
 
-def update_order_status(db, order_id, new_status, updated_by):
-    now = datetime.datetime.now()
-    order_result = db.Orders.update_one(
-        {"order_id": order_id},
-        {
-            "$set": {
-                "status": new_status,
-                "updated_at": now,
-                "change_log": {
-                    "field": "status",
-                    "old_value": None,
-                    "new_value": new_status,
-                    "changed_at": now,
-                    "changed_by": updated_by,
-                },
-            }
-        },
+def get_order_history(db, order_id=None, customer_id=None):
+    return list(iter_order_history(db, order_id=order_id, customer_id=customer_id))
+
+
+def update_order_status(db, order_id, new_status, updated_by, expected_status=None):
+    """Move an order to `new_status` if the transition is allowed (see order_status_service)."""
+    return order_status_service.transition_order_status(
+        db, order_id, new_status, updated_by, expected_status=expected_status
+    )
+
+
+def update_order_status_and_get(db, order_id, new_status, updated_by, expected_status=None):
+    """Move an order to `new_status` and return the updated, serialized order (None if not moved)."""
+    order = order_status_service.transition_order_status_and_get(
+        db, order_id, new_status, updated_by, expected_status=expected_status
     )
-    return order_result.modified_count > 0
+    return serialize_order_document_inplace(order) if order is not None else None
+
+
+def assign_orders_to_routes(db, assignments):
+    """
+    Write optimiser output back as `assigned_vehicle` / `assigned_route_id`.
+
+    `assignments` is a list of `{"order_id", "vehicle_id", "route_id"}`.
+    Returns the number of orders modified.
+    """
+    if not assignments:
+        return 0
+    now = datetime.datetime.now(datetime.timezone.utc)
+    operations = [
+        UpdateOne(
+            {"order_id": assignment["order_id"]},
+            {
+                "$set": {
+                    "assigned_vehicle": assignment["vehicle_id"],
+                    "assigned_route_id": assignment["route_id"],
+                    "updated_at": now,
+                }
+            },
+        )
+        for assignment in assignments
+    ]
+    result = db.Orders.bulk_write(operations, ordered=False)
+    return result.modified_count
+
+
+def iter_all_orders(db, batch_size=DEFAULT_STREAM_BATCH_SIZE):
+    """Yield every order lazily, newest first, in the `get_all_orders` shape."""
+    cursor = db.Orders.find({}, {"_id": 0}).sort(NEWEST_FIRST).batch_size(batch_size)
+    yield from cursor
 
 
 def get_all_orders(db):
-    return list(db.Orders.find({}, {"_id": 0}).sort("created_at", -1))
+    return list(iter_all_orders(db))
+
+
+def iter_active_orders(db, batch_size=DEFAULT_STREAM_BATCH_SIZE):
+    """Yield active orders lazily, newest first, in the `get_active_orders` shape."""
+    cursor = (
+        db.Orders.find(_status_filter(ACTIVE_ORDER_STATUSES), {"_id": 0})
+        .sort(NEWEST_FIRST)
+        .batch_size(batch_size)
+    )
+    yield from cursor
 
 
 def get_active_orders(db):
-    return list(
-        db.Orders.find(
-            {"status": {"$in": ["waiting", "processing", "shipping"]}},
-            {"_id": 0},
-        ).sort("created_at", -1)
+    return list(iter_active_orders(db))
+
+
+def _status_filter(statuses):
+    return {} if statuses is None else {"status": {"$in": list(statuses)}}
+
+
+def _orders_near_query(latitude, longitude, radius_m=None, statuses=ACTIVE_ORDER_STATUSES):
+    query = _status_filter(statuses)
+    near = {"$geometry": geo_point(latitude, longitude)}
+    if radius_m is not None:
+        near["$maxDistance"] = float(radius_m)
+    query["geo"] = {"$nearSphere": near}
+    return query
+
+
+def get_orders_near(db, latitude, longitude, radius_m, statuses=ACTIVE_ORDER_STATUSES, limit=0):
+    """Orders within `radius_m` of a point, nearest first (2dsphere `$nearSphere`)."""
+    query = _orders_near_query(latitude, longitude, radius_m, statuses)
+    return list(db.Orders.find(query, {"_id": 0}).limit(limit))
+
+
+def get_nearest_orders(db, latitude, longitude, k=10, statuses=ACTIVE_ORDER_STATUSES):
+    """The `k` orders nearest to a point, nearest first."""
+    query = _orders_near_query(latitude, longitude, statuses=statuses)
+    return list(db.Orders.find(query, {"_id": 0}).limit(k))
+
+
+def _orders_in_zone_query(polygon, statuses=ACTIVE_ORDER_STATUSES):
+    ring = [[float(longitude), float(latitude)] for latitude, longitude in polygon]
+    if ring and ring[0] != ring[-1]:
+        ring.append(ring[0])
+    query = _status_filter(statuses)
+    query["geo"] = {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}}
+    return query
+
+
+def get_orders_in_zone(db, polygon, statuses=ACTIVE_ORDER_STATUSES):
+    """Orders inside a polygon zone given as `[(latitude, longitude), ...]` vertices."""
+    return list(db.Orders.find(_orders_in_zone_query(polygon, statuses), {"_id": 0}))
+
+
+def _order_page_cursor(order):
+    return (order.get("created_at"), order.get("order_id"))
+
+
+def order_page_filter(cursor=None, direction="next", query=None):
+    """Filter selecting the orders after (or before) a `(created_at, order_id)` cursor."""
+    conditions = [dict(query or {})]
+    if cursor is not None:
+        created_at, order_id = cursor
+        op = "$lt" if direction != "prev" else "$gt"
+        conditions.append(
+            {
+                "$or": [
+                    {"created_at": {op: created_at}},
+                    {"created_at": created_at, "order_id": {op: order_id}},
+                ]
+            }
+        )
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def order_page_sort(direction="next"):
+    sort_dir = -1 if direction != "prev" else 1
+    return [("created_at", sort_dir), ("order_id", sort_dir)]
+
+
+def get_orders_page(db, page_size=50, cursor=None, direction="next", query=None):
+    """
+    Return one keyset-paginated page of orders, newest first.
+
+    `cursor` is a `(created_at, order_id)` tuple taken from a previous page's
+    `next_cursor` / `prev_cursor`; `direction` is "next" or "prev".
+    """
+    forward = direction != "prev"
+    orders = list(
+        db.Orders.find(order_page_filter(cursor, direction, query), ORDER_LIST_PROJECTION)
+        .sort(order_page_sort(direction))
+        .limit(page_size + 1)
     )
 
+    has_more = len(orders) > page_size
+    orders = orders[:page_size]
+    if not forward:
+        orders.reverse()
+
+    has_next = has_more if forward else cursor is not None
+    has_prev = cursor is not None if forward else has_more
+
+    return {
+        "orders": orders,
+        "next_cursor": _order_page_cursor(orders[-1]) if orders and has_next else None,
+        "prev_cursor": _order_page_cursor(orders[0]) if orders and has_prev else None,
+    }
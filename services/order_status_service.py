@@ -0,0 +1,224 @@
+"""
+Order status transitions.
+
+A transition is a single conditional update filtered on the statuses allowed
+to move to the target (or on the caller's `expected_status`), so concurrent
+writers cannot both win and nothing is read first. The update appends a
+`change_log` entry whose `old_value` is taken from the document by the
+server, and the matching `OrderHistory` record is written in the same
+transaction when the deployment supports one (replica set or sharded
+cluster). On a standalone server there is no transaction: the status and its
+`change_log` entry still change together, but a crash before the history
+write leaves the order moved without an `OrderHistory` record; the order's
+`change_log` remains the authoritative trail in that case.
+"""
+
+import datetime
+import logging
+import uuid
+
+from pymongo import InsertOne, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from services import stats_service
+from services.common import ORDER_STATUSES
+
+
+logger = logging.getLogger(__name__)
+
+# current status -> statuses it may move to
+ALLOWED_TRANSITIONS = {
+    "waiting": ("processing", "cancelled"),
+    "processing": ("shipping", "cancelled"),
+    "shipping": ("completed",),
+    "completed": (),
+    "cancelled": (),
+}
+
+# Multi-document transactions need a replica set or sharded cluster.
+TRANSACTION_TOPOLOGIES = {"ReplicaSetWithPrimary", "Sharded", "LoadBalanced"}
+
+# Fields a moved order needs for its history record and rollups.
+MOVED_ORDER_PROJECTION = {**stats_service.ROLLUP_PROJECTION, "order_id": 1, "change_log": {"$slice": -1}}
+
+
+def source_statuses(new_status, expected_status=None):
+    """Statuses an order may be in to move to `new_status`."""
+    if new_status not in ORDER_STATUSES:
+        raise ValueError(f"Unknown order status: {new_status}")
+    sources = [status for status, targets in ALLOWED_TRANSITIONS.items() if new_status in targets]
+    if expected_status is not None:
+        sources = [status for status in sources if status == expected_status]
+    return sources
+
+
+def _orders_selector(order_ids=None, route_id=None):
+    return {"order_id": {"$in": list(order_ids)}} if order_ids is not None else {"assigned_route_id": route_id}
+
+
+def _transition_filter(selector, sources):
+    """Orders matched by `selector` that are still in one of the `sources` statuses."""
+    return {**selector, "status": {"$in": list(sources)}}
+
+
+def _moved_filter(selector, transition_id):
+    return {**selector, "last_transition_id": transition_id}
+
+
+def _transition_update(new_status, updated_by, now, transition_id=None):
+    # Pipeline update: "$status" / "$change_log" read the pre-update document.
+    # Older writers stored a single change_log dict; it becomes the first entry.
+    existing_log = {
+        "$cond": [
+            {"$isArray": "$change_log"},
+            "$change_log",
+            {"$cond": [{"$gt": ["$change_log", None]}, ["$change_log"], []]},
+        ]
+    }
+    entry = {
+        "field": "status",
+        "old_value": "$status",
+        "new_value": {"$literal": new_status},
+        "changed_at": now,
+        "changed_by": {"$literal": updated_by},
+    }
+    fields = {
+        "status": {"$literal": new_status},
+        "updated_at": now,
+        "change_log": {"$concatArrays": [existing_log, [entry]]},
+    }
+    if transition_id is not None:
+        fields["last_transition_id"] = transition_id
+    return [{"$set": fields}]
+
+
+def _history_record(order, old_status, new_status, updated_by, now):
+    return {
+        "order_id": order.get("order_id"),
+        "customer_id": order.get("customer_id"),
+        "action": "status_change",
+        "previous_status": old_status,
+        "status": new_status,
+        "action_by": updated_by,
+        "action_time": now,
+    }
+
+
+def _supports_transactions(db):
+    description = getattr(db.client, "topology_description", None)
+    return description is not None and description.topology_type_name in TRANSACTION_TOPOLOGIES
+
+
+def _run_atomically(db, callback):
+    """
+    Run `callback(session)` in a transaction when the deployment supports one.
+
+    Without transaction support the callback runs with no session and its
+    writes are applied one by one, without atomicity across them.
+    """
+    if not _supports_transactions(db):
+        return callback(None)
+    with db.client.start_session() as session:
+        return session.with_transaction(callback)
+
+
+def _record_rollups(db, changes):
+    # Rollups are derived data and rebuilt by stats_service; never fail the transition.
+    try:
+        stats_service.record_status_changes(db, changes)
+    except PyMongoError as exc:
+        logger.warning(f"Günlük istatistik güncelleme hatası: {exc}")
+
+
+def _previous_status(order):
+    # A moved order's log always ends with the entry this transition appended.
+    return order["change_log"][-1]["old_value"]
+
+
+def _transition_one(db, order_id, new_status, updated_by, expected_status, projection):
+    sources = source_statuses(new_status, expected_status)
+    if not sources:
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    def apply(session):
+        order = db.Orders.find_one_and_update(
+            _transition_filter({"order_id": order_id}, sources),
+            _transition_update(new_status, updated_by, now),
+            projection=projection,
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if order is not None:
+            db.OrderHistory.insert_one(
+                _history_record(order, _previous_status(order), new_status, updated_by, now), session=session
+            )
+        return order
+
+    order = _run_atomically(db, apply)
+    if order is not None:
+        _record_rollups(db, [(order, _previous_status(order), new_status)])
+    return order
+
+
+def transition_order_status(db, order_id, new_status, updated_by, expected_status=None):
+    """
+    Move one order to `new_status` if its current status allows it.
+
+    Returns False when the order does not exist or is not in an allowed
+    (or the expected) status.
+    """
+    return _transition_one(db, order_id, new_status, updated_by, expected_status, MOVED_ORDER_PROJECTION) is not None
+
+
+def transition_order_status_and_get(db, order_id, new_status, updated_by, expected_status=None):
+    """Like `transition_order_status`, but return the updated order document (or None)."""
+    return _transition_one(db, order_id, new_status, updated_by, expected_status, None)
+
+
+def transition_orders_status(db, new_status, updated_by, order_ids=None, route_id=None, expected_status=None):
+    """
+    Move many orders to `new_status` with one `update_many`.
+
+    Orders are selected by `order_ids` or by `assigned_route_id`; those not in
+    an allowed (or the expected) status are skipped. Returns the order ids
+    that moved.
+
+    This is three round trips however many orders move: the `update_many`,
+    a `find` for the orders this call moved (tagged with a transition id) and
+    one `bulk_write` of their `OrderHistory` records, plus the rollup write
+    afterwards. The three run in one transaction on replica sets and sharded
+    clusters; on a standalone server they are not atomic (see the module
+    docstring).
+    """
+    if order_ids is None and route_id is None:
+        raise ValueError("order_ids or route_id is required")
+    sources = source_statuses(new_status, expected_status)
+    if not sources or (order_ids is not None and not order_ids):
+        return []
+    selector = _orders_selector(order_ids, route_id)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    transition_id = uuid.uuid4().hex
+
+    def apply(session):
+        result = db.Orders.update_many(
+            _transition_filter(selector, sources),
+            _transition_update(new_status, updated_by, now, transition_id),
+            session=session,
+        )
+        if not result.modified_count:
+            return []
+        moved = list(db.Orders.find(_moved_filter(selector, transition_id), MOVED_ORDER_PROJECTION, session=session))
+        db.OrderHistory.bulk_write(
+            [
+                InsertOne(_history_record(order, _previous_status(order), new_status, updated_by, now))
+                for order in moved
+            ],
+            ordered=False,
+            session=session,
+        )
+        return moved
+
+    moved = _run_atomically(db, apply)
+    _record_rollups(db, [(order, _previous_status(order), new_status) for order in moved])
+    return [order.get("order_id") for order in moved]
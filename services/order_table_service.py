@@ -0,0 +1,171 @@
+"""
+Admin order tables as pandas DataFrames.
+
+Mongo flattens the nested `request.*` / `location.*` fields in a `$project`
+stage, so rows arrive as flat documents that load straight into a DataFrame.
+Formatting is done per column rather than per row (categorical status labels,
+datetime64 dates, numeric prices), leaving display formats, sorting and
+filtering to `st.dataframe`.
+"""
+
+import pandas as pd
+
+from services import order_service
+from services.common import ORDER_STATUSES, STATUS_LABELS_TR
+
+
+# table column -> source field path
+ORDER_TABLE_FIELDS = {
+    "order_id": "order_id",
+    "customer_id": "customer_id",
+    "status": "status",
+    "product_name": "request.product_name",
+    "quantity": "request.quantity",
+    "total_price": "total_price",
+    "created_at": "created_at",
+}
+ACTIVE_ORDER_TABLE_FIELDS = {
+    "order_id": "order_id",
+    "customer_id": "customer_id",
+    "status": "status",
+    "due_date": "due_date",
+    "address": "location.address",
+    "assigned_vehicle": "assigned_vehicle",
+}
+
+COLUMN_LABELS = {
+    "order_id": "Sipariş ID",
+    "customer_id": "Müşteri",
+    "status": "Durum",
+    "product_name": "Ürün",
+    "quantity": "Miktar",
+    "total_price": "Toplam",
+    "created_at": "Tarih",
+    "due_date": "Teslim Saati",
+    "address": "Adres",
+    "assigned_vehicle": "Araç",
+}
+CATEGORY_COLUMNS = ("customer_id", "product_name", "assigned_vehicle")
+NUMERIC_COLUMNS = ("quantity", "total_price")
+DATETIME_COLUMNS = ("created_at",)
+STRING_COLUMNS = ("order_id", "due_date", "address")
+UNASSIGNED_LABEL = "Atanmadı"
+
+
+def flat_projection(fields):
+    """`$project` stage body mapping each table column to its (nested) source field."""
+    return {"_id": 0, **{column: f"${path}" for column, path in fields.items()}}
+
+
+def find_frame(collection, query, fields, sort=None, limit=0):
+    """Run a flattening aggregation and load the rows straight into a DataFrame."""
+    pipeline = [{"$match": query}]
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": flat_projection(fields)})
+    return pd.DataFrame.from_records(collection.aggregate(pipeline), columns=list(fields))
+
+
+def _lookup(document, parts):
+    for part in parts:
+        if not isinstance(document, dict):
+            return None
+        document = document.get(part)
+    return document
+
+
+def frame_from_documents(documents, fields):
+    """DataFrame of `fields` from documents already in memory, one list per column."""
+    documents = documents if isinstance(documents, list) else list(documents)
+    columns = {}
+    for column, path in fields.items():
+        parts = path.split(".")
+        if len(parts) == 1:
+            columns[column] = [document.get(path) for document in documents]
+        else:
+            columns[column] = [_lookup(document, parts) for document in documents]
+    return pd.DataFrame(columns, columns=list(fields))
+
+
+def _status_labels(series):
+    # Unknown legacy statuses keep their raw value as an extra category.
+    unknown = sorted(set(series.dropna().unique()) - set(ORDER_STATUSES))
+    categories = pd.Categorical(series, categories=[*ORDER_STATUSES, *unknown])
+    labels = {status: STATUS_LABELS_TR.get(status, status) for status in categories.categories}
+    return pd.Series(categories.rename_categories(labels), index=series.index)
+
+
+def _to_datetime(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.tz_convert(None) if series.dt.tz is not None else series
+    # Mongo returns naive UTC datetimes; legacy rows may hold ISO strings.
+    return pd.to_datetime(series, errors="coerce", utc=True).dt.tz_convert(None)
+
+
+def format_order_table(frame):
+    """Convert a raw order frame to display dtypes and Turkish column labels."""
+    table = frame.copy()
+    if "status" in table:
+        table["status"] = _status_labels(table["status"])
+    if "assigned_vehicle" in table:
+        table["assigned_vehicle"] = table["assigned_vehicle"].fillna(UNASSIGNED_LABEL)
+    for column in table.columns:
+        if column in DATETIME_COLUMNS:
+            table[column] = _to_datetime(table[column])
+        elif column in NUMERIC_COLUMNS:
+            table[column] = pd.to_numeric(table[column], errors="coerce")
+        elif column in CATEGORY_COLUMNS:
+            table[column] = table[column].astype("category")
+        elif column in STRING_COLUMNS:
+            table[column] = table[column].astype("string")
+    return table.rename(columns=COLUMN_LABELS)
+
+
+def empty_table(fields):
+    return format_order_table(pd.DataFrame(columns=list(fields)))
+
+
+def _page_cursor(frame, position):
+    created_at = frame["created_at"].iloc[position]
+    if pd.isna(created_at):
+        created_at = None
+    elif isinstance(created_at, pd.Timestamp):
+        created_at = created_at.to_pydatetime()
+    return (created_at, frame["order_id"].iloc[position])
+
+
+def get_orders_table_page(db, page_size=50, cursor=None, direction="next", query=None):
+    """
+    One keyset-paginated page of orders as a display-ready DataFrame.
+
+    Same cursor semantics as `order_service.get_orders_page`; returns
+    `{"table", "next_cursor", "prev_cursor"}`.
+    """
+    forward = direction != "prev"
+    frame = find_frame(
+        db.Orders,
+        order_service.order_page_filter(cursor, direction, query),
+        ORDER_TABLE_FIELDS,
+        sort=order_service.order_page_sort(direction),
+        limit=page_size + 1,
+    )
+    has_more = len(frame) > page_size
+    frame = frame.iloc[:page_size]
+    if not forward:
+        frame = frame.iloc[::-1]
+    frame = frame.reset_index(drop=True)
+
+    has_next = has_more if forward else cursor is not None
+    has_prev = cursor is not None if forward else has_more
+    return {
+        "table": format_order_table(frame),
+        "next_cursor": _page_cursor(frame, -1) if len(frame) and has_next else None,
+        "prev_cursor": _page_cursor(frame, 0) if len(frame) and has_prev else None,
+    }
+
+
+def active_orders_table(orders):
+    """Display-ready DataFrame of `get_active_orders()`-shaped documents."""
+    return format_order_table(frame_from_documents(orders, ACTIVE_ORDER_TABLE_FIELDS))
@@ -1,20 +1,36 @@
 import datetime
-from copy import deepcopy
+import re
 
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 from werkzeug.security import generate_password_hash
 
+from services.common import geo_point
 
-def update_user_profile(db, user_id, update_data):
-    payload = deepcopy(update_data)
+
+def update_user_profile(db, user_id, update_data, password_hash_method="scrypt"):
+    payload = dict(update_data)
 
     if "password" in payload and payload["password"]:
-        payload["password"] = generate_password_hash(payload["password"])
+        payload["password"] = generate_password_hash(payload["password"], method=password_hash_method)
     if "password" in payload and not payload["password"]:
         del payload["password"]
 
-    payload["updated_at"] = datetime.datetime.now()
+    if "latitude" in payload and "longitude" in payload:
+        payload["geo"] = geo_point(payload["latitude"], payload["longitude"])
+
+    if any(field in payload for field in USER_SEARCH_FIELDS):
+        current = db.Users.find_one({"user_id": user_id}, {field: 1 for field in USER_SEARCH_FIELDS})
+        if current is None:
+            return False, "Kullanıcı bulunamadı"
+        payload["search_terms"] = user_search_terms({**current, **payload})
 
-    result = db.Users.update_one({"user_id": user_id}, {"$set": payload})
+    payload["updated_at"] = datetime.datetime.now(datetime.timezone.utc)
+
+    try:
+        result = db.Users.update_one({"user_id": user_id}, {"$set": payload})
+    except DuplicateKeyError:
+        return False, "Bu e-posta adresi başka bir kullanıcıya ait"
     if result.matched_count == 0:
         return False, "Kullanıcı bulunamadı"
 
@@ -23,11 +39,109 @@ def update_user_profile(db, user_id, update_data):
         updated_user["_id"] = str(updated_user["_id"])
     if updated_user:
         updated_user.pop("password", None)
+        updated_user.pop("search_terms", None)
     return True, updated_user
 
 
+USERS_BY_ID = [("user_id", 1)]
+
+
 def get_all_users(db):
-    return list(db.Users.find({}, {"_id": 0, "password": 0}).sort("user_id", 1))
+    return list(db.Users.find({}, {"_id": 0, "password": 0, "search_terms": 0}).sort(USERS_BY_ID))
+
+
+USER_DIRECTORY_PROJECTION = {"_id": 0, "password": 0, "search_terms": 0}
+USER_SEARCH_FIELDS = ("user_id", "full_name", "email", "phone_number")
+
+
+def _fold(text):
+    # casefold() turns "İ" into "i" + combining dot; fold Turkish dotted/dotless i together.
+    return str(text).casefold().replace("\u0307", "").replace("ı", "i")
+
+
+def user_search_terms(user):
+    """
+    Case-folded search keys for a user: each searchable value and its words.
+
+    Stored as `search_terms` (multikey-indexed) so the directory search is an
+    anchored prefix match on the index instead of a collection scan.
+    """
+    terms = set()
+    for field in USER_SEARCH_FIELDS:
+        value = user.get(field)
+        if value:
+            text = _fold(value)
+            terms.add(text)
+            terms.update(text.split())
+    return sorted(terms)
+
+
+def backfill_search_terms(db, batch_size=500):
+    """Add `search_terms` to users written without it; returns the modified count."""
+    modified = 0
+    operations = []
+    cursor = db.Users.find({"search_terms": {"$exists": False}}, {field: 1 for field in USER_SEARCH_FIELDS})
+    for user in cursor:
+        operations.append(UpdateOne({"_id": user["_id"]}, {"$set": {"search_terms": user_search_terms(user)}}))
+        if len(operations) >= batch_size:
+            modified += db.Users.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        modified += db.Users.bulk_write(operations, ordered=False).modified_count
+    return modified
+
+
+def _user_search_filter(search):
+    # Every word must prefix one of the user's search terms.
+    words = _fold(search or "").split()
+    conditions = [{"search_terms": {"$regex": f"^{re.escape(word)}"}} for word in words]
+    if len(conditions) <= 1:
+        return conditions[0] if conditions else {}
+    return {"$and": conditions}
+
+
+def count_users(db, search=None):
+    return db.Users.count_documents(_user_search_filter(search))
+
+
+def users_page_filter(cursor=None, direction="next", search=None):
+    """Filter selecting the users after (or before) a `user_id` cursor that match `search`."""
+    conditions = [_user_search_filter(search)]
+    if cursor is not None:
+        conditions.append({"user_id": {"$gt" if direction != "prev" else "$lt": cursor}})
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def users_page_sort(direction="next"):
+    return [("user_id", 1 if direction != "prev" else -1)]
+
+
+def get_users_page(db, page_size=20, cursor=None, direction="next", search=None):
+    """
+    Return one keyset-paginated page of users ordered by `user_id`.
+
+    `search` matches users where every word is a case-insensitive prefix of
+    the id, name (or one of its words), e-mail or phone number. `cursor` is a `user_id` taken from a previous page's
+    `next_cursor` / `prev_cursor`; `direction` is "next" or "prev".
+    """
+    forward = direction != "prev"
+    users = list(
+        db.Users.find(users_page_filter(cursor, direction, search), USER_DIRECTORY_PROJECTION)
+        .sort(users_page_sort(direction))
+        .limit(page_size + 1)
+    )
+    has_more = len(users) > page_size
+    users = users[:page_size]
+    if not forward:
+        users.reverse()
+
+    has_next = has_more if forward else cursor is not None
+    has_prev = cursor is not None if forward else has_more
+    return {
+        "users": users,
+        "next_cursor": users[-1]["user_id"] if users and has_next else None,
+        "prev_cursor": users[0]["user_id"] if users and has_prev else None,
+    }
 
 
 def get_user_profile(db, user_id):
@@ -37,4 +151,5 @@ def get_user_profile(db, user_id):
     if "_id" in user:
         user["_id"] = str(user["_id"])
     user.pop("password", None)
+    user.pop("search_terms", None)
     return user
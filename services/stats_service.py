@@ -0,0 +1,227 @@
+"""
+Daily order rollups in the `OrderDailyStats` collection.
+
+One document per `(day, customer_id, product_id)` holds `count`, `quantity`,
+`demand`, `revenue` (sum of `total_price`) and a `status` breakdown. Order
+inserts (`record_orders_created`) and every status transition in
+`order_status_service` (`record_status_changes`) apply `$inc` upserts, and
+`rebuild_daily_stats` recomputes everything
+from `Orders` with an aggregation pipeline when rollups drift. Readers always
+sum over matching documents, so they are correct even if concurrent upserts
+create duplicate keys.
+"""
+
+import datetime
+
+from pymongo import UpdateOne
+
+from services.common import ORDER_STATUSES
+
+
+STATS_COLLECTION = "OrderDailyStats"
+
+# Fields an order needs for its rollup key and increments.
+ROLLUP_PROJECTION = {
+    "_id": 0,
+    "order_date": 1,
+    "created_at": 1,
+    "customer_id": 1,
+    "status": 1,
+    "total_price": 1,
+    "request.product_id": 1,
+    "request.product_name": 1,
+    "request.quantity": 1,
+    "request.demand": 1,
+}
+
+
+def _day_key(order):
+    moment = order.get("order_date") or order.get("created_at")
+    if isinstance(moment, datetime.datetime):
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(datetime.timezone.utc)
+        return moment.strftime("%Y-%m-%d")
+    if isinstance(moment, str) and len(moment) >= 10:
+        return moment[:10]
+    return None
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+def _rollup_key(order):
+    request = order.get("request") or {}
+    return (_day_key(order), order.get("customer_id"), request.get("product_id"))
+
+
+def _key_filter(key):
+    day, customer_id, product_id = key
+    return {"day": day, "customer_id": customer_id, "product_id": product_id}
+
+
+def _upsert(key, increments, product_name=None):
+    update = {"$inc": increments}
+    if product_name is not None:
+        update["$set"] = {"product_name": product_name}
+    return UpdateOne(_key_filter(key), update, upsert=True)
+
+
+def record_orders_created(db, orders):
+    """Add newly inserted orders to their daily rollups in one bulk write."""
+    totals = {}
+    names = {}
+    for order in orders:
+        key = _rollup_key(order)
+        if key[0] is None:
+            continue
+        request = order.get("request") or {}
+        increments = totals.setdefault(key, {"count": 0, "quantity": 0, "demand": 0, "revenue": 0})
+        increments["count"] += 1
+        increments["quantity"] += _number(request.get("quantity"))
+        increments["demand"] += _number(request.get("demand"))
+        increments["revenue"] += _number(order.get("total_price"))
+        status_field = f"status.{order.get('status', 'waiting')}"
+        increments[status_field] = increments.get(status_field, 0) + 1
+        if request.get("product_name"):
+            names[key] = request["product_name"]
+
+    if totals:
+        db[STATS_COLLECTION].bulk_write(
+            [_upsert(key, increments, names.get(key)) for key, increments in totals.items()], ordered=False
+        )
+
+
+def record_status_changes(db, changes):
+    """
+    Move orders between status buckets in one bulk write.
+
+    `changes` is an iterable of `(order, old_status, new_status)`; each order
+    needs the ROLLUP_PROJECTION fields.
+    """
+    totals = {}
+    for order, old_status, new_status in changes:
+        key = _rollup_key(order)
+        if key[0] is None or old_status == new_status:
+            continue
+        increments = totals.setdefault(key, {})
+        increments[f"status.{old_status}"] = increments.get(f"status.{old_status}", 0) - 1
+        increments[f"status.{new_status}"] = increments.get(f"status.{new_status}", 0) + 1
+
+    if totals:
+        db[STATS_COLLECTION].bulk_write([_upsert(key, increments) for key, increments in totals.items()], ordered=False)
+
+
+def rebuild_daily_stats(db):
+    """Recompute every rollup from `Orders` with `$out`; returns the rollup document count."""
+    status_counts = {
+        status: {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}} for status in ORDER_STATUSES
+    }
+    pipeline = [
+        {"$match": {"order_date": {"$type": "date"}}},
+        {
+            "$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$order_date"}},
+                    "customer_id": "$customer_id",
+                    "product_id": "$request.product_id",
+                },
+                "product_name": {"$last": "$request.product_name"},
+                "count": {"$sum": 1},
+                "quantity": {"$sum": {"$ifNull": ["$request.quantity", 0]}},
+                "demand": {"$sum": {"$ifNull": ["$request.demand", 0]}},
+                "revenue": {"$sum": {"$ifNull": ["$total_price", 0]}},
+                **status_counts,
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "day": "$_id.day",
+                "customer_id": "$_id.customer_id",
+                "product_id": "$_id.product_id",
+                "product_name": 1,
+                "count": 1,
+                "quantity": 1,
+                "demand": 1,
+                "revenue": 1,
+                "status": {status: f"${status}" for status in ORDER_STATUSES},
+            }
+        },
+        {"$out": STATS_COLLECTION},
+    ]
+    db.Orders.aggregate(pipeline)
+    return db[STATS_COLLECTION].count_documents({})
+
+
+def _range_match(start_day, end_day, customer_id=None, product_id=None):
+    match = {"day": {"$gte": str(start_day), "$lte": str(end_day)}}
+    if customer_id is not None:
+        match["customer_id"] = customer_id
+    if product_id is not None:
+        match["product_id"] = product_id
+    return match
+
+
+def _sum_fields():
+    fields = {field: {"$sum": f"${field}"} for field in ("count", "quantity", "demand", "revenue")}
+    fields.update({status: {"$sum": {"$ifNull": [f"$status.{status}", 0]}} for status in ORDER_STATUSES})
+    return fields
+
+
+def _shape(row, key_name):
+    return {
+        key_name: row["_id"],
+        "count": row["count"],
+        "quantity": row["quantity"],
+        "demand": row["demand"],
+        "revenue": row["revenue"],
+        "status": {status: row[status] for status in ORDER_STATUSES},
+    }
+
+
+def _daily_stats_pipeline(start_day, end_day, customer_id=None, product_id=None):
+    return [
+        {"$match": _range_match(start_day, end_day, customer_id, product_id)},
+        {"$group": {"_id": "$day", **_sum_fields()}},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def _breakdown_pipeline(start_day, end_day, group_by="product_id", limit=10):
+    extra = {"product_name": {"$last": "$product_name"}} if group_by == "product_id" else {}
+    return [
+        {"$match": _range_match(start_day, end_day)},
+        {"$group": {"_id": f"${group_by}", **_sum_fields(), **extra}},
+        {"$sort": {"revenue": -1, "_id": 1}},
+        {"$limit": limit},
+    ]
+
+
+def get_daily_stats(db, start_day, end_day, customer_id=None, product_id=None):
+    """Per-day totals between two `YYYY-MM-DD` days (inclusive), oldest first."""
+    rows = db[STATS_COLLECTION].aggregate(_daily_stats_pipeline(start_day, end_day, customer_id, product_id))
+    return [_shape(row, "day") for row in rows]
+
+
+def get_stats_breakdown(db, start_day, end_day, group_by="product_id", limit=10):
+    """Totals per product or customer over a day range, by revenue, top `limit`."""
+    rows = db[STATS_COLLECTION].aggregate(_breakdown_pipeline(start_day, end_day, group_by, limit))
+    results = []
+    for row in rows:
+        shaped = _shape(row, group_by)
+        if group_by == "product_id":
+            shaped["product_name"] = row.get("product_name")
+        results.append(shaped)
+    return results
+
+
+if __name__ == "__main__":
+    import os
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    database = MongoClient(os.environ["MONGO_URI"])[os.getenv("MONGO_DB_NAME", "RouteManagementDB")]
+    print(f"rebuilt {rebuild_daily_stats(database)} daily rollup documents")
@@ -0,0 +1,393 @@
+"""
+Cached, resized profile picture thumbnails.
+
+`ThumbnailCache.get(url, size)` downloads a remote image once, shrinks it to
+fit in `size` x `size` and returns PNG bytes. Thumbnails are stored in SQLite
+under the SHA-256 of the original image, so URLs serving the same picture
+share one entry, and a URL is only downloaded again after `max_age_seconds`.
+A bounded in-memory LRU in front of the file serves reruns without touching
+disk; both tiers evict the least recently used thumbnails. With
+`wait=False` a miss is downloaded by a background worker instead of the
+caller's thread, and `get_many` fetches a page of pictures in parallel,
+waiting a bounded time for them.
+
+Pictures stored as `data:` URIs or as paths to image files inside the app
+directory are thumbnailed locally by `local_thumbnail`.
+
+Profile picture URLs are user input, so `fetch_image` only connects to
+public addresses (checked on every connection, including redirects) and
+optionally only to `allowed_hosts`.
+"""
+
+import base64
+import binascii
+import hashlib
+import http.client
+import io
+import ipaddress
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZE = 128
+DEFAULT_MAX_MEMORY_ENTRIES = 256
+DEFAULT_MAX_DISK_ENTRIES = 2048
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 3600
+DEFAULT_FAILURE_TTL_SECONDS = 300
+DEFAULT_MAX_SOURCE_BYTES = 10 * 1024 * 1024
+DEFAULT_FETCH_TIMEOUT = 3.0
+DEFAULT_FETCH_WORKERS = 4
+DEFAULT_PAGE_WAIT_SECONDS = 1.5
+MAX_REDIRECTS = 3
+
+
+def _public_address(host, port):
+    """Resolve `host` and return its first address, refusing any non-public one."""
+    addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if not address.is_global:
+            raise ValueError(f"Blocked image host {host} ({address})")
+    return addresses[0][4][0]
+
+
+def _guarded_create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, **kwargs):
+    # Resolving and connecting here, per connection, leaves no gap for DNS rebinding.
+    host, port = address
+    return socket.create_connection((_public_address(host, port), port), timeout, source_address, **kwargs)
+
+
+class _GuardedHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _guarded_create_connection
+
+
+class _GuardedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _guarded_create_connection
+
+
+class _GuardedHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, request):
+        return self.do_open(_GuardedHTTPConnection, request)
+
+
+class _GuardedHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, request):
+        return self.do_open(_GuardedHTTPSConnection, request, context=self._context)
+
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    max_redirections = MAX_REDIRECTS
+
+    def __init__(self, allowed_hosts=None):
+        super().__init__()
+        self.allowed_hosts = allowed_hosts
+
+    def redirect_request(self, request, fp, code, msg, headers, new_url):
+        check_image_url(new_url, self.allowed_hosts)
+        return super().redirect_request(request, fp, code, msg, headers, new_url)
+
+
+def _host_allowed(host, allowed_hosts):
+    return any(host == allowed or host.endswith(f".{allowed}") for allowed in allowed_hosts)
+
+
+def is_remote_image(value):
+    """True for http(s) URLs, which go through the download cache."""
+    return urllib.parse.urlsplit(str(value)).scheme in ("http", "https")
+
+
+def check_image_url(url, allowed_hosts=None):
+    """Raise ValueError unless `url` is http(s) and, with `allowed_hosts`, on one of those hosts or their subdomains."""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Unsupported image URL: {url}")
+    if allowed_hosts and not _host_allowed(parts.hostname.lower(), allowed_hosts):
+        raise ValueError(f"Image host not allowed: {parts.hostname}")
+
+
+def fetch_image(url, timeout=DEFAULT_FETCH_TIMEOUT, max_bytes=DEFAULT_MAX_SOURCE_BYTES, allowed_hosts=None):
+    """
+    Download an http(s) image, refusing bodies larger than `max_bytes`.
+
+    Loopback, private, link-local and other non-public addresses are refused
+    for the URL and every redirect; environment proxies are not used, since
+    the address check must apply to the image host itself.
+    """
+    check_image_url(url, allowed_hosts)
+    opener = urllib.request.build_opener(
+        urllib.request.ProxyHandler({}),
+        _GuardedHTTPHandler(),
+        _GuardedHTTPSHandler(),
+        _CheckedRedirectHandler(allowed_hosts),
+    )
+    request = urllib.request.Request(url, headers={"User-Agent": "OpevaSu-thumbnailer"})
+    with opener.open(request, timeout=timeout) as response:
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ValueError(f"Image larger than {max_bytes} bytes: {url}")
+        data = response.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError(f"Image larger than {max_bytes} bytes: {url}")
+    return data
+
+
+def make_thumbnail(data, size=DEFAULT_SIZE):
+    """Return PNG bytes of the image shrunk to fit in `size` x `size`."""
+    with Image.open(io.BytesIO(data)) as source:
+        # Lets JPEG decode at a reduced scale instead of full resolution.
+        source.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+        output = io.BytesIO()
+        image.save(output, format="PNG", optimize=True)
+    return output.getvalue()
+
+
+def _data_uri_bytes(value, max_bytes):
+    header, _, payload = value.partition(",")
+    if not header.startswith("data:image/") or not header.endswith(";base64"):
+        raise ValueError("Unsupported data URI")
+    # base64 grows data by 4/3; check before decoding.
+    if len(payload) * 3 // 4 > max_bytes:
+        raise ValueError(f"Image larger than {max_bytes} bytes")
+    try:
+        return base64.b64decode(payload, validate=True)
+    except binascii.Error as exc:
+        raise ValueError(f"Invalid base64 image: {exc}") from exc
+
+
+def _local_file_bytes(value, base_dir, max_bytes):
+    # Only image files inside the app directory; a stored path must not read arbitrary server files.
+    base_dir = os.path.realpath(base_dir)
+    path = os.path.realpath(os.path.join(base_dir, value))
+    if os.path.commonpath([base_dir, path]) != base_dir or not os.path.isfile(path):
+        raise ValueError(f"Image file not found in the app directory: {value}")
+    if os.path.getsize(path) > max_bytes:
+        raise ValueError(f"Image larger than {max_bytes} bytes: {value}")
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+def local_thumbnail(value, base_dir, size=DEFAULT_SIZE, max_bytes=DEFAULT_MAX_SOURCE_BYTES):
+    """
+    Thumbnail PNG bytes for a `data:image/...;base64,` URI or a path under `base_dir`, or None.
+
+    These are the non-URL profile pictures the directory showed before
+    thumbnails were cached; nothing is downloaded.
+    """
+    if not value:
+        return None
+    try:
+        if str(value).startswith("data:"):
+            data = _data_uri_bytes(value, max_bytes)
+        else:
+            data = _local_file_bytes(str(value), base_dir, max_bytes)
+        return make_thumbnail(data, size)
+    except Exception as exc:
+        logger.warning(f"Yerel profil resmi küçültme hatası: {exc}")
+        return None
+
+
+class ThumbnailCache:
+    """Two-tier (memory LRU + SQLite) thumbnail store keyed by URL and content hash."""
+
+    def __init__(self, path=":memory:", max_memory_entries=DEFAULT_MAX_MEMORY_ENTRIES,
+                 max_disk_entries=DEFAULT_MAX_DISK_ENTRIES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS,
+                 failure_ttl_seconds=DEFAULT_FAILURE_TTL_SECONDS, fetch=fetch_image,
+                 max_workers=DEFAULT_FETCH_WORKERS):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_age_seconds = max_age_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.downloads = 0
+        self._memory = OrderedDict()
+        self._failures = {}
+        self._pending = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sources ("
+                "url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS thumbnails ("
+                "content_hash TEXT NOT NULL, size INTEGER NOT NULL, data BLOB NOT NULL, "
+                "accessed_at REAL NOT NULL, PRIMARY KEY (content_hash, size))"
+            )
+
+    def get(self, url, size=DEFAULT_SIZE, wait=True):
+        """
+        Return thumbnail PNG bytes for `url`, or None if it cannot be loaded.
+
+        With `wait=False` nothing is downloaded on the caller's thread: a miss
+        (or an expired entry) is queued for a background worker and the stale
+        thumbnail, or None, is returned at once.
+        """
+        if not url:
+            return None
+        key = (url, size)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+            failed_at = self._failures.get(url)
+            if failed_at is not None and time.monotonic() - failed_at < self.failure_ttl_seconds:
+                return None
+
+        stored = self._load(url, size)
+        if stored is not None and time.time() - stored[1] < self.max_age_seconds:
+            self._remember(key, stored[0])
+            return stored[0]
+        if not wait:
+            self._schedule(url, size, stored)
+            return stored[0] if stored is not None else None
+        return self._refresh(url, size, stored)
+
+    def get_many(self, urls, size=DEFAULT_SIZE, timeout=DEFAULT_PAGE_WAIT_SECONDS):
+        """
+        Return `{url: thumbnail or None}` for a page of pictures.
+
+        Misses are downloaded in parallel by the background workers and the
+        caller waits at most `timeout` seconds for them; those still pending
+        come back as None (or stale) and are cached for the next call.
+        """
+        urls = [url for url in dict.fromkeys(urls) if url]
+        results = {url: self.get(url, size, wait=False) for url in urls}
+        with self._lock:
+            futures = [self._pending[(url, size)] for url in urls if (url, size) in self._pending]
+        if not futures:
+            return results
+        wait(futures, timeout=timeout)
+        return {url: self.get(url, size, wait=False) for url in urls}
+
+    def _refresh(self, url, size, stored):
+        key = (url, size)
+        try:
+            data = self._download(url, size)
+        except Exception as exc:
+            logger.warning(f"Profil resmi küçültme hatası ({url}): {exc}")
+            with self._lock:
+                self._failures[url] = time.monotonic()
+            # A stale thumbnail beats none when the source is unreachable.
+            data = stored[0] if stored is not None else None
+        if data is not None:
+            self._remember(key, data)
+        return data
+
+    def _schedule(self, url, size, stored):
+        key = (url, size)
+        with self._lock:
+            if key in self._pending:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="thumbnail")
+            future = self._executor.submit(self._refresh, url, size, stored)
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._done(key))
+
+    def _done(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def pending(self):
+        """Number of thumbnails queued or being downloaded in the background."""
+        with self._lock:
+            return len(self._pending)
+
+    def _load(self, url, size):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT t.data, s.fetched_at, s.content_hash FROM sources s "
+                "JOIN thumbnails t ON t.content_hash = s.content_hash AND t.size = ? WHERE s.url = ?",
+                (size, url),
+            ).fetchone()
+            if row is None:
+                return None
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE thumbnails SET accessed_at = ? WHERE content_hash = ? AND size = ?",
+                    (time.time(), row[2], size),
+                )
+        return row[0], row[1]
+
+    def _download(self, url, size):
+        source = self.fetch(url)
+        self.downloads += 1
+        content_hash = hashlib.sha256(source).hexdigest()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM thumbnails WHERE content_hash = ? AND size = ?", (content_hash, size)
+            ).fetchone()
+        data = row[0] if row is not None else make_thumbnail(source, size)
+
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (url, content_hash, now))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?)", (content_hash, size, data, now)
+            )
+            self._evict_disk()
+            self._failures.pop(url, None)
+        return data
+
+    def _evict_disk(self):
+        excess = self._connection.execute("SELECT COUNT(*) FROM thumbnails").fetchone()[0] - self.max_disk_entries
+        if excess <= 0:
+            return
+        self._connection.execute(
+            "DELETE FROM thumbnails WHERE rowid IN (SELECT rowid FROM thumbnails ORDER BY accessed_at LIMIT ?)",
+            (excess,),
+        )
+        self._connection.execute(
+            "DELETE FROM sources WHERE content_hash NOT IN (SELECT content_hash FROM thumbnails)"
+        )
+
+    def _remember(self, key, data):
+        if self.max_memory_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM thumbnails").fetchone()[0]
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._failures.clear()
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._connection.close()
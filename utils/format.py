@@ -6,6 +6,13 @@ def format_datetime(dt):
         dt = datetime.datetime.fromisoformat(dt.replace("Z", "+00:00"))
     return dt.strftime("%d.%m.%Y %H:%M")
 
+def format_seconds_of_day(seconds):
+    """Gün içindeki saniyeyi SS:DD biçimine dönüştürür."""
+    if seconds is None or seconds != seconds or seconds in (float("inf"), float("-inf")):
+        return "-"
+    minutes = int(seconds) // 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
 def format_currency(amount):
     """Para miktarını Türk Lirası formatına dönüştürür."""
     return f"₺{float(amount):.2f}"
@@ -1,6 +1,23 @@
+import importlib
+import sys
+import time
+
 import streamlit as st
 
 
+# page -> (module, render function); modules are imported on first visit
+PAGE_REGISTRY = {
+    "login": ("components.login", "login_page"),
+    "dashboard": ("components.dashboard", "dashboard_page"),
+    "orders": ("components.orders", "orders_page"),
+    "profile": ("components.profile", "profile_page"),
+    "admin": ("components.admin", "admin_page"),
+}
+DEFAULT_PAGE = "dashboard"
+
+# module -> seconds its first import took in this process
+page_import_times = {}
+
 NAV_OPTIONS = {
     "dashboard": "📊 Ana Sayfa",
     "orders": "📦 Siparişlerim",
@@ -17,6 +34,20 @@ def get_nav_options(user):
 
     return options
 
+def load_page(page):
+    """
+    Sayfanın render fonksiyonunu döndürür; modülü ilk ziyarette içe aktarır.
+
+    Bilinmeyen sayfalar için DEFAULT_PAGE kullanılır.
+    """
+    module_name, function_name = PAGE_REGISTRY.get(page, PAGE_REGISTRY[DEFAULT_PAGE])
+    module = sys.modules.get(module_name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        page_import_times[module_name] = time.perf_counter() - started
+    return getattr(module, function_name)
+
 def initialize_navigation():
     """
     Navigasyon için gerekli session state değişkenlerini başlatır.